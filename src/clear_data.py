@@ -5,7 +5,7 @@ import shutil
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
-from leaves.models import LeaveRequest, LeaveBalance
+from leaves.models import LeaveRequest, LeaveBalance, LeaveLedgerEntry
 from employees.models import DocumentVault
 from django.conf import settings
 
@@ -17,6 +17,7 @@ def clear_all_data():
 
     print("Clearing Leave Balances...")
     # 2. Clear Leave Balances (optional but good for clean slate)
+    LeaveLedgerEntry.objects.all().delete()
     LeaveBalance.objects.all().delete() 
     print("✓ All Leave Balances deleted.")
 
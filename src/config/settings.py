@@ -148,6 +148,11 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 # Media Files (Secure Docs)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Hand secure document transfers to the front proxy once Django has authorized them.
+# '' streams from Django; 'nginx' uses X-Accel-Redirect to SECURE_FILE_ACCEL_PREFIX, which
+# must be an `internal` location aliased to MEDIA_ROOT; 'apache' uses X-Sendfile (mod_xsendfile).
+SECURE_FILE_SENDFILE = os.environ.get('HRMS_SECURE_FILE_SENDFILE', '')
+SECURE_FILE_ACCEL_PREFIX = os.environ.get('HRMS_SECURE_FILE_ACCEL_PREFIX', '/protected/')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -158,10 +163,15 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # To use Gmail:
 # 1. Turn on 2FA for your Google Account
 # 2. Generate an App Password: https://myaccount.google.com/apppasswords
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+# For local testing set HRMS_EMAIL_BACKEND=django.core.mail.backends.console.EmailBackend,
+# or point HRMS_EMAIL_HOST/PORT at a local SMTP stand-in (python -m aiosmtpd -n -l localhost:1025)
+# with HRMS_EMAIL_USE_TLS=0.
+# Mail is queued in core.models.OutboundEmail and delivered by `manage.py send_queued_email`.
+EMAIL_BACKEND = os.environ.get('HRMS_EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.environ.get('HRMS_EMAIL_HOST', 'smtp.gmail.com')
+EMAIL_PORT = int(os.environ.get('HRMS_EMAIL_PORT', '587'))
+EMAIL_USE_TLS = os.environ.get('HRMS_EMAIL_USE_TLS', '1') == '1'
+EMAIL_TIMEOUT = int(os.environ.get('HRMS_EMAIL_TIMEOUT', '30'))
 EMAIL_HOST_USER = 'your-email@gmail.com' # REPLACE THIS
 EMAIL_HOST_PASSWORD = 'your-app-password' # REPLACE THIS
 DEFAULT_FROM_EMAIL = 'Nexteons HR <noreply@nexteons.com>'
@@ -170,6 +180,60 @@ DEFAULT_FROM_EMAIL = 'Nexteons HR <noreply@nexteons.com>'
 # In production, this key should be loaded from env and never committed
 # Fixed dev key to prevent data loss on server restart
 ENCRYPTION_KEY = os.environ.get('HRMS_ENCRYPTION_KEY', 'weUAqis-6FCaESfgJd3y3UmWRe7ihAYbvfOgNWE_LuI=')
+# Retired keys, comma separated, still accepted for decryption during a key rotation.
+# New data is always encrypted with ENCRYPTION_KEY; run `manage.py rotate_encryption_keys`
+# to re-encrypt existing rows and then drop the old keys from here.
+ENCRYPTION_OLD_KEYS = [k.strip() for k in os.environ.get('HRMS_ENCRYPTION_OLD_KEYS', '').split(',') if k.strip()]
+# Separate HMAC key for blind indexes (equality lookups on encrypted PII).
+# Changing it requires `manage.py backfill_blind_indexes --all`.
+BLIND_INDEX_KEY = os.environ.get('HRMS_BLIND_INDEX_KEY', 'dev-blind-index-key-change-me')
+
+# --- BANK TRANSFER EXPORT ---
+# Layout written to PayrollBatch.sif_file (see payroll/bank_formats.py for the registry)
+BANK_EXPORT_FORMAT = os.environ.get('HRMS_BANK_EXPORT_FORMAT', 'INDIAN_CSV')
+# WPS SIF control record details
+WPS_EMPLOYER_ID = os.environ.get('HRMS_WPS_EMPLOYER_ID', '')
+WPS_BANK_CODE = os.environ.get('HRMS_WPS_BANK_CODE', '')
+
+# --- CACHE ---
+# Per-process memory by default. Set HRMS_REDIS_URL when running several workers so
+# change versions and cached data are shared between them.
+if os.environ.get('HRMS_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['HRMS_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'hrms',
+        }
+    }
+# Whether every worker sees the same cache. Features that keep change versions in the
+# cache only trust them when it is; otherwise they fall back to the database or short TTLs.
+CACHE_SHARED = bool(os.environ.get('HRMS_REDIS_URL'))
+
+# --- LEAVE LIVE UPDATES ---
+# Longest a check_updates long-poll may hold a request (and a worker) open, in seconds.
+# 0 (the default) turns long-polling off; clients then get an immediate 304 and poll again.
+# Each waiting request holds a worker, so only raise this with async or threaded workers.
+LEAVE_UPDATES_LONGPOLL_MAX = int(os.environ.get('HRMS_LEAVE_UPDATES_LONGPOLL_MAX', '0'))
+
+# --- DOCUMENT EXPIRY ALERTS ---
+# `manage.py send_document_expiry_alerts` (daily from cron) mails documents expiring within
+# DOCUMENT_EXPIRY_ALERT_DAYS, and does not alert the same document again for DOCUMENT_EXPIRY_REALERT_DAYS.
+DOCUMENT_EXPIRY_ALERT_DAYS = int(os.environ.get('HRMS_DOCUMENT_EXPIRY_ALERT_DAYS', '30'))
+DOCUMENT_EXPIRY_REALERT_DAYS = int(os.environ.get('HRMS_DOCUMENT_EXPIRY_REALERT_DAYS', '7'))
+
+# --- MEETING SCHEDULING ---
+# Free-slot suggestions (meetings.availability) stay within these local working hours on
+# working days, and look at most MEETING_SLOT_SEARCH_DAYS ahead.
+MEETING_DAY_START = os.environ.get('HRMS_MEETING_DAY_START', '09:00')
+MEETING_DAY_END = os.environ.get('HRMS_MEETING_DAY_END', '18:00')
+MEETING_SLOT_SEARCH_DAYS = int(os.environ.get('HRMS_MEETING_SLOT_SEARCH_DAYS', '14'))
 
 # --- AUTH SETTINGS ---
 LOGIN_URL = 'login'
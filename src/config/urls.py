@@ -3,7 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.conf.urls.static import static
-from core.views import dashboard, serve_secure_document, system_admin, system_logs, company_profile, public_holiday_add, public_holiday_delete, holiday_settings
+from core.views import dashboard, dashboard_widget, serve_secure_document, system_admin, system_logs, system_logs_export, company_profile, public_holiday_add, public_holiday_delete, holiday_settings
 from core.auth_views import CustomLoginView, CustomLogoutView
 
 from django.contrib.auth import views as auth_views
@@ -16,6 +16,7 @@ urlpatterns = [
     path('media/secure_docs/<path:path>', serve_secure_document, name='serve_secure_document'),
     
     path('', dashboard, name='dashboard'),
+    path('dashboard/widgets/<str:name>/', dashboard_widget, name='dashboard_widget'),
     path('employees/', include('employees.urls')),
     path('payroll/', include('payroll.urls')),
     path('leaves/', include('leaves.urls')),
@@ -23,6 +24,7 @@ urlpatterns = [
     path('projects/', include('projects.urls')),
     path('system-admin/', system_admin, name='system_admin'),
     path('system-admin/logs/', system_logs, name='system_logs'),
+    path('system-admin/logs/export/', system_logs_export, name='system_logs_export'),
     path('system-admin/company-profile/', company_profile, name='company_profile'),
     path('system-admin/holidays/', holiday_settings, name='holiday_settings'),
     path('system-admin/company-profile/holiday/add/', public_holiday_add, name='public_holiday_add'),
@@ -1,9 +1,17 @@
+from django.core.cache import cache
 from core.models import CompanySettings
 
+CONTEXT_CACHE_KEY = 'company_settings_context'
+
+
 def company_settings(request):
-    settings = CompanySettings.load()
-    return {
-        'company_name': settings.name,
-        'currency_symbol': settings.currency_symbol,
-        'currency_code': settings.currency_code,
-    }
+    context = cache.get(CONTEXT_CACHE_KEY)
+    if context is None:
+        settings = CompanySettings.load()
+        context = {
+            'company_name': settings.name,
+            'currency_symbol': settings.currency_symbol,
+            'currency_code': settings.currency_code,
+        }
+        cache.set(CONTEXT_CACHE_KEY, context, None)
+    return context
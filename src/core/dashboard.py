@@ -0,0 +1,183 @@
+from datetime import datetime
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.timesince import timesince
+
+
+class DashboardWidgets:
+    """
+    Cached widgets for the admin/HR dashboard.
+
+    Every widget is built by its own method into plain JSON-serializable data
+    and cached independently with a short TTL. Writes to the models a widget
+    reads bump that widget's version (core.signals), so a change shows up on
+    the next request instead of after the TTL. Widgets marked lazy are not
+    built while rendering the page; the browser fetches them from
+    dashboard_widget once the shell is on screen.
+    """
+    KEY = 'dashboard:{}:{}'
+    VERSION_KEY = 'dashboard_version:{}'
+
+    # name -> ttl (s), per_user, lazy, roles allowed (None: every dashboard user)
+    WIDGETS = {
+        'kpis': {'ttl': 60, 'per_user': False, 'lazy': False, 'roles': None},
+        'kpi_trend': {'ttl': 300, 'per_user': False, 'lazy': True, 'roles': None},
+        'on_leave': {'ttl': 120, 'per_user': False, 'lazy': True, 'roles': None},
+        'pending_approvals': {'ttl': 60, 'per_user': True, 'lazy': False, 'roles': None},
+        'liability': {'ttl': 300, 'per_user': False, 'lazy': True, 'roles': ('ADMIN', 'CEO', 'HR_MANAGER')},
+        'activity': {'ttl': 30, 'per_user': False, 'lazy': True, 'roles': ('ADMIN', 'CEO')},
+    }
+
+    # model label -> widgets that read it; wired to post_save/post_delete in core.signals
+    DEPENDENCIES = {
+        'core.DailyKPISnapshot': ('kpis', 'kpi_trend'),
+        'users.CustomUser': ('on_leave', 'liability'),
+        'leaves.LeaveRequest': ('on_leave', 'pending_approvals'),
+        'payroll.GratuitySnapshot': ('liability',),
+        'core.AuditLog': ('activity',),
+    }
+
+    @staticmethod
+    def can_view_dashboard(user):
+        return user.is_staff or user.is_admin() or user.is_hr() or user.is_ceo()
+
+    @staticmethod
+    def allowed(name, user):
+        spec = DashboardWidgets.WIDGETS.get(name)
+        if spec is None or not DashboardWidgets.can_view_dashboard(user):
+            return False
+        roles = spec['roles']
+        return (
+            roles is None or user.is_staff
+            or str(user.role).upper() in roles or str(user.additional_role or '').upper() in roles
+        )
+
+    @staticmethod
+    def visible(user):
+        return [name for name in DashboardWidgets.WIDGETS if DashboardWidgets.allowed(name, user)]
+
+    @staticmethod
+    def version(name):
+        return cache.get_or_set(DashboardWidgets.VERSION_KEY.format(name), 1, None)
+
+    @staticmethod
+    def invalidate(*names):
+        """Drops the cached copies of the given widgets once the current transaction commits"""
+        def bump():
+            for name in names:
+                key = DashboardWidgets.VERSION_KEY.format(name)
+                try:
+                    cache.incr(key)
+                except ValueError:
+                    cache.set(key, 2, None)
+        transaction.on_commit(bump)
+
+    @staticmethod
+    def get(name, user):
+        """Cached widget data; None when the user may not see the widget"""
+        if not DashboardWidgets.allowed(name, user):
+            return None
+        spec = DashboardWidgets.WIDGETS[name]
+        today = timezone.localdate()
+        scope = f"{today.isoformat()}:{user.pk if spec['per_user'] else 'all'}"
+        key = DashboardWidgets.KEY.format(name, f"v{DashboardWidgets.version(name)}:{scope}")
+        data = cache.get(key)
+        if data is None:
+            data = getattr(DashboardWidgets, f'build_{name}')(user, today)
+            cache.set(key, data, spec['ttl'])
+        return data
+
+    @staticmethod
+    def render_data(name, data):
+        """Adds the request-time parts (relative times) that must not be cached"""
+        if name == 'activity':
+            now = timezone.now()
+            data = dict(data, items=[
+                dict(item, ago=timesince(datetime.fromisoformat(item['timestamp']), now)) for item in data['items']
+            ])
+        return data
+
+    # --- builders ---------------------------------------------------------
+
+    @staticmethod
+    def build_kpis(user, today):
+        from .kpi import DailyKPIs
+        snapshot = DailyKPIs.get(today)
+        return {
+            'total_employees': snapshot.total_employees,
+            'new_employees_count': snapshot.new_employees,
+            'new_emp_percentage': snapshot.new_employee_percentage,
+            'active_employees': snapshot.active_employees,
+            'active_today_count': snapshot.present,
+            'attendance_rate': float(snapshot.attendance_rate),
+            'on_leave_count': snapshot.on_leave,
+            'expiring_docs_count': snapshot.expiring_documents,
+        }
+
+    @staticmethod
+    def build_kpi_trend(user, today):
+        from .kpi import DailyKPIs
+        return {'days': [{
+            'date': snapshot.date.isoformat(),
+            'label': snapshot.date.strftime('%d %b'),
+            'present': snapshot.present,
+            'attendance_rate': float(snapshot.attendance_rate),
+            'on_leave': snapshot.on_leave,
+            'total_employees': snapshot.total_employees,
+        } for snapshot in DailyKPIs.trend(30, today)]}
+
+    @staticmethod
+    def _on_leave_today(today):
+        from leaves.models import LeaveRequest
+        return LeaveRequest.objects.filter(
+            days__date=today,
+            status__in=[LeaveRequest.Status.APPROVED, LeaveRequest.Status.HR_PROCESSED],
+            employee__is_active=True
+        ).exclude(employee__status='ARCHIVED')
+
+    @staticmethod
+    def build_on_leave(user, today):
+        rows = DashboardWidgets._on_leave_today(today).select_related('employee', 'leave_type').order_by('end_date', 'pk')
+        items = [{
+            'name': req.employee.full_name or req.employee.username,
+            'leave_type': req.leave_type.name,
+            'half_day': req.half_day,
+            'end_date': req.end_date.strftime('%d %b'),
+        } for req in rows]
+        return {'count': len(items), 'items': items}
+
+    @staticmethod
+    def build_pending_approvals(user, today):
+        from leaves.models import LeaveRequest
+        return {
+            'count': LeaveRequest.objects.filter(
+                status=LeaveRequest.Status.PENDING, assigned_manager=user, employee__is_active=True
+            ).exclude(employee__status='ARCHIVED').count(),
+        }
+
+    @staticmethod
+    def build_liability(user, today):
+        from payroll.services import GratuityService
+        total, _ = GratuityService.total_liability()
+        return {'total': f"{total:.2f}"}
+
+    @staticmethod
+    def build_activity(user, today):
+        from .models import AuditLog
+        items, seen = [], set()
+        # Aggressive Deduplication: the same text is only shown once
+        for activity in AuditLog.objects.select_related('user').order_by('-timestamp')[:60]:
+            msg = activity.description
+            if not msg or msg in seen:
+                continue
+            seen.add(msg)
+            actor = activity.user
+            items.append({
+                'initial': ((actor.full_name or actor.username)[:1] if actor else 'S').upper(),
+                'description': msg,
+                'timestamp': activity.timestamp.isoformat(),
+            })
+            if len(items) >= 10:
+                break
+        return {'items': items}
@@ -0,0 +1,269 @@
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.utils import timezone
+from core.utils.transactions import on_commit_batched
+
+
+class ESSDashboard:
+    """
+    Employee self-service dashboard served from a precomputed summary.
+
+    Each employee's numbers and lists live in one EmployeeDashboardSummary row,
+    split into sections that are rebuilt independently: when a leave request,
+    ledger entry, attendance log, manual punch or meeting changes, only the
+    affected section of the affected employees' rows is recomputed, once per
+    transaction, after commit. The row is cached, so a page view costs no query
+    while the cache is warm and one when it is not. Parts that are the same for
+    everybody (holidays, average attendance) are cached separately.
+
+    Without a shared cache (settings.CACHE_SHARED) another worker may have
+    rebuilt the row, so a cached entry is only used after checking the row's
+    updated_at - one primary key lookup per view.
+    """
+    KEY = 'ess_summary:{}'
+    SHARED_KEY = 'ess_shared:{}'
+    VERSION_KEY = 'ess_summary_version'
+    TTL = 12 * 60 * 60
+    SHARED_TTL = 300
+
+    SECTIONS = ('balances', 'attendance', 'leaves', 'punches', 'meetings')
+
+    # model label -> sections it feeds; wired to post_save/pre_delete in core.signals
+    MODEL_SECTIONS = {
+        'users.CustomUser': ('balances',),  # gender decides the leave types listed
+        'leaves.LeaveRequest': ('leaves',),
+        'leaves.LeaveLedgerEntry': ('balances',),
+        'payroll.AttendanceLog': ('attendance',),
+        'payroll.ManualPunchRequest': ('punches',),
+        'meetings.Meeting': ('meetings',),
+    }
+
+    # --- reads ------------------------------------------------------------
+
+    @staticmethod
+    def context(user):
+        """Template context for dashboard_ess.html"""
+        today = timezone.localdate()
+        user_key, shared_key = ESSDashboard.KEY.format(user.pk), ESSDashboard.SHARED_KEY.format(today.isoformat())
+        cached = cache.get_many([user_key, shared_key, ESSDashboard.VERSION_KEY])
+
+        version = cached.get(ESSDashboard.VERSION_KEY)
+        if version is None:
+            version = ESSDashboard._new_version()
+
+        entry = cached.get(user_key)
+        if entry is not None and not settings.CACHE_SHARED:
+            from .models import EmployeeDashboardSummary
+            stored = EmployeeDashboardSummary.objects.filter(employee=user).values_list('as_of', 'updated_at').first()
+            if stored != (entry['as_of'], entry.get('updated_at')):
+                entry = None
+        if entry is None or entry['as_of'] != today or entry['version'] != version:
+            data, updated_at = ESSDashboard.summary(user, today)
+            entry = {'as_of': today, 'version': version, 'updated_at': updated_at, 'data': data}
+            cache.set(user_key, entry, ESSDashboard.TTL)
+
+        shared = cached.get(shared_key)
+        if shared is None:
+            shared = ESSDashboard.build_shared(today)
+            cache.set(shared_key, shared, ESSDashboard.SHARED_TTL)
+
+        return {'employee': user, **entry['data'], **shared}
+
+    @staticmethod
+    def summary(user, today=None):
+        """(data, updated_at) of today's summary for `user`: the stored row, or a freshly built one"""
+        from .models import EmployeeDashboardSummary
+        today = today or timezone.localdate()
+        row = EmployeeDashboardSummary.objects.filter(employee=user, as_of=today).first()
+        if row is not None:
+            return ESSDashboard.hydrate(row.data), row.updated_at
+        data = ESSDashboard.build(user, today)
+        row, _ = EmployeeDashboardSummary.objects.update_or_create(employee=user, defaults={'as_of': today, 'data': data})
+        return data, row.updated_at
+
+    @staticmethod
+    def hydrate(data):
+        """Turns the ISO strings of a stored row back into dates for the template filters"""
+        data = dict(data)
+        data['recent_leaves'] = [dict(leave, start_date=date.fromisoformat(leave['start_date'])) for leave in data['recent_leaves']]
+        data['recent_manual_punches'] = [dict(punch, date=date.fromisoformat(punch['date'])) for punch in data['recent_manual_punches']]
+        data['upcoming_meetings'] = [dict(
+            meeting,
+            start_time=datetime.fromisoformat(meeting['start_time']),
+            end_time=datetime.fromisoformat(meeting['end_time']),
+        ) for meeting in data['upcoming_meetings']]
+        return data
+
+    # --- invalidation -----------------------------------------------------
+
+    @staticmethod
+    def _new_version():
+        version = uuid.uuid4().hex
+        cache.set(ESSDashboard.VERSION_KEY, version, None)
+        return version
+
+    @staticmethod
+    def mark_dirty(employee_ids, sections):
+        """Recomputes `sections` of these employees' rows once the current transaction commits"""
+        on_commit_batched(
+            'ess_summary', {(pk, section) for pk in employee_ids if pk for section in sections}, ESSDashboard.refresh
+        )
+
+    @staticmethod
+    def refresh(items):
+        """
+        Applies (employee id, section) pairs to the rows already built for today.
+        Employees without a current row are skipped; theirs is built on their next visit.
+        """
+        from django.contrib.auth import get_user_model
+        from .models import EmployeeDashboardSummary
+        today = timezone.localdate()
+        sections = defaultdict(set)
+        for pk, section in items:
+            sections[pk].add(section)
+
+        rows = EmployeeDashboardSummary.objects.filter(employee_id__in=sections, as_of=today)
+        users = get_user_model().objects.in_bulk([row.employee_id for row in rows])
+        version = cache.get(ESSDashboard.VERSION_KEY) or ESSDashboard._new_version()
+        for row in rows:
+            user = users[row.employee_id]
+            data = ESSDashboard.hydrate(row.data)
+            for section in ESSDashboard.SECTIONS:
+                if section in sections[row.employee_id]:
+                    data.update(getattr(ESSDashboard, f'build_{section}')(user, today))
+            row.data = data
+            row.save(update_fields=['data', 'updated_at'])
+            cache.set(ESSDashboard.KEY.format(row.employee_id), {
+                'as_of': today, 'version': version, 'updated_at': row.updated_at, 'data': data
+            }, ESSDashboard.TTL)
+
+    @staticmethod
+    def invalidate_all():
+        """Drops every summary (leave types or ledger periods changed for everybody)"""
+        from .models import EmployeeDashboardSummary
+
+        def drop():
+            EmployeeDashboardSummary.objects.all().delete()
+            ESSDashboard._new_version()
+        transaction.on_commit(drop)
+
+    @staticmethod
+    def invalidate_shared():
+        transaction.on_commit(lambda: cache.delete(ESSDashboard.SHARED_KEY.format(timezone.localdate().isoformat())))
+
+    # --- builders ---------------------------------------------------------
+
+    @staticmethod
+    def build(user, today):
+        data = {}
+        for section in ESSDashboard.SECTIONS:
+            data.update(getattr(ESSDashboard, f'build_{section}')(user, today))
+        return data
+
+    @staticmethod
+    def build_balances(user, today):
+        from leaves.ledger import LeaveLedger
+        from leaves.models import LeaveType
+        leave_balances = []
+        try:
+            # Filter Leave Types based on Gender Eligibility
+            leave_types = LeaveType.objects.filter(is_active=True)
+            if user.gender:
+                leave_types = leave_types.filter(Q(eligibility_gender='ALL') | Q(eligibility_gender=user.gender))
+            else:
+                # If gender not specified, only show 'ALL' to be safe
+                leave_types = leave_types.filter(eligibility_gender='ALL')
+
+            # One indexed read of the ledger-maintained balances
+            for balance_obj in LeaveLedger.balances_for(user, leave_types, today):
+                lt = balance_obj.leave_type
+                used = float(balance_obj.days_used)
+                total_quota = float(balance_obj.total_entitlement)
+                percentage = int((used / total_quota * 100) if total_quota > 0 else 0)
+                leave_balances.append({
+                    'name': lt.name,
+                    'code': lt.code,
+                    'used': used,
+                    'total': total_quota,
+                    'remaining': max(0, total_quota - used),
+                    'percentage': percentage,
+                    'remaining_percentage': 100 - percentage,
+                    'is_unlimited': getattr(lt, 'allow_unlimited', False)
+                })
+        except Exception:
+            pass
+        return {'leave_balances': leave_balances, 'total_leave_used': sum(b['used'] for b in leave_balances)}
+
+    @staticmethod
+    def build_attendance(user, today):
+        from payroll.models import AttendanceLog
+        return {'attendance_count': AttendanceLog.objects.filter(
+            employee=user, date__year=today.year, date__month=today.month, is_absent=False
+        ).count()}
+
+    @staticmethod
+    def build_leaves(user, today):
+        from leaves.models import LeaveRequest
+        recent = LeaveRequest.objects.filter(employee=user).select_related('leave_type').order_by('-created_at')[:5]
+        return {
+            'recent_leaves': [{
+                'leave_type': {'name': leave.leave_type.name, 'requires_document': leave.leave_type.requires_document},
+                'start_date': leave.start_date,
+                'half_day': leave.half_day,
+                'half_day_session': leave.half_day_session,
+                'get_half_day_session_display': leave.get_half_day_session_display(),
+                'duration_days': leave.duration_days,
+                'document_status': leave.document_status,
+                'status': leave.status,
+            } for leave in recent],
+            'pending_leaves_count': LeaveRequest.objects.filter(employee=user, status=LeaveRequest.Status.PENDING).count(),
+        }
+
+    @staticmethod
+    def build_punches(user, today):
+        from payroll.models import ManualPunchRequest
+        return {'recent_manual_punches': [
+            {'date': punch.date, 'status': punch.status}
+            for punch in ManualPunchRequest.objects.filter(employee=user).order_by('-created_at')[:5]
+        ]}
+
+    @staticmethod
+    def build_meetings(user, today):
+        from meetings.models import Meeting
+        today_start = timezone.make_aware(datetime.combine(today, time.min))
+        meetings = Meeting.objects.filter(
+            Q(participants=user) | Q(organizer=user),
+            start_time__gte=today_start
+        ).distinct().annotate(
+            is_organizer=Case(
+                When(organizer=user, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+        ).order_by('-is_organizer', 'start_time')[:5]
+        return {'upcoming_meetings': [{
+            'title': meeting.title,
+            'start_time': meeting.start_time,
+            'end_time': meeting.end_time,
+            'is_organizer': meeting.is_organizer,
+        } for meeting in meetings]}
+
+    @staticmethod
+    def build_shared(today):
+        from payroll.models import AttendanceLog
+        from .models import PublicHoliday
+        # Average Attendance for ALL Employees
+        total_present_logs = AttendanceLog.objects.filter(
+            date__month=today.month,
+            date__year=today.year,
+            status__in=['Present', 'HalfDay']
+        ).count()
+        return {
+            'upcoming_holidays': list(PublicHoliday.objects.filter(date__gte=today).order_by('date').values('name', 'date')),
+            'avg_daily_attendance': int(total_present_logs / today.day),
+        }
@@ -0,0 +1,169 @@
+import io
+import os
+import posixpath
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff'}
+
+
+class DocumentImages:
+    """
+    Upload-time image normalization for leave certificates and vault documents.
+
+    The original upload is kept untouched. For image uploads a size-capped,
+    recompressed JPEG viewing copy and a small thumbnail are written next to it
+    under '<root>/derived/', so reviewers load a few hundred KB instead of a
+    full-resolution phone photo. Work is queued as ImageDerivative rows when the
+    upload is saved and done off-request by `manage.py process_document_images`.
+    """
+    PREVIEW_MAX_SIZE = 1600
+    PREVIEW_QUALITY = 80
+    THUMBNAIL_SIZE = 320
+    THUMBNAIL_QUALITY = 70
+    MAX_ATTEMPTS = 3
+
+    @staticmethod
+    def is_image(name):
+        return os.path.splitext(name or '')[1].lower() in IMAGE_EXTENSIONS
+
+    @staticmethod
+    def derived_name(source, suffix):
+        """'leave_documents/6c/04/6c04...jpeg' -> 'leave_documents/derived/6c/04/6c04....<suffix>.jpg'"""
+        root, _, rest = source.partition('/')
+        if not rest:
+            root, rest = '', root
+        return posixpath.join(root, 'derived', f"{os.path.splitext(rest)[0]}.{suffix}.jpg")
+
+    @staticmethod
+    def enqueue(field_file):
+        """Queues derivative generation for an uploaded image once the upload is committed"""
+        if not field_file or not DocumentImages.is_image(field_file.name):
+            return
+        name = field_file.name
+
+        def queue():
+            from core.models import ImageDerivative
+            ImageDerivative.objects.get_or_create(source=name)
+        transaction.on_commit(queue)
+
+    @staticmethod
+    def lookup(names):
+        """{source name: finished ImageDerivative} for the given stored names, one query"""
+        from core.models import ImageDerivative
+        names = {n for n in names if n}
+        if not names:
+            return {}
+        return {
+            d.source: d for d in ImageDerivative.objects.filter(source__in=names, status=ImageDerivative.Status.DONE)
+        }
+
+    @staticmethod
+    def for_file(field_file):
+        if not field_file:
+            return None
+        return DocumentImages.lookup([field_file.name]).get(field_file.name)
+
+    @staticmethod
+    def source_for(derived):
+        """Stored name of the original a derivative belongs to, or None"""
+        from core.models import ImageDerivative
+        from django.db.models import Q
+        return ImageDerivative.objects.filter(Q(preview=derived) | Q(thumbnail=derived)).values_list('source', flat=True).first()
+
+    @staticmethod
+    def discard(source):
+        """Removes the derivatives of a stored file that has been deleted"""
+        from core.models import ImageDerivative
+        for derivative in ImageDerivative.objects.filter(source=source):
+            for name in (derivative.preview, derivative.thumbnail):
+                if name:
+                    default_storage.delete(name)
+            derivative.delete()
+
+    @staticmethod
+    def process_pending(limit=20):
+        """Processes up to `limit` queued rows; returns how many were handled"""
+        from core.models import ImageDerivative
+        handled = 0
+        while handled < limit:
+            with transaction.atomic():
+                derivative = (
+                    ImageDerivative.objects.select_for_update(skip_locked=True)
+                    .filter(status=ImageDerivative.Status.PENDING).order_by('created_at', 'pk').first()
+                )
+                if derivative is None:
+                    break
+                DocumentImages.process(derivative)
+            handled += 1
+        return handled
+
+    @staticmethod
+    def process(derivative):
+        """Generates the viewing copy and thumbnail for one queued row"""
+        from PIL import Image, UnidentifiedImageError
+        from core.models import ImageDerivative
+
+        derivative.attempts += 1
+        derivative.processed_at = timezone.now()
+        try:
+            with default_storage.open(derivative.source, 'rb') as fh:
+                image = DocumentImages._normalized(Image.open(fh))
+            derivative.source_size = default_storage.size(derivative.source)
+        except (FileNotFoundError, UnidentifiedImageError, Image.DecompressionBombError) as e:
+            derivative.status = ImageDerivative.Status.SKIPPED
+            derivative.error = str(e)[:1000]
+            derivative.save()
+            return derivative
+        except Exception as e:
+            derivative.status = (
+                ImageDerivative.Status.FAILED if derivative.attempts >= DocumentImages.MAX_ATTEMPTS
+                else ImageDerivative.Status.PENDING
+            )
+            derivative.error = str(e)[:1000]
+            derivative.save()
+            return derivative
+
+        derivative.width, derivative.height = image.size
+        preview = DocumentImages._write(
+            image, DocumentImages.derived_name(derivative.source, 'view'),
+            DocumentImages.PREVIEW_MAX_SIZE, DocumentImages.PREVIEW_QUALITY
+        )
+        derivative.preview, derivative.preview_size = preview
+        derivative.thumbnail, _ = DocumentImages._write(
+            image, DocumentImages.derived_name(derivative.source, 'thumb'),
+            DocumentImages.THUMBNAIL_SIZE, DocumentImages.THUMBNAIL_QUALITY
+        )
+        derivative.status = ImageDerivative.Status.DONE
+        derivative.error = ''
+        derivative.save()
+        return derivative
+
+    @staticmethod
+    def _normalized(image):
+        """Applies the EXIF orientation and flattens transparency onto white"""
+        from PIL import Image, ImageOps
+
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+
+    @staticmethod
+    def _write(image, name, max_size, quality):
+        """Saves a downscaled JPEG copy at `name`, replacing any earlier one; returns (name, bytes)"""
+        from PIL import Image
+
+        copy = image.copy()
+        copy.thumbnail((max_size, max_size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        copy.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        saved = default_storage.save(name, ContentFile(buffer.getvalue()))
+        return saved, buffer.tell()
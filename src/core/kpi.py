@@ -0,0 +1,137 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import Count, Q
+from django.utils import timezone
+from core.utils.transactions import on_commit_batched
+
+
+class DailyKPIs:
+    """
+    Maintains DailyKPISnapshot rows.
+
+    Each source table is read with a single conditional-aggregate query, and a
+    change to one source only re-runs that source's query (refresh(sources=...)).
+    Signals (core.signals) refresh today's row after the triggering transaction
+    commits - once per source per transaction - and `manage.py refresh_kpi_snapshot`
+    refreshes everything periodically to pick up what signals cannot see: bulk
+    writes, related-row changes (e.g. an employee being archived) and the date
+    rolling over.
+    """
+
+    # source -> snapshot fields it fills
+    SOURCES = {
+        'users': ('total_employees', 'new_employees', 'active_employees'),
+        'attendance': ('present',),
+        'leave_days': ('on_leave',),
+        'leave_requests': ('pending_leave_requests',),
+        'manual_punches': ('pending_manual_punches',),
+        'documents': ('expiring_documents',),
+    }
+
+    # model label -> sources it feeds; wired to post_save/post_delete in core.signals.
+    # LeaveDay rows are bulk-created by LeaveDay.sync after the request is saved, so
+    # sync marks 'leave_days' itself once the rows are in place.
+    MODEL_SOURCES = {
+        'users.CustomUser': ('users',),
+        'payroll.AttendanceLog': ('attendance',),
+        'leaves.LeaveRequest': ('leave_requests',),
+        'payroll.ManualPunchRequest': ('manual_punches',),
+        'employees.DocumentVault': ('documents',),
+    }
+    # Further sources a delete changes: a request's LeaveDay rows go with it (cascade)
+    MODEL_DELETE_SOURCES = {
+        'leaves.LeaveRequest': ('leave_days',),
+    }
+
+    EXPIRY_WINDOW_DAYS = 30
+
+    @staticmethod
+    def _users(day):
+        from django.contrib.auth import get_user_model
+        return get_user_model().objects.filter(role__iexact='EMPLOYEE', date_joined__date__lte=day).aggregate(
+            total_employees=Count('pk'),
+            new_employees=Count('pk', filter=Q(date_joined__year=day.year, date_joined__month=day.month)),
+            active_employees=Count('pk', filter=Q(status='ACTIVE')),
+        )
+
+    @staticmethod
+    def _attendance(day):
+        from payroll.models import AttendanceLog
+        return AttendanceLog.objects.filter(date=day).aggregate(present=Count('pk', filter=Q(is_absent=False)))
+
+    @staticmethod
+    def _leave_days(day):
+        from leaves.models import LeaveDay, LeaveRequest
+        return LeaveDay.objects.filter(date=day).aggregate(on_leave=Count(
+            'leave_request', distinct=True,
+            filter=Q(
+                leave_request__status__in=[LeaveRequest.Status.APPROVED, LeaveRequest.Status.HR_PROCESSED],
+                employee__is_active=True,
+            ) & ~Q(employee__status='ARCHIVED'),
+        ))
+
+    @staticmethod
+    def _leave_requests(day):
+        from leaves.models import LeaveRequest
+        return LeaveRequest.objects.filter(status=LeaveRequest.Status.PENDING).aggregate(pending_leave_requests=Count(
+            'pk', filter=Q(employee__is_active=True) & ~Q(employee__status='ARCHIVED'),
+        ))
+
+    @staticmethod
+    def _manual_punches(day):
+        from payroll.models import ManualPunchRequest
+        return ManualPunchRequest.objects.filter(status=ManualPunchRequest.Status.PENDING).aggregate(pending_manual_punches=Count(
+            'pk', filter=Q(employee__is_active=True) & ~Q(employee__status='ARCHIVED'),
+        ))
+
+    @staticmethod
+    def _documents(day):
+        from employees.models import DocumentVault
+        return DocumentVault.objects.filter(
+            expiry_date__range=(day, day + timedelta(days=DailyKPIs.EXPIRY_WINDOW_DAYS))
+        ).aggregate(expiring_documents=Count('pk'))
+
+    @staticmethod
+    def refresh(day=None, sources=None):
+        """Recomputes the given sources (default: all) for `day` and saves the row"""
+        from .models import DailyKPISnapshot
+        day = day or timezone.localdate()
+        sources = list(DailyKPIs.SOURCES) if sources is None else sources
+
+        values = {}
+        for source in sources:
+            values.update(getattr(DailyKPIs, f'_{source}')(day))
+
+        snapshot, created = DailyKPISnapshot.objects.get_or_create(date=day, defaults=values)
+        if not created:
+            for field, value in values.items():
+                setattr(snapshot, field, value)
+        snapshot.attendance_rate = (
+            round(Decimal(snapshot.present * 100) / snapshot.active_employees, 1) if snapshot.active_employees else Decimal('0')
+        )
+        snapshot.save()
+        return snapshot
+
+    @staticmethod
+    def get(day=None):
+        """The snapshot for `day`, built in full on first use"""
+        from .models import DailyKPISnapshot
+        day = day or timezone.localdate()
+        return DailyKPISnapshot.objects.filter(date=day).first() or DailyKPIs.refresh(day)
+
+    @staticmethod
+    def trend(days=30, end=None):
+        """Snapshots for the last `days` days up to `end` (inclusive), oldest first"""
+        from .models import DailyKPISnapshot
+        end = end or timezone.localdate()
+        return list(DailyKPISnapshot.objects.filter(date__range=(end - timedelta(days=days - 1), end)).order_by('date'))
+
+    @staticmethod
+    def mark_dirty(*sources):
+        """
+        Refreshes today's row for `sources` once the current transaction commits.
+        All writes in one transaction share a single refresh.
+        """
+        on_commit_batched('daily_kpis', sources, lambda queued: DailyKPIs.refresh(
+            sources=[source for source in DailyKPIs.SOURCES if source in queued]
+        ))
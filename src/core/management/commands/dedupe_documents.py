@@ -0,0 +1,103 @@
+import os
+import shutil
+from collections import Counter
+from django.core.management.base import BaseCommand
+from core.models import StoredFile
+from core.storage import content_addressed_fields
+from core.utils.pagination import iter_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        "Move existing uploads into content-addressed storage: every referenced file is renamed "
+        "to its SHA-256, duplicates collapse onto one copy and StoredFile reference counts are rebuilt"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without touching files or rows")
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        renamed = {}      # old name -> content name, shared by every field so cross-model duplicates fold too
+        targets = set()
+        superseded = {}     # old name -> storage, for files whose content now lives under a content name
+        missing = duplicates = 0
+        stats = Counter()
+
+        for model, field_name in content_addressed_fields():
+            storage = model._meta.get_field(field_name).storage
+            label = f"{model._meta.label}.{field_name}"
+            rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True}).only('pk', field_name)
+
+            for chunk in iter_chunks(rows, options['chunk_size']):
+                for obj in chunk:
+                    name = getattr(obj, field_name).name
+                    if storage.is_content_name(name):
+                        continue
+                    target = renamed.get(name)
+                    if target is None:
+                        if not storage.exists(name):
+                            missing += 1
+                            self.stderr.write(f"  missing file for {label} #{obj.pk}: {name}")
+                            continue
+                        with storage.open(name, 'rb') as fh:
+                            target = storage.content_name(name, storage.hash_content(fh))
+                        if storage.exists(target) or target in targets:
+                            superseded[name] = storage
+                            duplicates += 1
+                            stats['bytes_freed'] += storage.size(name)
+                        else:
+                            if not dry_run:
+                                # Copy first, remove the old name only after every row is repointed,
+                                # so an interrupted run can simply be started again
+                                os.makedirs(os.path.dirname(storage.path(target)), exist_ok=True)
+                                shutil.copy2(storage.path(name), storage.path(target))
+                            superseded[name] = storage
+                        renamed[name] = target
+                        targets.add(target)
+                    stats[label] += 1
+                    if not dry_run:
+                        # queryset update: no audit/signal noise for a storage-level rename
+                        model.objects.filter(pk=obj.pk).update(**{field_name: target})
+
+        if not dry_run:
+            for name, storage in superseded.items():
+                # Unreferenced now that every row points at the content name
+                storage.delete(name)
+            self.recount()
+
+        for label, count in sorted(stats.items()):
+            if label != 'bytes_freed':
+                self.stdout.write(f"{label}: {count} row(s) {'would be ' if dry_run else ''}repointed")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(renamed)} file(s) {'to fold' if dry_run else 'folded'}, {duplicates} duplicate(s), "
+            f"{stats['bytes_freed'] / 1048576:.1f} MB {'reclaimable' if dry_run else 'reclaimed'}, {missing} missing"
+        ))
+
+    def recount(self):
+        """Sets StoredFile.ref_count to the number of rows pointing at each content name"""
+        refs = Counter()
+        storages = {}
+        for model, field_name in content_addressed_fields():
+            storage = model._meta.get_field(field_name).storage
+            names = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True}).values_list(field_name, flat=True)
+            for name in names.iterator():
+                if storage.is_content_name(name):
+                    refs[name] += 1
+                    storages[name] = storage
+
+        existing = StoredFile.objects.in_bulk(refs, field_name='name')
+        for name, stored in existing.items():
+            stored.ref_count = refs[name]
+        StoredFile.objects.bulk_update(existing.values(), ['ref_count'], batch_size=1000)
+        StoredFile.objects.bulk_create([
+            StoredFile(
+                name=name, ref_count=count, size=storages[name].size(name),
+                sha256=os.path.basename(name).split('.')[0],
+            )
+            for name, count in refs.items() if name not in existing and storages[name].exists(name)
+        ], batch_size=1000)
+        stale = StoredFile.objects.exclude(name__in=list(refs)).filter(ref_count__gt=0).update(ref_count=0)
+        if stale:
+            self.stdout.write(f"{stale} stored file(s) no longer referenced (ref_count reset to 0)")
@@ -0,0 +1,66 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from core.models import AuditLog
+from core.utils.audit_export import AuditExporter, filter_audit_logs
+
+
+class Command(BaseCommand):
+    help = "Stream the audit trail to a CSV/JSONL file (optionally gzipped) for compliance archiving"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', default='', help="Start date (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='date_to', default='', help="End date inclusive (YYYY-MM-DD)")
+        parser.add_argument('--format', dest='export_format', choices=list(AuditExporter.FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--module', default='')
+        parser.add_argument('--user', default='', help="Only entries by this user id")
+        parser.add_argument('--output', '-o', default='-', help="Output file path, '-' for stdout")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        logs, filters = filter_audit_logs({
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+            'module': options['module'],
+            'user': options['user'],
+        })
+
+        # Freeze the upper bound so the EXPORT entry below is not part of its own export
+        last = AuditLog.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        logs = logs.filter(pk__lte=last)
+
+        stream = AuditExporter(logs, export_format=options['export_format'], chunk_size=options['chunk_size']).stream()
+        if options['gzip']:
+            stream = AuditExporter.gzip(stream)
+
+        output = options['output']
+        try:
+            out = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        except OSError as e:
+            raise CommandError(f"Cannot open {output}: {e}")
+
+        written = 0
+        try:
+            for chunk in stream:
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+
+        AuditLog.log(
+            user=None,
+            action=AuditLog.Action.EXPORT,
+            changes={
+                'format': options['export_format'],
+                'gzip': options['gzip'],
+                'filters': {k: v for k, v in filters.items() if v},
+                'output': output,
+                'bytes': written,
+            },
+            module=AuditLog.Module.SYSTEM,
+            object_repr="Audit Trail Export"
+        )
+
+        if output != '-':
+            self.stdout.write(self.style.SUCCESS(f"Wrote {written} bytes to {output}"))
@@ -0,0 +1,54 @@
+import time
+from django.core.management.base import BaseCommand
+from core.imaging import DocumentImages
+from core.models import ImageDerivative
+from core.storage import content_addressed_fields
+
+
+class Command(BaseCommand):
+    help = (
+        "Image worker: generates viewing copies and thumbnails for uploaded documents. "
+        "Runs until stopped; use --once from cron instead of keeping it running"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Drain the queue once and exit")
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--sleep', type=float, default=5.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--backfill', action='store_true', help="Queue every existing image upload first")
+        parser.add_argument('--retry-failed', action='store_true', help="Put FAILED rows back in the queue first")
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            count = ImageDerivative.objects.filter(status=ImageDerivative.Status.FAILED).update(
+                status=ImageDerivative.Status.PENDING, attempts=0
+            )
+            self.stdout.write(f"{count} failed item(s) queued again")
+
+        if options['backfill']:
+            self.stdout.write(f"{self.backfill()} existing image(s) queued")
+
+        total = 0
+        while True:
+            handled = DocumentImages.process_pending(limit=options['batch_size'])
+            total += handled
+            if handled:
+                self.stdout.write(f"Processed {handled} image(s)")
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} image(s) processed"))
+
+    def backfill(self):
+        known = set(ImageDerivative.objects.values_list('source', flat=True))
+        names = set()
+        for model, field_name in content_addressed_fields():
+            for name in model.objects.exclude(**{field_name: ''}).values_list(field_name, flat=True).iterator():
+                if name and name not in known and DocumentImages.is_image(name):
+                    names.add(name)
+        ImageDerivative.objects.bulk_create(
+            [ImageDerivative(source=name) for name in sorted(names)], batch_size=1000, ignore_conflicts=True
+        )
+        return len(names)
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from core.models import AuditLog, AuditLogTerm
+
+
+class Command(BaseCommand):
+    help = "Backfill AuditLog.summary and the AuditLogTerm search index for existing audit rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--all', action='store_true', help="Recompute rows that already have a summary")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        qs = AuditLog.objects.select_related('user', 'content_type').order_by('pk')
+        if not options['all']:
+            qs = qs.filter(summary='')
+
+        last_pk = 0
+        processed = 0
+        while True:
+            chunk = list(qs.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+
+            terms = []
+            for log in chunk:
+                try:
+                    log.summary = (log.description or "")[:255]
+                except Exception:
+                    log.summary = ""
+                terms.extend(
+                    AuditLogTerm(log=log, term=t)
+                    for t in AuditLogTerm.tokenize(f"{log.object_repr} {log.summary}")
+                )
+
+            # bulk_update skips save()/signals, so terms are rebuilt explicitly
+            AuditLog.objects.bulk_update(chunk, ['summary'])
+            AuditLogTerm.objects.filter(log__in=chunk).delete()
+            AuditLogTerm.objects.bulk_create(terms, batch_size=chunk_size)
+
+            last_pk = chunk[-1].pk
+            processed += len(chunk)
+            self.stdout.write(f"Indexed {processed} audit entries...")
+
+        self.stdout.write(self.style.SUCCESS(f"Done. {processed} audit entries indexed."))
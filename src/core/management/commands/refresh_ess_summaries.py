@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.dashboard import DashboardWidgets
+from core.ess import ESSDashboard
+from core.utils.pagination import iter_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        "Build today's self-service dashboard summaries for every active employee. "
+        "Run early each morning so the first visits of the day are served from the precomputed rows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        from core.models import EmployeeDashboardSummary
+        today = timezone.localdate()
+        employees = get_user_model().objects.filter(is_active=True).exclude(status='ARCHIVED').order_by('pk')
+
+        built = 0
+        for chunk in iter_chunks(employees, options['chunk_size']):
+            current = set(EmployeeDashboardSummary.objects.filter(
+                employee__in=chunk, as_of=today
+            ).values_list('employee_id', flat=True))
+            for employee in chunk:
+                # Admin/HR users get the admin dashboard instead
+                if employee.pk in current or DashboardWidgets.can_view_dashboard(employee):
+                    continue
+                EmployeeDashboardSummary.objects.update_or_create(
+                    employee=employee, defaults={'as_of': today, 'data': ESSDashboard.build(employee, today)}
+                )
+                built += 1
+        self.stdout.write(self.style.SUCCESS(f"{built} summar{'y' if built == 1 else 'ies'} built for {today}"))
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.kpi import DailyKPIs
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily KPI snapshot (dashboard statistics and trend). "
+        "Run every few minutes and just after midnight; signals keep it current in between"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', default='', help="Refresh this day (YYYY-MM-DD) instead of today")
+        parser.add_argument('--backfill-days', type=int, default=0,
+                            help="Also build the rows for this many earlier days. Status-based figures "
+                                 "(active employees, pending requests) use today's state")
+
+    def handle(self, *args, **options):
+        day = timezone.localdate()
+        if options['date']:
+            try:
+                day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD")
+
+        for offset in range(options['backfill_days'], -1, -1):
+            snapshot = DailyKPIs.refresh(day - timedelta(days=offset))
+            self.stdout.write(
+                f"{snapshot.date}: {snapshot.total_employees} employees, {snapshot.present} present "
+                f"({snapshot.attendance_rate}%), {snapshot.on_leave} on leave"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{options['backfill_days'] + 1} snapshot(s) refreshed"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from core.outbox import EmailOutbox
+
+
+class Command(BaseCommand):
+    help = "Outbox worker: delivers queued emails over a persistent SMTP connection, retrying with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Send what is due now and exit (for cron)")
+        parser.add_argument('--batch-size', type=int, default=EmailOutbox.BATCH_SIZE)
+        parser.add_argument('--sleep', type=float, default=5.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--purge-sent-days', type=int, default=0,
+                            help="First delete delivered messages older than this many days")
+
+    def handle(self, *args, **options):
+        if options['purge_sent_days']:
+            self.stdout.write(f"{EmailOutbox.purge(options['purge_sent_days'])} delivered message(s) purged")
+
+        sent, failed = EmailOutbox.run(
+            once=options['once'], batch_size=options['batch_size'],
+            idle_sleep=options['sleep'], log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Done: {sent} sent, {failed} failed attempt(s)"))
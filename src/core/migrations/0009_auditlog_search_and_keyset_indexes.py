@@ -0,0 +1,42 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0008_alter_auditlog_module'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditLogTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='summary',
+            field=models.CharField(blank=True, help_text='Stored human-readable description (for search)', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['content_type', 'object_id', '-timestamp'], name='core_auditl_content_ae0697_idx'),
+        ),
+        migrations.AddField(
+            model_name='auditlogterm',
+            name='log',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='core.auditlog'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlogterm',
+            index=models.Index(fields=['term', 'log'], name='core_auditl_term_7e4b4f_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_email_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyKPISnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('total_employees', models.PositiveIntegerField(default=0)),
+                ('new_employees', models.PositiveIntegerField(default=0, help_text='Joined in the month of this date')),
+                ('active_employees', models.PositiveIntegerField(default=0)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('attendance_rate', models.DecimalField(decimal_places=1, default=0, max_digits=5)),
+                ('on_leave', models.PositiveIntegerField(default=0)),
+                ('pending_leave_requests', models.PositiveIntegerField(default=0)),
+                ('pending_manual_punches', models.PositiveIntegerField(default=0)),
+                ('expiring_documents', models.PositiveIntegerField(default=0, help_text='Expiring within 30 days')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
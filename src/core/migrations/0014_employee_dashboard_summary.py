@@ -0,0 +1,26 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:52
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_daily_kpi_snapshot'),
+        ('users', '0015_employee_search_terms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeDashboardSummary',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dashboard_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('as_of', models.DateField()),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
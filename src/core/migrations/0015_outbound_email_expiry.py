@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 10:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_employee_dashboard_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, help_text='Not sent after this, e.g. when it carries a one-time code', null=True),
+        ),
+    ]
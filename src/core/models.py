@@ -1,8 +1,11 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.conf import settings
+from django.utils import timezone
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from datetime import datetime
+import re
 
 class CompanySettings(models.Model):
     name = models.CharField(max_length=100, default="Nexteons")
@@ -44,6 +47,9 @@ class CompanySettings(models.Model):
     def save(self, *args, **kwargs):
         self.pk = 1 # Force singleton
         super(CompanySettings, self).save(*args, **kwargs)
+        from django.core.cache import cache
+        from core.context_processors import CONTEXT_CACHE_KEY
+        cache.delete(CONTEXT_CACHE_KEY)
 
     @classmethod
     def load(cls):
@@ -136,6 +142,7 @@ class AuditLog(models.Model):
     
     # Details
     object_repr = models.CharField(max_length=200, blank=True, help_text="String representation of the object")
+    summary = models.CharField(max_length=255, blank=True, help_text="Stored human-readable description (for search)")
     changes = models.JSONField(null=True, blank=True, help_text="What changed (old_value/new_value)")
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
@@ -150,10 +157,27 @@ class AuditLog(models.Model):
             models.Index(fields=['user', '-timestamp']),
             models.Index(fields=['action', '-timestamp']),
             models.Index(fields=['module', '-timestamp']),
+            models.Index(fields=['content_type', 'object_id', '-timestamp']),
         ]
     
     def __str__(self):
         return f"{self.user} - {self.action} - {self.object_repr or 'System'} at {self.timestamp}"
+
+    def save(self, *args, **kwargs):
+        # Freeze the description at write time so it can be searched with an index
+        if not self.summary:
+            try:
+                self.summary = (self.description or "")[:255]
+            except Exception:
+                self.summary = ""
+        super().save(*args, **kwargs)
+        self.index_terms()
+
+    def index_terms(self):
+        """(Re)build the search terms for this entry from object_repr and summary"""
+        terms = AuditLogTerm.tokenize(f"{self.object_repr} {self.summary}")
+        AuditLogTerm.objects.filter(log=self).delete()
+        AuditLogTerm.objects.bulk_create([AuditLogTerm(log=self, term=t) for t in terms])
     
     def format_changes(self):
         if not self.changes:
@@ -361,6 +385,9 @@ class AuditLog(models.Model):
         if self.module == self.Module.SYSTEM and self.action == self.Action.UPDATE:
              return f"{user_name} updated System Settings."
 
+        if self.module == self.Module.SYSTEM and self.action == self.Action.EXPORT:
+             return f"{user_name} exported the audit trail."
+
         # 5. Meetings Management
         if self.module == self.Module.MEETINGS:
             meeting_title = obj_name
@@ -468,3 +495,207 @@ class AuditLog(models.Model):
         log_entry.save()
         return log_entry
 
+
+
+class AuditLogTerm(models.Model):
+    """
+    Inverted index over AuditLog.object_repr and AuditLog.summary.
+    One row per distinct lower-cased word, so term/prefix search is an index range scan.
+    """
+    MAX_TERMS = 40
+
+    log = models.ForeignKey(AuditLog, on_delete=models.CASCADE, related_name='terms')
+    term = models.CharField(max_length=50)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'log']),
+        ]
+
+    def __str__(self):
+        return self.term
+
+    @classmethod
+    def tokenize(cls, text):
+        """Split text into distinct lower-case words (order preserved)"""
+        seen = []
+        for word in re.split(r'[^0-9a-z@._-]+', str(text or '').lower()):
+            word = word.strip('._-')
+            if len(word) < 2 or word in seen:
+                continue
+            seen.append(word[:50])
+            if len(seen) >= cls.MAX_TERMS:
+                break
+        return seen
+
+
+class StoredFile(models.Model):
+    """
+    Reference count for a file in content-addressed storage (core.storage).
+    Identical uploads share one file on disk; it is removed only when the last
+    row that points at it lets go.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+    @classmethod
+    def acquire(cls, name, sha256, size):
+        """Adds one reference, creating the record for a first upload"""
+        stored, created = cls.objects.get_or_create(name=name, defaults={'sha256': sha256, 'size': size, 'ref_count': 1})
+        if not created:
+            cls.objects.filter(pk=stored.pk).update(ref_count=models.F('ref_count') + 1)
+
+    @classmethod
+    def release(cls, name):
+        """
+        Drops one reference. Returns the references left, or None when the file
+        is not tracked (uploaded before content addressing).
+        """
+        from django.db import transaction
+        with transaction.atomic():
+            stored = cls.objects.select_for_update().filter(name=name).first()
+            if stored is None:
+                return None
+            stored.ref_count = max(0, stored.ref_count - 1)
+            if stored.ref_count:
+                stored.save(update_fields=['ref_count'])
+            else:
+                stored.delete()
+            return stored.ref_count
+
+
+class ImageDerivative(models.Model):
+    """
+    Viewing copy and thumbnail generated for an uploaded image (core.imaging).
+    Keyed by the stored file name, so identical uploads share one set of derivatives.
+    Rows are queued on upload and filled in by the process_document_images worker.
+    """
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        DONE = "DONE", "Done"
+        SKIPPED = "SKIPPED", "Not an image"
+        FAILED = "FAILED", "Failed"
+
+    source = models.CharField(max_length=255, unique=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    preview = models.CharField(max_length=255, blank=True)
+    thumbnail = models.CharField(max_length=255, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    source_size = models.PositiveBigIntegerField(default=0)
+    preview_size = models.PositiveBigIntegerField(default=0)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.source} ({self.status})"
+
+    @property
+    def is_ready(self):
+        return self.status == self.Status.DONE
+
+    @property
+    def preview_url(self):
+        from django.core.files.storage import default_storage
+        return default_storage.url(self.preview) if self.preview else ''
+
+    @property
+    def thumbnail_url(self):
+        from django.core.files.storage import default_storage
+        return default_storage.url(self.thumbnail) if self.thumbnail else ''
+
+
+class OutboundEmail(models.Model):
+    """
+    Transactional email outbox (core.outbox).
+    Request handlers only insert a row - in the same transaction as the change
+    that triggered it - and the send_queued_email worker delivers it.
+    """
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        SENT = "SENT", "Sent"
+        FAILED = "FAILED", "Failed"
+
+    category = models.CharField(max_length=50, blank=True, help_text="What triggered the mail, e.g. password_reset")
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    bcc = models.JSONField(default=list, blank=True)
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(null=True, blank=True, help_text="Not sent after this, e.g. when it carries a one-time code")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
+class DailyKPISnapshot(models.Model):
+    """
+    Workforce KPIs for one day (core.kpi.DailyKPIs).
+    Today's row is kept current by signals and the refresh_kpi_snapshot job;
+    earlier rows stay as they were, which gives the dashboard its trend series.
+    """
+    date = models.DateField(unique=True)
+
+    total_employees = models.PositiveIntegerField(default=0)
+    new_employees = models.PositiveIntegerField(default=0, help_text="Joined in the month of this date")
+    active_employees = models.PositiveIntegerField(default=0)
+    present = models.PositiveIntegerField(default=0)
+    attendance_rate = models.DecimalField(max_digits=5, decimal_places=1, default=0)
+    on_leave = models.PositiveIntegerField(default=0)
+    pending_leave_requests = models.PositiveIntegerField(default=0)
+    pending_manual_punches = models.PositiveIntegerField(default=0)
+    expiring_documents = models.PositiveIntegerField(default=0, help_text="Expiring within 30 days")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"KPIs {self.date}"
+
+    @property
+    def new_employee_percentage(self):
+        if not self.total_employees or not self.new_employees:
+            return 0
+        return round((self.new_employees / self.total_employees) * 100, 1)
+
+
+class EmployeeDashboardSummary(models.Model):
+    """
+    Precomputed self-service dashboard for one employee (core.ess.ESSDashboard).
+    Each section is refreshed when its source rows change; a row from an
+    earlier day is rebuilt in full on the next visit.
+    """
+    employee = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='dashboard_summary'
+    )
+    as_of = models.DateField()
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Dashboard summary {self.employee_id} ({self.as_of})"
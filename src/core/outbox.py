@@ -0,0 +1,164 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+
+class EmailOutbox:
+    """
+    Transactional outbox for outgoing mail.
+
+    enqueue() is all a request handler does: one INSERT, committed or rolled
+    back together with the handler's own changes. The send_queued_email worker
+    then delivers due messages in batches over one SMTP connection that stays
+    open while there is work, retries failures with exponential backoff and
+    records the outcome on each row. A message with expires_at (one-time codes)
+    is given up as FAILED once it can no longer arrive in time.
+    """
+    BATCH_SIZE = 50
+    MAX_ATTEMPTS = 6
+    RETRY_BASE_SECONDS = 60
+    RETRY_MAX_SECONDS = 6 * 60 * 60
+
+    @staticmethod
+    def enqueue(subject, body, to, from_email=None, html_body='', bcc=None, category='', expires_at=None):
+        from core.models import OutboundEmail
+        return OutboundEmail.objects.create(
+            category=category,
+            subject=subject[:255],
+            body=body,
+            html_body=html_body,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to=[to] if isinstance(to, str) else list(to),
+            bcc=list(bcc or []),
+            expires_at=expires_at,
+        )
+
+    @staticmethod
+    def retry_delay(attempts):
+        """1 min, 2 min, 4 min ... capped at RETRY_MAX_SECONDS"""
+        seconds = EmailOutbox.RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1))
+        return timedelta(seconds=min(seconds, EmailOutbox.RETRY_MAX_SECONDS))
+
+    @staticmethod
+    def due(now=None):
+        from core.models import OutboundEmail
+        return OutboundEmail.objects.filter(
+            status=OutboundEmail.Status.PENDING, next_attempt_at__lte=now or timezone.now()
+        ).order_by('next_attempt_at', 'pk')
+
+    @staticmethod
+    def as_message(email, connection=None):
+        message = EmailMultiAlternatives(
+            email.subject, email.body, email.from_email, email.to, bcc=email.bcc, connection=connection
+        )
+        if email.html_body:
+            message.attach_alternative(email.html_body, 'text/html')
+        return message
+
+    @staticmethod
+    def send_batch(connection, batch_size=None):
+        """
+        Sends up to batch_size due messages over an already open connection.
+        Rows are claimed with SKIP LOCKED so several workers can share the queue.
+        Returns (sent, failed).
+        """
+        from core.models import OutboundEmail
+
+        sent = failed = 0
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(EmailOutbox.due(now).select_for_update(skip_locked=True)[:batch_size or EmailOutbox.BATCH_SIZE])
+            for email in batch:
+                if email.expires_at and email.expires_at <= now:
+                    failed += 1
+                    email.status = OutboundEmail.Status.FAILED
+                    email.last_error = f"Expired before delivery. {email.last_error}".strip()
+                    continue
+                email.attempts += 1
+                try:
+                    EmailOutbox.as_message(email, connection).send()
+                except Exception as e:
+                    failed += 1
+                    email.last_error = f"{type(e).__name__}: {e}"[:2000]
+                    retry_at = timezone.now() + EmailOutbox.retry_delay(email.attempts)
+                    if email.attempts >= EmailOutbox.MAX_ATTEMPTS or (email.expires_at and retry_at >= email.expires_at):
+                        email.status = OutboundEmail.Status.FAILED
+                    else:
+                        email.next_attempt_at = retry_at
+                    if EmailOutbox._is_connection_error(e):
+                        # Drop the dead connection; the next send() reconnects
+                        connection.close()
+                    continue
+                sent += 1
+                email.status = OutboundEmail.Status.SENT
+                email.sent_at = timezone.now()
+                email.last_error = ''
+            OutboundEmail.objects.bulk_update(
+                batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+            )
+        return sent, failed
+
+    @staticmethod
+    def _is_connection_error(error):
+        # Not OSError: every SMTPException is one, including a single rejected recipient
+        import smtplib
+        return isinstance(error, (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError))
+
+    @staticmethod
+    def run(once=False, batch_size=None, idle_sleep=5.0, log=None):
+        """
+        Worker loop. The SMTP connection is opened when there is work, reused
+        across batches and closed again when the queue runs dry.
+        Returns the totals (sent, failed).
+        """
+        import time
+        totals = [0, 0]
+        connection = None
+        try:
+            while True:
+                if not EmailOutbox.due().exists():
+                    if connection is not None:
+                        connection.close()
+                        connection = None
+                    if once:
+                        break
+                    time.sleep(idle_sleep)
+                    continue
+
+                if connection is None:
+                    connection = get_connection()
+                try:
+                    # No-op while open; reconnects after a dropped connection
+                    connection.open()
+                except Exception as e:
+                    if log:
+                        log(f"Cannot connect to the mail server: {e}")
+                    if once:
+                        break
+                    time.sleep(idle_sleep)
+                    continue
+                sent, failed = EmailOutbox.send_batch(connection, batch_size)
+                totals[0] += sent
+                totals[1] += failed
+                if log:
+                    log(f"Sent {sent}, failed {failed}")
+                if once and not sent:
+                    # Everything that was due failed and is now waiting for its retry
+                    break
+                if not (sent or failed):
+                    # Due rows are all claimed by another worker
+                    time.sleep(idle_sleep)
+        finally:
+            if connection is not None:
+                connection.close()
+        return tuple(totals)
+
+    @staticmethod
+    def purge(days):
+        """Deletes delivered messages older than `days` (they may contain one-time codes)"""
+        from core.models import OutboundEmail
+        cutoff = timezone.now() - timedelta(days=days)
+        deleted, _ = OutboundEmail.objects.filter(status=OutboundEmail.Status.SENT, sent_at__lt=cutoff).delete()
+        return deleted
@@ -2,7 +2,7 @@
 Signal handlers for automatic audit logging
 Tracks model-level changes with old/new value comparison
 """
-from django.db.models.signals import post_save, post_delete, pre_save
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
 from django.db.backends.signals import connection_created
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
@@ -118,7 +118,7 @@ def log_model_save(sender, instance, created, **kwargs):
     
     # Skip certain models or internal technical records
     model_name = sender.__name__.lower()
-    excluded = ['session', 'contenttype', 'permission', 'logentry', 'auditlog', 'migration', 'leavebalance', 'leavetype', 'rawpunch', 'attendancelog']
+    excluded = ['session', 'contenttype', 'permission', 'logentry', 'auditlog', 'migration', 'leavebalance', 'leavetype', 'rawpunch', 'attendancelog', 'snapshot', 'ledger', 'leaveday', 'searchterm', 'storedfile', 'imagederivative', 'outboundemail', 'dashboardsummary', 'calendarfeed', 'rollup']
     if any(ex in model_name for ex in excluded):
         return
     
@@ -165,7 +165,7 @@ def log_model_delete(sender, instance, **kwargs):
     
     # Skip certain models
     model_name = sender.__name__.lower()
-    excluded = ['session', 'contenttype', 'permission', 'logentry', 'auditlog', 'migration', 'leavebalance', 'leavetype']
+    excluded = ['session', 'contenttype', 'permission', 'logentry', 'auditlog', 'migration', 'leavebalance', 'leavetype', 'snapshot', 'ledger', 'leaveday', 'searchterm', 'storedfile', 'imagederivative', 'outboundemail', 'dashboardsummary', 'calendarfeed', 'rollup']
     if any(ex in model_name for ex in excluded):
         return
     
@@ -186,3 +186,153 @@ def log_model_delete(sender, instance, **kwargs):
         )
     except Exception as e:
         print(f"Error logging delete: {e}")
+
+
+def _connect_dashboard_invalidation():
+    """Bump the cached admin dashboard widgets (core.dashboard) when the data behind them changes"""
+    from django.apps import apps
+    from .dashboard import DashboardWidgets
+
+    def make_handler(widgets):
+        def handler(sender, instance, update_fields=None, **kwargs):
+            if update_fields is not None and set(update_fields) <= {'last_login'}:
+                return
+            DashboardWidgets.invalidate(*widgets)
+        return handler
+
+    for label, widgets in DashboardWidgets.DEPENDENCIES.items():
+        model = apps.get_model(label)
+        handler = make_handler(widgets)
+        post_save.connect(handler, sender=model, weak=False, dispatch_uid=f'dashboard_widgets_save_{label}')
+        post_delete.connect(handler, sender=model, weak=False, dispatch_uid=f'dashboard_widgets_delete_{label}')
+
+
+_connect_dashboard_invalidation()
+
+
+def _connect_kpi_refresh():
+    """Keep today's DailyKPISnapshot (core.kpi) current as its source tables change"""
+    from django.apps import apps
+    from .kpi import DailyKPIs
+
+    def make_handler(sources):
+        def handler(sender, instance, update_fields=None, raw=False, **kwargs):
+            if raw or (update_fields is not None and set(update_fields) <= {'last_login'}):
+                return
+            DailyKPIs.mark_dirty(*sources)
+        return handler
+
+    for label, sources in DailyKPIs.MODEL_SOURCES.items():
+        model = apps.get_model(label)
+        post_save.connect(make_handler(sources), sender=model, weak=False, dispatch_uid=f'daily_kpis_save_{label}')
+        delete_sources = sources + DailyKPIs.MODEL_DELETE_SOURCES.get(label, ())
+        post_delete.connect(make_handler(delete_sources), sender=model, weak=False, dispatch_uid=f'daily_kpis_delete_{label}')
+
+
+_connect_kpi_refresh()
+
+
+def _connect_ess_summary_refresh():
+    """Keep the precomputed self-service dashboards (core.ess) in step with their source rows"""
+    from django.apps import apps
+    from django.db.models.signals import m2m_changed
+    from .ess import ESSDashboard
+
+    def employees_of(instance):
+        if instance._meta.label == 'users.CustomUser':
+            return {instance.pk}
+        if instance._meta.label == 'meetings.Meeting':
+            return {instance.organizer_id, *instance.participants.values_list('pk', flat=True)}
+        return {instance.employee_id}
+
+    def make_handler(sections):
+        def handler(sender, instance, update_fields=None, raw=False, **kwargs):
+            if raw or (update_fields is not None and set(update_fields) <= {'last_login'}):
+                return
+            ESSDashboard.mark_dirty(employees_of(instance), sections)
+        return handler
+
+    for label, sections in ESSDashboard.MODEL_SECTIONS.items():
+        model = apps.get_model(label)
+        handler = make_handler(sections)
+        post_save.connect(handler, sender=model, weak=False, dispatch_uid=f'ess_summary_save_{label}')
+        # pre_delete: meeting participants are gone by post_delete
+        pre_delete.connect(handler, sender=model, weak=False, dispatch_uid=f'ess_summary_delete_{label}')
+
+    def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+        if action not in ('post_add', 'post_remove', 'pre_clear'):
+            return
+        if reverse:
+            employees = {instance.pk}
+        elif action == 'pre_clear':
+            employees = set(instance.participants.values_list('pk', flat=True))
+        else:
+            employees = set(pk_set or ())
+        ESSDashboard.mark_dirty(employees, ('meetings',))
+
+    m2m_changed.connect(
+        participants_changed, sender=apps.get_model('meetings.Meeting').participants.through,
+        weak=False, dispatch_uid='ess_summary_meeting_participants'
+    )
+
+    def everybody(sender, **kwargs):
+        ESSDashboard.invalidate_all()
+
+    def holidays(sender, **kwargs):
+        ESSDashboard.invalidate_shared()
+
+    LeaveType, PublicHoliday = apps.get_model('leaves.LeaveType'), apps.get_model('core.PublicHoliday')
+    post_save.connect(everybody, sender=LeaveType, weak=False, dispatch_uid='ess_summary_leave_type_save')
+    post_delete.connect(everybody, sender=LeaveType, weak=False, dispatch_uid='ess_summary_leave_type_delete')
+    post_save.connect(holidays, sender=PublicHoliday, weak=False, dispatch_uid='ess_shared_holiday_save')
+    post_delete.connect(holidays, sender=PublicHoliday, weak=False, dispatch_uid='ess_shared_holiday_delete')
+
+
+_connect_ess_summary_refresh()
+
+
+def _connect_calendar_feed_invalidation():
+    """Move the versions of the iCalendar feed sections (meetings.ics) when their rows change"""
+    from django.apps import apps
+    from django.db.models.signals import m2m_changed
+    from meetings.ics import ICSFeed
+
+    Meeting = apps.get_model('meetings.Meeting')
+    LeaveRequest = apps.get_model('leaves.LeaveRequest')
+    PublicHoliday = apps.get_model('core.PublicHoliday')
+
+    def meeting_changed(sender, instance, raw=False, **kwargs):
+        if raw:
+            return
+        user_ids = {instance.organizer_id, *instance.participants.values_list('pk', flat=True)}
+        ICSFeed.invalidate(*(f'meetings:{pk}' for pk in user_ids))
+
+    def participants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+        if action not in ('post_add', 'post_remove', 'pre_clear'):
+            return
+        if reverse:
+            user_ids = {instance.pk}
+        elif action == 'pre_clear':
+            user_ids = set(instance.participants.values_list('pk', flat=True))
+        else:
+            user_ids = set(pk_set or ())
+        ICSFeed.invalidate(*(f'meetings:{pk}' for pk in user_ids))
+
+    def leave_changed(sender, instance, raw=False, **kwargs):
+        if not raw:
+            ICSFeed.invalidate(f'leaves:{instance.employee_id}')
+
+    def holidays_changed(sender, raw=False, **kwargs):
+        if not raw:
+            ICSFeed.invalidate('holidays')
+
+    post_save.connect(meeting_changed, sender=Meeting, weak=False, dispatch_uid='ics_meeting_save')
+    pre_delete.connect(meeting_changed, sender=Meeting, weak=False, dispatch_uid='ics_meeting_delete')
+    m2m_changed.connect(participants_changed, sender=Meeting.participants.through, weak=False, dispatch_uid='ics_meeting_participants')
+    post_save.connect(leave_changed, sender=LeaveRequest, weak=False, dispatch_uid='ics_leave_save')
+    post_delete.connect(leave_changed, sender=LeaveRequest, weak=False, dispatch_uid='ics_leave_delete')
+    post_save.connect(holidays_changed, sender=PublicHoliday, weak=False, dispatch_uid='ics_holiday_save')
+    post_delete.connect(holidays_changed, sender=PublicHoliday, weak=False, dispatch_uid='ics_holiday_delete')
+
+
+_connect_calendar_feed_invalidation()
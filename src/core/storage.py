@@ -0,0 +1,113 @@
+import hashlib
+import os
+import posixpath
+import re
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import models, transaction
+from django.utils.deconstruct import deconstructible
+
+# <root>/<aa>/<bb>/<sha256><ext>
+CONTENT_NAME_RE = re.compile(r'^(?:[^/]+/)?[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(\.[0-9a-z]+)?$')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that names files by the SHA-256 of their content.
+
+    'leave_documents/scan.jpg' is stored as 'leave_documents/3f/a2/3fa2...e1.jpg':
+    the first folder of upload_to is kept (secure_docs/ stays behind
+    serve_secure_document), two hash-prefix levels keep directories small, and an
+    upload whose content is already stored is not written again. Every upload
+    adds a reference on core.models.StoredFile and delete() drops one; the file
+    goes away with its last reference.
+    """
+
+    @staticmethod
+    def hash_content(content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def content_name(name, digest):
+        name = name.replace('\\', '/')
+        root = name.split('/', 1)[0] if '/' in name else ''
+        ext = os.path.splitext(name)[1].lower()
+        return posixpath.join(root, digest[:2], digest[2:4], digest + ext)
+
+    @staticmethod
+    def is_content_name(name):
+        return bool(name and CONTENT_NAME_RE.match(name))
+
+    def _save(self, name, content):
+        from core.models import StoredFile
+
+        digest = self.hash_content(content)
+        name = self.content_name(name, digest)
+        StoredFile.acquire(name, digest, content.size)
+        if not self.exists(name):
+            name = super()._save(name, content)
+        return name
+
+    def delete(self, name):
+        from core.imaging import DocumentImages
+        from core.models import StoredFile
+
+        if not name:
+            return
+        if StoredFile.release(name) in (None, 0):
+            super().delete(name)
+            DocumentImages.discard(name)
+
+
+document_storage_instance = ContentAddressedStorage()
+
+
+def document_storage():
+    """Storage callable for uploaded documents (kept out of migrations by being a callable)"""
+    return document_storage_instance
+
+
+def content_addressed_fields():
+    """(model, field name) for every FileField stored in content-addressed storage"""
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage):
+                yield model, field.name
+
+
+def release_file(field_file):
+    """Drops the reference held by a FieldFile once the surrounding transaction commits"""
+    if not field_file or not field_file.name:
+        return
+    storage, name = field_file.storage, field_file.name
+    transaction.on_commit(lambda: storage.delete(name))
+
+
+def note_upload(instance, field_name):
+    """
+    Call from pre_save: remembers that this save uploads a new file into field_name.
+    The upload adds a reference even when it is the same content under the same name,
+    which release_replaced() then has to give back.
+    """
+    uploaded = instance.__dict__.setdefault('_uploaded_fields', set())
+    uploaded.discard(field_name)
+    field_file = getattr(instance, field_name)
+    if field_file and not field_file._committed:
+        uploaded.add(field_name)
+
+
+def release_replaced(instance, field_name):
+    """Call from post_save: drops the saved row's reference on the file it held before"""
+    old = getattr(instance, '_old_instance', None)  # set by core.signals.store_old_instance
+    if not old:
+        return
+    old_file = getattr(old, field_name)
+    if not old_file:
+        return
+    uploaded = field_name in instance.__dict__.get('_uploaded_fields', ())
+    if uploaded or old_file.name != getattr(instance, field_name).name:
+        release_file(old_file)
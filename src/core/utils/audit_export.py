@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, time, timedelta
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from .pagination import iter_chunks
+
+
+def filter_audit_logs(params):
+    """
+    Applies the audit trail filters from a GET QueryDict (or a plain dict).
+    Shared by the log viewer, the streaming export and the export_audit_logs
+    command so all of them see the same rows.
+    Returns (queryset, selected_filters).
+    """
+    from core.models import AuditLog, AuditLogTerm
+    
+    filters = {
+        'module': params.get('module', ''),
+        'action': params.get('action', ''),
+        'user': params.get('user', ''),
+        'content_type': params.get('content_type', ''),
+        'object_id': params.get('object_id', '').strip(),
+        'date_from': params.get('date_from', ''),
+        'date_to': params.get('date_to', ''),
+        'q': params.get('q', '').strip(),
+    }
+    
+    logs = AuditLog.objects.select_related('user', 'content_type')
+    
+    # Every filter is an equality/range on a leading column of one of the
+    # composite (..., -timestamp) indexes, so the keyset scan stays indexed.
+    if filters['module']:
+        logs = logs.filter(module=filters['module'])
+    if filters['action']:
+        logs = logs.filter(action=filters['action'])
+    if filters['user'].isdigit():
+        logs = logs.filter(user_id=int(filters['user']))
+    if filters['content_type'].isdigit():
+        logs = logs.filter(content_type_id=int(filters['content_type']))
+        if filters['object_id'].isdigit():
+            logs = logs.filter(object_id=int(filters['object_id']))
+    
+    # Date range on the raw timestamp column (a __date lookup would defeat the index)
+    try:
+        if filters['date_from']:
+            start = datetime.strptime(filters['date_from'], '%Y-%m-%d').date()
+            logs = logs.filter(timestamp__gte=timezone.make_aware(datetime.combine(start, time.min)))
+        if filters['date_to']:
+            end = datetime.strptime(filters['date_to'], '%Y-%m-%d').date() + timedelta(days=1)
+            logs = logs.filter(timestamp__lt=timezone.make_aware(datetime.combine(end, time.min)))
+    except ValueError:
+        pass
+    
+    # Term/prefix search through the AuditLogTerm inverted index (all terms must match)
+    if filters['q']:
+        for term in AuditLogTerm.tokenize(filters['q'])[:5]:
+            logs = logs.filter(pk__in=AuditLogTerm.objects.filter(term__istartswith=term).values('log_id'))
+    
+    return logs, filters
+
+
+class AuditExporter:
+    """
+    Streams AuditLog rows as CSV or JSONL.
+    Used by both the system_logs export endpoint and the export_audit_logs command.
+    """
+
+    FORMATS = {
+        'csv': 'text/csv',
+        'jsonl': 'application/x-ndjson',
+    }
+
+    COLUMNS = [
+        'id', 'timestamp', 'user_id', 'username', 'action', 'module',
+        'content_type', 'object_id', 'object_repr', 'summary', 'changes',
+        'ip_address', 'user_agent',
+    ]
+
+    def __init__(self, queryset, export_format='csv', chunk_size=2000):
+        self.queryset = queryset.select_related('user', 'content_type').order_by('pk')
+        self.export_format = export_format
+        self.chunk_size = chunk_size
+
+    def iter_rows(self):
+        """Yields AuditLog objects in bounded chunks (see iter_chunks)"""
+        for chunk in iter_chunks(self.queryset, self.chunk_size):
+            yield from chunk
+
+    def as_dict(self, log):
+        return {
+            'id': log.pk,
+            'timestamp': log.timestamp.isoformat() if log.timestamp else None,
+            'user_id': log.user_id,
+            'username': log.user.username if log.user else None,
+            'action': log.action,
+            'module': log.module,
+            'content_type': f"{log.content_type.app_label}.{log.content_type.model}" if log.content_type else None,
+            'object_id': log.object_id,
+            'object_repr': log.object_repr,
+            'summary': log.summary,
+            'changes': log.changes,
+            'ip_address': log.ip_address,
+            'user_agent': log.user_agent,
+        }
+
+    def stream(self):
+        """Yields encoded chunks (bytes), roughly one per chunk_size rows"""
+        if self.export_format == 'jsonl':
+            yield from self._stream_jsonl()
+        else:
+            yield from self._stream_csv()
+
+    def _stream_csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.COLUMNS)
+        pending = 0
+        for log in self.iter_rows():
+            row = self.as_dict(log)
+            row['changes'] = json.dumps(row['changes'], cls=DjangoJSONEncoder) if row['changes'] is not None else ''
+            writer.writerow([row[c] if row[c] is not None else '' for c in self.COLUMNS])
+            pending += 1
+            if pending >= self.chunk_size:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+        yield buffer.getvalue().encode()
+
+    def _stream_jsonl(self):
+        lines = []
+        for log in self.iter_rows():
+            lines.append(json.dumps(self.as_dict(log), cls=DjangoJSONEncoder))
+            if len(lines) >= self.chunk_size:
+                yield ("\n".join(lines) + "\n").encode()
+                lines = []
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+
+    @staticmethod
+    def gzip(chunks):
+        """Incrementally gzip an iterable of byte chunks"""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
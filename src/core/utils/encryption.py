@@ -1,6 +1,9 @@
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, MultiFernet, InvalidToken
 from django.conf import settings
 import base64
+import hashlib
+import hmac
+import re
 
 class EncryptionUtils:
     """
@@ -8,13 +11,52 @@ class EncryptionUtils:
     Uses AES-128 via Fernet
     """
     
+    # (keys, MultiFernet, primary Fernet) - built once per process instead of on every call.
+    # Keyed on the settings so changed keys (e.g. override_settings) are picked up.
+    _cipher = None
+    
+    @staticmethod
+    def get_keys():
+        """Primary key first, then any retired keys kept for decryption during rotation"""
+        keys = [settings.ENCRYPTION_KEY] + list(getattr(settings, 'ENCRYPTION_OLD_KEYS', []))
+        # Ensure keys are bytes
+        return tuple(k.encode() if isinstance(k, str) else k for k in keys)
+    
     @staticmethod
     def get_cipher():
-        key = settings.ENCRYPTION_KEY
-        # Ensure key is bytes
-        if isinstance(key, str):
-            key = key.encode()
-        return Fernet(key)
+        """
+        MultiFernet: encrypts with the primary key, decrypts with any configured key.
+        """
+        return EncryptionUtils._load()[1]
+
+    @staticmethod
+    def _load():
+        keys = EncryptionUtils.get_keys()
+        cached = EncryptionUtils._cipher
+        if cached is None or cached[0] != keys:
+            fernets = [Fernet(k) for k in keys]
+            cached = (keys, MultiFernet(fernets), fernets[0])
+            EncryptionUtils._cipher = cached
+        return cached
+
+    @staticmethod
+    def is_current(token: str) -> bool:
+        """True if the token is already encrypted with the primary key"""
+        try:
+            EncryptionUtils._load()[2].decrypt(token.encode())
+            return True
+        except InvalidToken:
+            return False
+
+    @staticmethod
+    def rotate(token: str) -> str:
+        """
+        Re-encrypts a token under the primary key.
+        Raises InvalidToken if no configured key can decrypt it.
+        """
+        if not token:
+            return token
+        return EncryptionUtils.get_cipher().rotate(token.encode()).decode()
 
     @staticmethod
     def encrypt(data: str) -> str:
@@ -36,3 +78,40 @@ class EncryptionUtils:
             # If decryption fails (e.g. invalid token, wrong key), return empty string or raw
             # Returning empty string is safer to avoid showing garbage
             return ""
+
+    @staticmethod
+    def decrypt_many(tokens) -> dict:
+        """
+        Bulk decrypt for export/payroll paths.
+        Returns {token: plaintext}; duplicates and empty tokens are decrypted only once / skipped.
+        """
+        cipher_suite = EncryptionUtils.get_cipher()
+        result = {}
+        for token in tokens:
+            if not token or token in result:
+                continue
+            try:
+                result[token] = cipher_suite.decrypt(token.encode()).decode()
+            except Exception:
+                result[token] = ""
+        return result
+
+    @staticmethod
+    def normalize_for_index(value: str) -> str:
+        """Canonical form used for blind indexing: no spaces/hyphens, upper case"""
+        return re.sub(r'[\s-]+', '', value or '').upper()
+
+    @staticmethod
+    def blind_index(value: str):
+        """
+        Deterministic HMAC-SHA256 of the normalized value.
+        Stored next to the ciphertext so equality lookups / duplicate checks can use an index
+        without decrypting every row. Returns None for empty values.
+        """
+        value = EncryptionUtils.normalize_for_index(value)
+        if not value:
+            return None
+        key = settings.BLIND_INDEX_KEY
+        if isinstance(key, str):
+            key = key.encode()
+        return hmac.new(key, value.encode(), hashlib.sha256).hexdigest()
@@ -0,0 +1,149 @@
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class _RangeReader:
+    """Read-only view of bytes [start, start + length) of an open file, for FileResponse"""
+
+    def __init__(self, fileobj, start, length):
+        self.fileobj = fileobj
+        self.remaining = length
+        fileobj.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fileobj.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fileobj.close()
+
+
+def file_etag(stat):
+    """Validator derived from size and mtime - changes whenever the file is replaced"""
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    Returns (start, end) inclusive for a single satisfiable byte range,
+    None when the header is absent or not something we serve partially
+    (multiple ranges, other units), or False when it cannot be satisfied.
+    """
+    match = RANGE_RE.match((header or '').strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    """A Range is honoured only if the client's copy (If-Range) is still current"""
+    if_range = request.META.get('HTTP_IF_RANGE', '').strip()
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(last_modified)
+
+
+def serve_file(request, file_path, content_type=None, as_attachment=False, filename=None):
+    """
+    Streams a file that the caller has already authorized.
+
+    Responses carry ETag/Last-Modified, so repeat views are answered with a 304,
+    and single byte ranges are answered with 206 (PDF viewers and resumed
+    downloads rely on this). The file is never read into memory: FileResponse
+    streams it in blocks, or, with settings.SECURE_FILE_SENDFILE set, the front
+    proxy is told to send it itself and the worker is released immediately.
+    """
+    stat = os.stat(file_path)
+    etag = file_etag(stat)
+    last_modified = stat.st_mtime
+    filename = filename or os.path.basename(file_path)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if not_modified is not None:
+        return not_modified
+
+    backend = getattr(settings, 'SECURE_FILE_SENDFILE', '')
+    if backend:
+        response = _sendfile_response(backend, file_path, content_type, as_attachment, filename)
+    else:
+        response = _stream_response(request, file_path, stat, etag, content_type, as_attachment, filename)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Confidential: browsers may keep a copy but must revalidate it; shared caches must not
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _stream_response(request, file_path, stat, etag, content_type, as_attachment, filename):
+    size = stat.st_size
+    byte_range = None
+    if request.method == 'GET' and _if_range_matches(request, etag, stat.st_mtime):
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        response['Accept-Ranges'] = 'bytes'
+        return response
+
+    fileobj = open(file_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(fileobj, content_type=content_type, as_attachment=as_attachment, filename=filename)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            _RangeReader(fileobj, start, length), status=206,
+            content_type=content_type, as_attachment=as_attachment, filename=filename
+        )
+        response['Content-Length'] = length
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _sendfile_response(backend, file_path, content_type, as_attachment, filename):
+    """
+    Empty response telling the proxy which file to send.
+    nginx: X-Accel-Redirect to an `internal` location mapped onto MEDIA_ROOT
+    (SECURE_FILE_ACCEL_PREFIX); apache/lighttpd: X-Sendfile with the absolute path.
+    The proxy then handles Range and the transfer itself.
+    """
+    response = HttpResponse(content_type=content_type or 'application/octet-stream')
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+
+    if backend == 'nginx':
+        relative = os.path.relpath(file_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        prefix = getattr(settings, 'SECURE_FILE_ACCEL_PREFIX', '/protected/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(relative)
+    else:
+        response['X-Sendfile'] = os.fspath(file_path)
+    return response
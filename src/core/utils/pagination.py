@@ -0,0 +1,100 @@
+import base64
+from datetime import datetime
+from itertools import islice
+from django.db import connection
+from django.db.models import Q
+
+
+class KeysetPaginator:
+    """
+    Cursor (keyset) pagination over a (timestamp, id) ordering.
+    Page cost stays constant however deep the user scrolls because every page
+    is a range scan that starts right after the previous page's last row,
+    instead of an OFFSET that has to skip all earlier rows.
+    """
+
+    def __init__(self, queryset, field='timestamp', per_page=50):
+        self.queryset = queryset
+        self.field = field
+        self.per_page = per_page
+
+    @staticmethod
+    def encode_cursor(value, pk):
+        raw = f"{value.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Returns (datetime, pk) or None if the cursor is missing/tampered"""
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+            value, pk = raw.rsplit('|', 1)
+            return datetime.fromisoformat(value), int(pk)
+        except Exception:
+            return None
+
+    def page(self, after=None, before=None):
+        """
+        Returns a dict with the rows and the cursors for the neighbouring pages.
+        'after' walks towards older rows, 'before' walks back towards newer rows.
+        """
+        field = self.field
+        after_key = self.decode_cursor(after)
+        before_key = self.decode_cursor(before)
+
+        if before_key:
+            value, pk = before_key
+            qs = self.queryset.filter(
+                Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk})
+            ).order_by(field, 'pk')
+            rows = list(qs[:self.per_page + 1])
+            has_newer = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            rows.reverse()
+            has_older = True
+        else:
+            qs = self.queryset
+            if after_key:
+                value, pk = after_key
+                qs = qs.filter(
+                    Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk})
+                )
+            rows = list(qs.order_by(f'-{field}', '-pk')[:self.per_page + 1])
+            has_older = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_newer = after_key is not None
+
+        first, last = (rows[0], rows[-1]) if rows else (None, None)
+        return {
+            'object_list': rows,
+            'next_cursor': self.encode_cursor(getattr(last, field), last.pk) if (last and has_older) else None,
+            'prev_cursor': self.encode_cursor(getattr(first, field), first.pk) if (first and has_newer) else None,
+        }
+
+
+def iter_chunks(queryset, chunk_size=2000):
+    """
+    Yields lists of at most chunk_size rows from queryset, ordered by pk, with bounded memory.
+    PostgreSQL/SQLite stream through a server-side cursor via iterator(chunk_size=...).
+    MySQL drivers buffer the whole result set client-side even for iterator(),
+    so there we walk primary-key windows of chunk_size rows instead.
+    """
+    queryset = queryset.order_by('pk')
+    if connection.vendor != 'mysql':
+        rows = queryset.iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield chunk
+        return
+
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        yield chunk
+        last_pk = chunk[-1].pk
@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from django.db import transaction
+
+
+def on_commit_batched(name, items, flush):
+    """
+    Collects `items` under `name` and calls flush(collected_items) once after
+    the current transaction commits, however many times it is called inside
+    that transaction. Outside a transaction flush runs straight away. Inside
+    a deferred_batches() block everything waits for the end of the block.
+    """
+    connection = transaction.get_connection()
+    deferred = connection.__dict__.get('deferred_batches')
+    if deferred is not None:
+        deferred.setdefault(name, (set(), flush))[0].update(items)
+        return
+    if not connection.in_atomic_block:
+        flush(set(items))
+        return
+
+    batches = connection.__dict__.setdefault('commit_batches', {})
+    batch = batches.get(name)
+    # Rolling back (a savepoint or) the transaction discards its callbacks,
+    # and with them this batch's flush; start a new batch in that case.
+    if batch is None or not any(func is batch['run'] for _, func, _ in connection.run_on_commit):
+        def run():
+            flush(batches.pop(name)['items'])
+        batch = batches[name] = {'items': set(), 'run': run}
+        transaction.on_commit(run)
+    batch['items'].update(items)
+
+
+@contextmanager
+def deferred_batches():
+    """
+    For long runs of small writes (imports): batches requested inside the block
+    are flushed once, when it exits, instead of after every write or savepoint.
+    Flushes re-derive from the database, so one surviving a rolled back write
+    is harmless. Use it outside transaction.atomic(), or the flush runs before
+    the outer transaction commits.
+    """
+    connection = transaction.get_connection()
+    if connection.__dict__.get('deferred_batches') is not None:
+        yield
+        return
+    deferred = connection.__dict__['deferred_batches'] = {}
+    try:
+        yield
+    finally:
+        del connection.__dict__['deferred_batches']
+        for items, flush in deferred.values():
+            flush(items)
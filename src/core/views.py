@@ -13,9 +13,16 @@ import mimetypes
 
 @login_required
 def serve_secure_document(request, path):
-    file_path = os.path.join(settings.MEDIA_ROOT, 'secure_docs', path)
-    
-    if not os.path.exists(file_path):
+    from django.core.exceptions import SuspiciousFileOperation
+    from django.utils._os import safe_join
+    from core.utils.file_serving import serve_file
+
+    try:
+        file_path = safe_join(settings.MEDIA_ROOT, 'secure_docs', path)
+    except SuspiciousFileOperation:
+        raise Http404("Document not found")
+
+    if not os.path.isfile(file_path):
         raise Http404("Document not found")
 
     # Granular Permission Check
@@ -24,19 +31,30 @@ def serve_secure_document(request, path):
     # 'secure_docs/2024/01/filename.pdf' -> field 'file' contains 'secure_docs/2024/01/filename.pdf'
     relative_path = os.path.join('secure_docs', path)
     
-    # Attempt to find the vault entry
-    try:
-        from employees.models import DocumentVault
-        doc = DocumentVault.objects.get(file=relative_path)
-        
+    # Attempt to find the vault entry. With content-addressed storage identical
+    # uploads share one file, so several entries (even of different employees)
+    # may point at it; access is granted if any of them allows it.
+    from employees.models import DocumentVault
+    from django.utils.text import slugify
+    source = relative_path
+    if path.startswith('derived/'):
+        # Viewing copy / thumbnail: same access rules as the original upload
+        from core.imaging import DocumentImages
+        source = DocumentImages.source_for(relative_path) or relative_path
+    docs = list(DocumentVault.objects.select_related('employee').filter(file=source))
+    filename = None
+    if docs:
         # 2. Check Ownership or Role
-        is_owner = (doc.employee == request.user)
+        owned = [doc for doc in docs if doc.employee_id == request.user.pk]
         is_admin_hr = (request.user.is_staff or (hasattr(request.user, 'role') and request.user.role in ['ADMIN', 'HR_MANAGER', 'CEO']))
         
-        if not (is_owner or is_admin_hr):
+        if not (owned or is_admin_hr):
              return HttpResponseForbidden("You are not authorized to view this confidential document.")
-             
-    except DocumentVault.DoesNotExist:
+
+        # Stored names are content hashes; download under a readable name
+        doc = (owned or docs)[0]
+        filename = slugify(str(doc)) + os.path.splitext(file_path)[1]
+    else:
         # If no DB record found (orphaned file?), default to Admin only
         if not request.user.is_staff and request.user.role != 'ADMIN':
              return HttpResponseForbidden("Unauthorized access to unlinked document.")
@@ -46,12 +64,10 @@ def serve_secure_document(request, path):
 
     # Determine if we should view (inline) or download (attachment)
     action = request.GET.get('action', 'view')
-    disposition = 'inline' if action == 'view' else 'attachment'
 
-    with open(file_path, 'rb') as f:
-        response = HttpResponse(f.read(), content_type=content_type)
-        response['Content-Disposition'] = f'{disposition}; filename="{os.path.basename(file_path)}"'
-        return response
+    # Authorization stays here; the bytes are streamed (or handed to the proxy)
+    # with Range and ETag/Last-Modified support
+    return serve_file(request, file_path, content_type=content_type, as_attachment=(action != 'view'), filename=filename)
 
 @login_required
 def system_admin(request):
@@ -77,30 +93,93 @@ def system_logs(request):
         return redirect('dashboard')
         
     from .models import AuditLog
+    from .utils.audit_export import filter_audit_logs
+    from .utils.pagination import KeysetPaginator
+    from django.contrib.contenttypes.models import ContentType
     
-    # Get filter parameters
-    module_filter = request.GET.get('module', '')
-    action_filter = request.GET.get('action', '')
-    
-    logs = AuditLog.objects.select_related('user', 'content_type').order_by('-timestamp')
+    logs, filters = filter_audit_logs(request.GET)
     
-    if module_filter:
-        logs = logs.filter(module=module_filter)
-    if action_filter:
-        logs = logs.filter(action=action_filter)
+    page = KeysetPaginator(logs, field='timestamp', per_page=50).page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
     
-    logs = logs[:200]  # Limit to 200 most recent
+    # Filter querystring without the cursors, reused by the pager links
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
     
+    User = get_user_model()
     context = {
-        'logs': logs,
+        'logs': page['object_list'],
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor'],
+        'filter_query': params.urlencode(),
         'modules': AuditLog.Module.choices,
         'actions': AuditLog.Action.choices,
-        'selected_module': module_filter,
-        'selected_action': action_filter,
+        'users': User.objects.order_by('full_name', 'username').only('id', 'full_name', 'username'),
+        'content_types': ContentType.objects.exclude(app_label__in=['admin', 'auth', 'contenttypes', 'sessions']).order_by('app_label', 'model'),
+        'selected_module': filters['module'],
+        'selected_action': filters['action'],
+        'selected_user': filters['user'],
+        'selected_content_type': filters['content_type'],
+        'object_id': filters['object_id'],
+        'date_from': filters['date_from'],
+        'date_to': filters['date_to'],
+        'search_query': filters['q'],
     }
     
     return render(request, 'system_logs.html', context)
 
+@login_required
+def system_logs_export(request):
+    """
+    Streams the (filtered) audit trail as CSV or JSONL, optionally gzipped.
+    Rows are pulled in bounded chunks and written as they are produced, so
+    memory use does not grow with the size of the export.
+    """
+    user = request.user
+    if not user.is_staff and not (user.is_admin() or user.is_ceo()):
+        return redirect('dashboard')
+    
+    from django.http import StreamingHttpResponse
+    from .models import AuditLog
+    from .utils.audit_export import AuditExporter, filter_audit_logs
+    
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in AuditExporter.FORMATS:
+        export_format = 'csv'
+    use_gzip = request.GET.get('gzip') == '1'
+    
+    logs, filters = filter_audit_logs(request.GET)
+    
+    # Freeze the upper bound first so the EXPORT entry below is not part of its own export
+    last = AuditLog.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    logs = logs.filter(pk__lte=last)
+    
+    AuditLog.log(
+        user=user,
+        action=AuditLog.Action.EXPORT,
+        changes={'format': export_format, 'gzip': use_gzip, 'filters': {k: v for k, v in filters.items() if v}},
+        request=request,
+        module=AuditLog.Module.SYSTEM,
+        object_repr="Audit Trail Export"
+    )
+    
+    exporter = AuditExporter(logs, export_format=export_format)
+    stream = exporter.stream()
+    filename = f"audit_trail_{timezone.localtime().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    if use_gzip:
+        stream = AuditExporter.gzip(stream)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    else:
+        content_type = AuditExporter.FORMATS[export_format]
+    
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 @login_required
 def company_profile(request):
     user = request.user
@@ -186,53 +265,17 @@ def dashboard(request):
     user = request.user
     
     # --- ADMIN / HR DASHBOARD ---
-    if user.is_staff or user.is_admin() or user.is_hr() or user.is_ceo():
-        from django.contrib.auth import get_user_model
+    # Counters come from today's KPI snapshot (core.kpi) through the per-widget
+    # cache (core.dashboard); heavy widgets (on leave list, liability, activity,
+    # trend) are fetched by the page from dashboard_widget.
+    from .dashboard import DashboardWidgets
+    if DashboardWidgets.can_view_dashboard(user):
         from .models import PublicHoliday
-        from meetings.models import Meeting
         from django.db.models import Q
-        User = get_user_model()
         
-        # Statistics for the Admin Dashboard
         today = timezone.localdate()
-        current_month = today.month
-        current_year = today.year
-        
-        # 1. Total Employees & New Joiners
-        total_employees = User.objects.filter(role__iexact='EMPLOYEE').count()
-        new_employees_count = User.objects.filter(role__iexact='EMPLOYEE', date_joined__month=current_month, date_joined__year=current_year).count()
-        if total_employees > 0 and new_employees_count > 0:
-            new_emp_percentage = round((new_employees_count / total_employees) * 100, 1)
-        else:
-            new_emp_percentage = 0
-            
-        # 2. Active Today (Attendance)
-        from payroll.models import AttendanceLog
-        active_today_count = AttendanceLog.objects.filter(date=today, is_absent=False).count()
-        
-        # Calculate Attendance Rate
-        active_employees_count = User.objects.filter(role__iexact='EMPLOYEE', status='ACTIVE').count()
-        if active_employees_count > 0:
-            attendance_rate = round((active_today_count / active_employees_count) * 100, 1)
-        else:
-            attendance_rate = 0
-            
-        # 3. On Leave & Pending Approvals
-        on_leave_today = LeaveRequest.objects.filter(
-            start_date__lte=today,
-            end_date__gte=today,
-            status__in=[LeaveRequest.Status.APPROVED, LeaveRequest.Status.HR_PROCESSED],
-            employee__is_active=True
-        ).exclude(employee__status='ARCHIVED').select_related('employee', 'leave_type')
-        on_leave_count = on_leave_today.count()
-        
-        pending_approvals_count = LeaveRequest.objects.filter(
-            status=LeaveRequest.Status.PENDING, assigned_manager=user, employee__is_active=True
-        ).exclude(employee__status='ARCHIVED').count()
-        
-        # 4. Expiring Documents (Next 30 days)
-        expiry_threshold = today + timedelta(days=30)
-        expiring_docs_count = DocumentVault.objects.filter(expiry_date__range=[today, expiry_threshold]).count()
+        visible_widgets = DashboardWidgets.visible(user)
+        kpis = DashboardWidgets.get('kpis', user)
         
         # Pending Leave Requests List
         pending_leave_requests = LeaveRequest.objects.filter(
@@ -252,106 +295,11 @@ def dashboard(request):
         # Upcoming Holidays
         upcoming_holidays = PublicHoliday.objects.filter(date__gte=today).order_by('date')
         
-        # Calculate Total Gratuity Liability
-        from payroll.services import GratuityService
-        from decimal import Decimal
-        
-        total_liability = Decimal('0.00')
-        active_emps = User.objects.filter(role__iexact='EMPLOYEE', status='ACTIVE')
-        for emp in active_emps:
-            service = GratuityService(emp)
-            result = service.calculate()
-            total_liability += result['amount']
-        
-        # Recent Activities from Audit Log
-        from .models import AuditLog
-        
-        recent_activities = []
-        seen_messages = set()
-        
-        # Sort by timestamp to ensure we keep the most recent one if duplicates exist
-        raw_activities = AuditLog.objects.select_related('user').order_by('-timestamp')[:60]
-        
-        for activity in raw_activities:
-            msg = activity.description
-            if msg:
-                # Aggressive Deduplication: 
-                # If the exact same text has already been shown, skip it.
-                # This ensures "only show them once".
-                if msg not in seen_messages:
-                    recent_activities.append(activity)
-                    seen_messages.add(msg)
-                    
-                if len(recent_activities) >= 10:
-                    break
-        
-        # Leave Balance for current user (if they're also an employee)
-        leave_balances = []
-        if user.role == 'EMPLOYEE' or hasattr(user, 'subordinates'):
-            from leaves.models import LeaveBalance, LeaveType
-            try:
-                # Get only active leave types
-                leave_types = LeaveType.objects.filter(is_active=True)
-                current_year = today.year
-                
-                for lt in leave_types:
-                    total_quota = float(lt.days_entitlement)
-                    if getattr(lt, 'accrual_frequency', '') == 'MONTHLY':
-                        if getattr(lt, 'reset_monthly', False):
-                            total_quota = total_quota / 12.0
-                        else:
-                            total_quota = (total_quota / 12.0) * max(1, today.month)
-                        
-                    if lt.reset_monthly:
-                        reqs = LeaveRequest.objects.filter(
-                            employee=user, leave_type=lt, status__in=['APPROVED', 'HR_PROCESSED'],
-                            start_date__month=today.month, start_date__year=current_year
-                        )
-                    else:
-                        reqs = LeaveRequest.objects.filter(
-                            employee=user, leave_type=lt, status__in=['APPROVED', 'HR_PROCESSED'],
-                            start_date__year=current_year
-                        )
-                    used = sum(float(r.duration_days) for r in reqs) or 0.0
-                    
-                    balance_obj, created = LeaveBalance.objects.get_or_create(
-                        employee=user, leave_type=lt, year=current_year,
-                        defaults={'total_entitlement': total_quota, 'days_used': used}
-                    )
-                    
-                    if float(balance_obj.total_entitlement) != total_quota or float(balance_obj.days_used) != float(used):
-                        balance_obj.total_entitlement = total_quota
-                        balance_obj.days_used = used
-                        balance_obj.save()
-                        
-                    used = float(balance_obj.days_used)
-                    total_quota = float(balance_obj.total_entitlement)
-                    remaining = total_quota - used
-
-                    percentage = int((used / total_quota * 100) if total_quota > 0 else 0)
-                    leave_balances.append({
-                        'name': lt.name,
-                        'code': lt.code,
-                        'used': used,
-                        'total': total_quota,
-                        'remaining': max(0, remaining),
-                        'percentage': percentage,
-                        'remaining_percentage': 100 - percentage,
-                        'is_unlimited': getattr(lt, 'allow_unlimited', False)
-                    })
-            except Exception as e:
-                # Fallback to default values
-                leave_balances = [
-                    {'name': 'Annual Leave', 'code': 'ANN', 'used': 12, 'total': 30, 'remaining': 18, 'percentage': 40, 'is_unlimited': False},
-                    {'name': 'Sick Leave', 'code': 'SICK', 'used': 3, 'total': 15, 'remaining': 12, 'percentage': 20, 'is_unlimited': False},
-                    {'name': 'Personal Leave', 'code': 'PERS', 'used': 1, 'total': 5, 'remaining': 4, 'percentage': 20, 'is_unlimited': False}
-                ]
-        
         # Upcoming Meetings
         from datetime import datetime, time
         from meetings.models import Meeting # Local import for admin section
         from django.db.models import Case, When, Value, IntegerField
-        today_start = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        today_start = timezone.make_aware(datetime.combine(today, time.min))
         upcoming_meetings = Meeting.objects.filter(
             Q(participants=user) | Q(organizer=user),
             start_time__gte=today_start
@@ -361,7 +309,7 @@ def dashboard(request):
                 default=Value(0),
                 output_field=IntegerField(),
             )
-        ).order_by('-is_organizer', 'start_time')[:5]
+        ).select_related('organizer').prefetch_related('participants').order_by('-is_organizer', 'start_time')[:5]
         
         # Meetings Scheduled by User
         my_scheduled_meetings = Meeting.objects.filter(
@@ -370,160 +318,48 @@ def dashboard(request):
         ).order_by('start_time')[:5]
                 
         context = {
-            'total_employees': total_employees,
-            'new_employees_count': new_employees_count,
-            'new_emp_percentage': new_emp_percentage,
+            'total_employees': kpis['total_employees'],
+            'new_employees_count': kpis['new_employees_count'],
+            'new_emp_percentage': kpis['new_emp_percentage'],
             
-            'active_today_count': active_today_count,
-            'attendance_rate': attendance_rate,
+            'active_today_count': kpis['active_today_count'],
+            'attendance_rate': kpis['attendance_rate'],
+            'on_leave_count': kpis['on_leave_count'],
             
-            'on_leave_count': on_leave_count,
-            'on_leave_today': on_leave_today,
-            'pending_approvals_count': pending_approvals_count,
+            'pending_approvals_count': DashboardWidgets.get('pending_approvals', user)['count'],
             
-            'active_employees': active_employees_count, # kept for backward compat if used elsewhere
-            'expiring_docs_count': expiring_docs_count,
+            'active_employees': kpis['active_employees'], # kept for backward compat if used elsewhere
+            'expiring_docs_count': kpis['expiring_docs_count'],
             'pending_leaves': pending_leaves,
             'pending_leave_requests': pending_leave_requests,
             'pending_manual_punches': pending_manual_punches,
-            'total_gratuity_liability': total_liability,
             'upcoming_holidays': upcoming_holidays,
-            'recent_activities': recent_activities,
-            'leave_balances': leave_balances,
             'upcoming_meetings': upcoming_meetings,
             'my_scheduled_meetings': my_scheduled_meetings,
+            'visible_widgets': visible_widgets,
+            'lazy_widgets': [name for name in visible_widgets if DashboardWidgets.WIDGETS[name]['lazy']],
         }
         return render(request, 'dashboard_modern.html', context)
     
     # --- EMPLOYEE SELF-SERVICE (ESS) DASHBOARD ---
     else:
-        # User IS the employee
-        employee = user
-
-        # Context Data
-        recent_leaves = LeaveRequest.objects.filter(employee=user).order_by('-created_at')[:5]
-        
-        from payroll.models import ManualPunchRequest
-        recent_manual_punches = ManualPunchRequest.objects.filter(employee=user).order_by('-created_at')[:5]
-        
-        # Attendance
-        today = timezone.localtime()
-        from payroll.models import AttendanceLog
-        attendance_count = AttendanceLog.objects.filter(
-            employee=user, 
-            date__month=today.month,
-            is_absent=False
-        ).count()
-
-        # Leave Balances for ESS
-        from leaves.models import LeaveBalance, LeaveType
-        leave_balances = []
-        from django.db.models import Q
-        try:
-            # Filter Leave Types based on Gender Eligibility
-            leave_types = LeaveType.objects.filter(is_active=True)
-            if user.gender:
-                leave_types = leave_types.filter(Q(eligibility_gender='ALL') | Q(eligibility_gender=user.gender))
-            else:
-                # If gender not specified, only show 'ALL' to be safe
-                leave_types = leave_types.filter(eligibility_gender='ALL')
-
-            for lt in leave_types:
-                total_quota = float(lt.days_entitlement)
-                
-                if getattr(lt, 'accrual_frequency', '') == 'MONTHLY':
-                    if getattr(lt, 'reset_monthly', False):
-                        total_quota = total_quota / 12.0
-                    else:
-                        total_quota = (total_quota / 12.0) * max(1, today.month)
-                        
-                if lt.reset_monthly:
-                    reqs = LeaveRequest.objects.filter(
-                        employee=user, leave_type=lt, status__in=['APPROVED', 'HR_PROCESSED'],
-                        start_date__month=today.month, start_date__year=today.year
-                    )
-                else:
-                    reqs = LeaveRequest.objects.filter(
-                        employee=user, leave_type=lt, status__in=['APPROVED', 'HR_PROCESSED'],
-                        start_date__year=today.year
-                    )
-                used = sum(float(r.duration_days) for r in reqs) or 0.0
-                
-                balance_obj, created = LeaveBalance.objects.get_or_create(
-                    employee=user, leave_type=lt, year=today.year,
-                    defaults={'total_entitlement': total_quota, 'days_used': used}
-                )
-                
-                if float(balance_obj.total_entitlement) != total_quota or float(balance_obj.days_used) != float(used):
-                    balance_obj.total_entitlement = total_quota
-                    balance_obj.days_used = used
-                    balance_obj.save()
-                
-                used = float(balance_obj.days_used)
-                total_quota = float(balance_obj.total_entitlement)
-
-                remaining = total_quota - used
-                percentage = int((used / total_quota * 100) if total_quota > 0 else 0)
-
-                leave_balances.append({
-                    'name': lt.name,
-                    'code': lt.code,
-                    'used': used,
-                    'total': total_quota,
-                    'remaining': max(0, remaining),
-                    'percentage': percentage,
-                    'remaining_percentage': 100 - percentage,
-                    'is_unlimited': getattr(lt, 'allow_unlimited', False)
-                })
-        except:
-            pass
-
-        # Additional ESS Stats
-        pending_leaves_count = LeaveRequest.objects.filter(employee=user, status=LeaveRequest.Status.PENDING).count()
-        total_leave_used = sum(b['used'] for b in leave_balances)
-        
-        # Simple attendance rate for current month
-        days_in_month = today.day
-        # Average Attendance for ALL Employees (Requested Feature)
-        total_present_logs = AttendanceLog.objects.filter(
-            date__month=today.month,
-            date__year=today.year,
-            status__in=['Present', 'HalfDay']
-        ).count()
-        avg_daily_attendance = int(total_present_logs / days_in_month) if days_in_month > 0 else 0
-
-        # Upcoming Meetings
-        from datetime import datetime, time
-        from meetings.models import Meeting  # Local import to fix UnboundLocalError
-        from django.db.models import Case, When, Value, IntegerField
-        today_start = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
-        upcoming_meetings = Meeting.objects.filter(
-            Q(participants=employee) | Q(organizer=employee),
-            start_time__gte=today_start
-        ).distinct().annotate(
-            is_organizer=Case(
-                When(organizer=employee, then=Value(1)),
-                default=Value(0),
-                output_field=IntegerField(),
-            )
-        ).order_by('-is_organizer', 'start_time')[:5]
-
+        # Precomputed per-employee summary, served from cache (core.ess)
+        from .ess import ESSDashboard
+        context = ESSDashboard.context(user)
+        return render(request, 'dashboard_ess.html', context)
 
-        # Upcoming Holidays
-        from .models import PublicHoliday
-        upcoming_holidays = PublicHoliday.objects.filter(date__gte=today.date()).order_by('date')
 
-        context = {
-            'employee': employee,
-            'attendance_count': attendance_count,
-            'pending_leaves_count': pending_leaves_count,
-            'total_leave_used': total_leave_used,
-            'recent_leaves': recent_leaves,
-            'recent_manual_punches': recent_manual_punches,
-            'leave_balances': leave_balances,
-            'upcoming_holidays': upcoming_holidays,
-            'avg_daily_attendance': avg_daily_attendance,
-            'upcoming_meetings': upcoming_meetings,
-        }
-        return render(request, 'dashboard_ess.html', context)
+@login_required
+def dashboard_widget(request, name):
+    """JSON data for one lazily loaded admin dashboard widget"""
+    from django.http import JsonResponse
+    from .dashboard import DashboardWidgets
 
+    if name not in DashboardWidgets.WIDGETS:
+        raise Http404("Unknown widget")
+    data = DashboardWidgets.get(name, request.user)
+    if data is None:
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    response = JsonResponse(DashboardWidgets.render_data(name, data))
+    response['Cache-Control'] = 'private, no-cache'
+    return response
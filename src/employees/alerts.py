@@ -0,0 +1,129 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+from .models import DocumentVault
+
+User = get_user_model()
+
+
+class DocumentExpiryAlerts:
+    """
+    Digest emails for vault documents that are about to expire.
+
+    One indexed range query on (expiry_date, notification_sent_at) finds the
+    documents that are due; employees get one digest with all of their
+    documents, HR/Admin get one digest with everybody's. All messages go out
+    over a single SMTP connection, and notification_sent_at is stamped with
+    one UPDATE so a document is not alerted again within the re-alert window.
+    """
+
+    @staticmethod
+    def due(today=None, days=None, realert_days=None):
+        """Documents expiring within `days` that were not alerted in the last `realert_days`"""
+        today = today or timezone.localdate()
+        days = settings.DOCUMENT_EXPIRY_ALERT_DAYS if days is None else days
+        realert_days = settings.DOCUMENT_EXPIRY_REALERT_DAYS if realert_days is None else realert_days
+        cutoff = timezone.now() - timedelta(days=realert_days)
+        return (
+            DocumentVault.objects
+            .filter(expiry_date__range=(today, today + timedelta(days=days)))
+            .filter(Q(notification_sent_at__isnull=True) | Q(notification_sent_at__lt=cutoff))
+            .exclude(status=DocumentVault.DocStatus.ARCHIVED)
+            .select_related('employee')
+            .order_by('expiry_date', 'pk')
+        )
+
+    @staticmethod
+    def hr_recipients():
+        roles = [User.Role.HR_MANAGER, User.Role.ADMIN]
+        return sorted(set(
+            User.objects.filter(Q(role__in=roles) | Q(additional_role__in=roles), is_active=True)
+            .exclude(email='').values_list('email', flat=True)
+        ))
+
+    @staticmethod
+    def _line(doc, today):
+        left = (doc.expiry_date - today).days
+        when = "today" if left == 0 else f"in {left} day{'s' if left != 1 else ''}"
+        return f"  - {doc.get_document_type_display()}: expires {doc.expiry_date:%d %b %Y} ({when})"
+
+    @staticmethod
+    def build_messages(documents, today=None):
+        """
+        Returns [(EmailMessage, [document ids it covers]), ...]:
+        one digest per employee with an email address, then one HR digest.
+        """
+        today = today or timezone.localdate()
+        per_employee = defaultdict(list)
+        for doc in documents:
+            per_employee[doc.employee].append(doc)
+
+        messages = []
+        for employee, docs in per_employee.items():
+            if not employee.email:
+                continue
+            body = "\n".join([
+                f"Hello {employee.full_name or employee.username},",
+                "",
+                "The following documents in your HR document vault are expiring soon:",
+                *[DocumentExpiryAlerts._line(doc, today) for doc in docs],
+                "",
+                "Please upload renewed copies so your records stay valid.",
+            ])
+            messages.append((
+                EmailMessage(
+                    f"Document expiry reminder - {len(docs)} document{'s' if len(docs) != 1 else ''}",
+                    body, settings.DEFAULT_FROM_EMAIL, [employee.email]
+                ),
+                [doc.pk for doc in docs],
+            ))
+
+        hr = DocumentExpiryAlerts.hr_recipients()
+        if hr and per_employee:
+            lines = []
+            for employee, docs in sorted(per_employee.items(), key=lambda item: item[1][0].expiry_date):
+                lines.append(f"{employee.full_name or employee.username} ({employee.employee_id or employee.username})")
+                lines.extend(DocumentExpiryAlerts._line(doc, today) for doc in docs)
+            total = sum(len(docs) for docs in per_employee.values())
+            messages.append((
+                EmailMessage(
+                    f"Document expiry digest - {total} document{'s' if total != 1 else ''}, {len(per_employee)} employee{'s' if len(per_employee) != 1 else ''}",
+                    "Documents expiring soon:\n\n" + "\n".join(lines),
+                    settings.DEFAULT_FROM_EMAIL, [settings.DEFAULT_FROM_EMAIL], bcc=hr
+                ),
+                [doc.pk for docs in per_employee.values() for doc in docs],
+            ))
+        return messages
+
+    @staticmethod
+    def send(today=None, days=None, realert_days=None):
+        """
+        Sends the digests; returns (documents alerted, messages sent, failures).
+        A document is stamped when at least one digest that lists it was delivered.
+        """
+        today = today or timezone.localdate()
+        documents = list(DocumentExpiryAlerts.due(today, days, realert_days))
+        messages = DocumentExpiryAlerts.build_messages(documents, today)
+        if not messages:
+            return 0, 0, []
+
+        delivered, sent, failures = set(), 0, []
+        connection = get_connection()
+        with connection:
+            for message, doc_ids in messages:
+                message.connection = connection
+                try:
+                    message.send()
+                except Exception as e:
+                    failures.append((', '.join(message.to + message.bcc), str(e)))
+                    continue
+                sent += 1
+                delivered.update(doc_ids)
+
+        if delivered:
+            DocumentVault.objects.filter(pk__in=delivered).update(notification_sent_at=timezone.now())
+        return len(delivered), sent, failures
@@ -59,6 +59,26 @@ class EmployeeForm(forms.ModelForm):
             # New Employee: Set default prefix
             self.fields['employee_id'].initial = settings.employee_id_prefix
 
+    def _check_duplicate(self, name, label):
+        value = (self.cleaned_data.get(name) or '').strip()
+        if value:
+            # Indexed lookup on the blind index instead of decrypting every user
+            dupes = User.objects.filter(**User.blind_lookup(name, value))
+            if self.instance.pk:
+                dupes = dupes.exclude(pk=self.instance.pk)
+            if dupes.exists():
+                raise forms.ValidationError(f"This {label} is already assigned to another employee.")
+        return value
+
+    def clean_pan_number(self):
+        return self._check_duplicate('pan_number', 'PAN')
+
+    def clean_passport_number(self):
+        return self._check_duplicate('passport_number', 'passport number')
+
+    def clean_iban(self):
+        return self._check_duplicate('iban', 'account number')
+
     def save(self, commit=True):
         instance = super().save(commit=False)
         instance.pan_number = self.cleaned_data['pan_number']
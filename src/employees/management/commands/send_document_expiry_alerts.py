@@ -0,0 +1,36 @@
+from datetime import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from employees.alerts import DocumentExpiryAlerts
+
+
+class Command(BaseCommand):
+    help = "Email expiry digests (per employee and for HR) for vault documents that expire soon; run daily"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', default='', help="Treat this day (YYYY-MM-DD) as today")
+        parser.add_argument('--days', type=int, default=settings.DOCUMENT_EXPIRY_ALERT_DAYS,
+                            help="Alert documents expiring within this many days")
+        parser.add_argument('--realert-days', type=int, default=settings.DOCUMENT_EXPIRY_REALERT_DAYS,
+                            help="Do not alert a document again within this many days")
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be sent")
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD")
+
+        if options['dry_run']:
+            documents = list(DocumentExpiryAlerts.due(today, options['days'], options['realert_days']))
+            for message, doc_ids in DocumentExpiryAlerts.build_messages(documents, today):
+                self.stdout.write(f"{', '.join(message.to + message.bcc)}: {message.subject}")
+            self.stdout.write(self.style.SUCCESS(f"{len(documents)} document(s) due (dry run, nothing sent)"))
+            return
+
+        alerted, sent, failures = DocumentExpiryAlerts.send(today, options['days'], options['realert_days'])
+        for recipient, error in failures:
+            self.stderr.write(f"  failed to mail {recipient}: {error}")
+        self.stdout.write(self.style.SUCCESS(f"{sent} digest(s) sent, {alerted} document(s) alerted"))
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:52
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0004_alter_documentvault_document_type'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='documentvault',
+            name='file',
+            field=models.FileField(storage=core.storage.document_storage, upload_to='secure_docs/%Y/%m/'),
+        ),
+    ]
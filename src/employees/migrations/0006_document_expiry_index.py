@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0005_content_addressed_documents'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentvault',
+            index=models.Index(fields=['expiry_date', 'notification_sent_at'], name='employees_d_expiry__31e6ca_idx'),
+        ),
+    ]
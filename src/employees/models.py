@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from core.storage import document_storage
 
 class DocumentVault(models.Model):
     class DocumentType(models.TextChoices):
@@ -23,7 +24,7 @@ class DocumentVault(models.Model):
     status = models.CharField(max_length=20, choices=DocStatus.choices, default=DocStatus.VALID)
     
     # Secure File Upload
-    file = models.FileField(upload_to='secure_docs/%Y/%m/')
+    file = models.FileField(upload_to='secure_docs/%Y/%m/', storage=document_storage)
     
     # Metadata
     expiry_date = models.DateField(null=True, blank=True)
@@ -32,6 +33,12 @@ class DocumentVault(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     notification_sent_at = models.DateTimeField(null=True, blank=True, help_text="When the last expiry alert was triggered")
 
+    class Meta:
+        indexes = [
+            # Expiry alert job and dashboard counters: range on expiry_date
+            models.Index(fields=['expiry_date', 'notification_sent_at']),
+        ]
+
     @property
     def is_expired(self):
         from datetime import date
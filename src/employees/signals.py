@@ -1 +1,77 @@
 # Signal handlers go here
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from core.imaging import DocumentImages
+from core.storage import note_upload, release_file, release_replaced
+from .models import DocumentVault
+
+# CustomUser fields that feed the gratuity calculation / snapshot scope
+GRATUITY_FIELDS = ('salary_basic', 'date_of_joining', 'status', 'role', 'is_active')
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_gratuity_snapshot(sender, instance, created, update_fields=None, **kwargs):
+    """Rebuild today's gratuity snapshot after commit when an employee change affects it"""
+    if update_fields and not set(update_fields) & set(GRATUITY_FIELDS):
+        return  # e.g. last_login updates
+
+    if not created:
+        old = getattr(instance, '_old_instance', None)  # set by core.signals.store_old_instance
+        if old and all(getattr(old, f) == getattr(instance, f) for f in GRATUITY_FIELDS):
+            return
+
+    from payroll.services import GratuityService
+    GratuityService.rebuild_on_commit()
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_gratuity_snapshot_on_delete(sender, instance, **kwargs):
+    from payroll.services import GratuityService
+    GratuityService.rebuild_on_commit()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def index_employee_search_terms(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Keep the employee search index (users.EmployeeSearchTerm) in step with the searchable fields"""
+    from users.search import EmployeeSearch
+    if raw:
+        return
+    fields = tuple(EmployeeSearch.FIELD_WEIGHTS)
+    if update_fields and not set(update_fields) & set(fields):
+        return  # e.g. last_login updates
+    if not created:
+        old = getattr(instance, '_old_instance', None)  # set by core.signals.store_old_instance
+        if old and all(getattr(old, f) == getattr(instance, f) for f in fields):
+            return
+    EmployeeSearch.index(instance)
+
+
+@receiver(pre_save, sender=DocumentVault)
+def note_file_upload(sender, instance, raw=False, **kwargs):
+    if not raw:
+        note_upload(instance, 'file')
+
+
+@receiver(post_save, sender=DocumentVault)
+def release_replaced_document(sender, instance, created, raw=False, **kwargs):
+    """Replacing a vault file drops this row's reference on the old one (core.storage)"""
+    if created or raw:
+        return
+    release_replaced(instance, 'file')
+
+
+@receiver(post_delete, sender=DocumentVault)
+def release_document_on_delete(sender, instance, **kwargs):
+    release_file(instance.file)
+
+
+@receiver(post_save, sender=DocumentVault)
+def queue_document_images(sender, instance, created, raw=False, **kwargs):
+    """Scanned/photographed documents get a viewing copy and thumbnail from the image worker"""
+    if raw:
+        return
+    old = getattr(instance, '_old_instance', None)
+    if created or not old or old.file.name != instance.file.name:
+        DocumentImages.enqueue(instance.file)
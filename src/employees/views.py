@@ -34,62 +34,53 @@ def employee_list(request):
         
     # Apply Search Query
     if search_query:
+        from users.search import EmployeeSearch
         search_id = search_query.replace('EMP-', '').replace('emp-', '')
-        search_filter = Q(full_name__icontains=search_query) | \
-                       Q(username__icontains=search_query) | \
-                       Q(employee_id__icontains=search_query) | \
-                       Q(designation__icontains=search_query)
+        search_filter = Q(pk__in=EmployeeSearch.filter(User.objects.all(), search_query).values('pk'))
         
         if search_id.isdigit():
             search_filter |= Q(id=search_id)
             
         queryset = queryset.filter(search_filter)
         
-    employees = queryset.order_by('-date_joined').prefetch_related('documents', 'leave_requests')
-    
     today = timezone.localdate()
     
-    # Enhance employee objects with computed status for the dashboard
+    # Status flags as correlated EXISTS subqueries - evaluated in the page query itself
+    from django.core.paginator import Paginator
+    from django.db.models import Exists, OuterRef
+    from leaves.models import LeaveDay
+    queryset = queryset.annotate(
+        is_on_leave=Exists(LeaveDay.objects.filter(
+            employee=OuterRef('pk'), date=today, leave_request__status='APPROVED'
+        )),
+        has_expiry_warning=Exists(DocumentVault.objects.filter(
+            employee=OuterRef('pk'), expiry_date__isnull=False, expiry_date__lte=today + timedelta(days=30)
+        )),
+    ).order_by('-date_joined', '-pk')
+    
+    paginator = Paginator(queryset, 50)
+    page = paginator.get_page(request.GET.get('page'))
+    employees = list(page.object_list)
+    
+    # Gratuity for the rows on this page only, from the daily liability snapshot
+    from payroll.services import GratuityService
+    gratuity = GratuityService.amounts_for(employees)
     for emp in employees:
-        # 1. On Leave Status
-        # Check if leave_requests relation exists (it should via FK related_name)
-        if hasattr(emp, 'leave_requests'):
-            emp.is_on_leave = emp.leave_requests.filter(
-                status='APPROVED', 
-                start_date__lte=today, 
-                end_date__gte=today
-            ).exists()
-        else:
-            emp.is_on_leave = False
-        
-        # 2. Expiry Warnings
-        emp.has_expiry_warning = False
-        if hasattr(emp, 'documents'):
-            docs = emp.documents.all()
-            for doc in docs:
-                if doc.expiry_date and doc.expiry_date <= today + timedelta(days=30):
-                    emp.has_expiry_warning = True
-                    break
-                
-        # 3. Gratuity Accrued (Indian Estimate: 15/26 * Basic * Years)
-        if emp.date_of_joining:
-            years = (today - emp.date_of_joining).days / 365.25
-            if years >= 4.8:
-                daily = (float(emp.salary_basic) / 26) if emp.salary_basic else 0
-                emp.gratuity_estimate = round(years * 15 * daily, 2)
-            else:
-                emp.gratuity_estimate = 0
-        else:
-            emp.gratuity_estimate = 0
+        # Gratuity Accrued (Indian Estimate: 15/26 * Basic * Years)
+        emp.gratuity_estimate = gratuity.get(emp.id, 0)
+    
+    params = request.GET.copy()
+    params.pop('page', None)
             
     return render(request, 'employees/employee_list.html', {
         'employees': employees, 
+        'page_obj': page,
+        'filter_query': params.urlencode(),
         'current_status': status_filter,
         'search_query': search_query,
         'dept_filter': dept_filter,
         'departments': User.Department.choices,
-        'total_count': employees.count(),
-        'all_employee_names': User.objects.filter(role__iexact='EMPLOYEE', is_active=True).values_list('full_name', flat=True)
+        'total_count': paginator.count,
     })
 
 @login_required
@@ -136,6 +127,13 @@ def document_list(request):
     else:
         # ESS: Only own documents
         documents = DocumentVault.objects.select_related('employee').filter(employee=user).order_by('expiry_date')
+
+    # Thumbnails from the image worker, one query for the whole list
+    from core.imaging import DocumentImages
+    documents = list(documents)
+    images = DocumentImages.lookup(doc.file.name for doc in documents)
+    for doc in documents:
+        doc.images = images.get(doc.file.name)
             
     return render(request, 'employees/document_list.html', {'documents': documents})
 
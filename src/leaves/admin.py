@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.translation import gettext_lazy as _
-from .models import LeaveType, LeaveRequest, LeaveBalance, TicketRequest
+from .models import LeaveType, LeaveRequest, LeaveBalance, LeaveLedgerEntry, TicketRequest
 
 @admin.register(LeaveType)
 class LeaveTypeAdmin(admin.ModelAdmin):
@@ -8,10 +8,23 @@ class LeaveTypeAdmin(admin.ModelAdmin):
 
 @admin.register(LeaveBalance)
 class LeaveBalanceAdmin(admin.ModelAdmin):
-    list_display = ('employee', 'leave_type', 'year', 'total_entitlement', 'days_used', 'remaining')
+    list_display = ('employee', 'leave_type', 'year', 'month', 'total_entitlement', 'days_used', 'remaining')
     search_fields = ('employee__full_name',)
     list_filter = ('year', 'leave_type')
 
+@admin.register(LeaveLedgerEntry)
+class LeaveLedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'leave_type', 'year', 'month', 'kind', 'entitlement_delta', 'used_delta', 'created_at')
+    list_filter = ('kind', 'year', 'leave_type')
+    search_fields = ('employee__full_name', 'reference')
+
+    # Append-only: corrections are posted as new entries
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 @admin.register(LeaveRequest)
 class LeaveRequestAdmin(admin.ModelAdmin):
     list_display = ('employee', 'leave_type', 'start_date', 'end_date', 'status', 'duration_days')
@@ -21,30 +34,31 @@ class LeaveRequestAdmin(admin.ModelAdmin):
 
     @admin.action(description='Approve selected Leave Requests')
     def approve_leave(self, request, queryset):
-        # In a real app, this would also deduct from balance
-        rows_updated = queryset.update(status=LeaveRequest.Status.APPROVED, approved_by=request.user)
-        
-        # Logic to deduct balance could go here (iterating over queryset)
-        for req in queryset:
-            if req.status == LeaveRequest.Status.APPROVED:
-                # Update Balance
-                try:
-                    balance, created = LeaveBalance.objects.get_or_create(
-                        employee=req.employee,
-                        leave_type=req.leave_type,
-                        year=req.start_date.year,
-                        defaults={'total_entitlement': req.leave_type.days_entitlement}
-                    )
-                    balance.days_used += req.duration_days
-                    balance.save()
-                except Exception:
-                    pass # Handle specific errors
+        from .ledger import LeaveLedger
+        rows_updated = 0
+        # Only newly approved requests are charged; the ledger ignores repeats anyway
+        for req in queryset.exclude(status=LeaveRequest.Status.APPROVED).select_related('employee', 'leave_type'):
+            req.status = LeaveRequest.Status.APPROVED
+            req.approved_by = request.user
+            req.save()
+            LeaveLedger.consume(req, user=request.user)
+            rows_updated += 1
 
         self.message_user(request, f"{rows_updated} leave requests approved.")
 
     @admin.action(description='Reject selected Leave Requests')
     def reject_leave(self, request, queryset):
-        rows_updated = queryset.update(status=LeaveRequest.Status.REJECTED)
+        from .ledger import LeaveLedger
+        rows_updated = 0
+        # Saved one by one so the LeaveDay rows, dashboards and feeds follow (signals)
+        for req in queryset.exclude(status=LeaveRequest.Status.REJECTED).select_related('employee', 'leave_type'):
+            was_consumed = req.status in LeaveLedger.CONSUMED_STATUSES
+            req.status = LeaveRequest.Status.REJECTED
+            req.save()
+            if was_consumed:
+                LeaveLedger.reverse(req, user=request.user)
+            rows_updated += 1
+
         self.message_user(request, f"{rows_updated} leave requests rejected.")
 
 @admin.register(TicketRequest)
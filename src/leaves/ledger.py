@@ -0,0 +1,437 @@
+from datetime import date
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import LeaveBalance, LeaveLedgerEntry, LeaveRequest, LeaveType, LOPAdjustment
+
+User = get_user_model()
+
+
+class LeaveLedger:
+    """
+    Event-sourced leave balances.
+    Every movement (accrual, approval, reversal, LOP conversion) is appended to
+    LeaveLedgerEntry and applied to the matching LeaveBalance row with an atomic
+    F() update, so balance pages only ever read LeaveBalance - no recomputation
+    and no writes on GET.
+    """
+
+    # Statuses whose days count as consumed
+    CONSUMED_STATUSES = [LeaveRequest.Status.APPROVED, LeaveRequest.Status.HR_PROCESSED]
+
+    # --- Policy helpers ---
+    @staticmethod
+    def period(leave_type, on_date):
+        """(year, month) of the balance bucket; month is 0 unless the type resets monthly"""
+        return on_date.year, (on_date.month if leave_type.reset_monthly else 0)
+
+    @staticmethod
+    def entitlement_for(leave_type, on_date):
+        """Quota the employee should have accrued by on_date"""
+        total_quota = float(leave_type.days_entitlement)
+        if leave_type.accrual_frequency == 'MONTHLY':
+            if leave_type.reset_monthly:
+                total_quota = total_quota / 12.0
+            else:
+                total_quota = (total_quota / 12.0) * max(1, on_date.month)
+        return total_quota
+
+    @staticmethod
+    def _as_of(year, month=0):
+        """Clamp today into the balance period (past years accrue in full)"""
+        today = timezone.localdate()
+        if year < today.year:
+            return date(year, month or 12, 1)
+        if year > today.year:
+            return date(year, month or 1, 1)
+        return today if not month else date(year, month, 1)
+
+    # --- Reads ---
+    @staticmethod
+    def balances_for(employee, leave_types, on_date=None):
+        """
+        Balances for the given leave types in one indexed query.
+        Types without a balance row yet get an unsaved LeaveBalance showing the
+        policy entitlement and nothing used (nothing is written).
+        """
+        on_date = on_date or timezone.localdate()
+        leave_types = list(leave_types)
+        rows = LeaveBalance.objects.filter(
+            employee=employee,
+            year=on_date.year,
+            month__in=[0, on_date.month],
+            leave_type__in=leave_types
+        )
+        by_key = {(b.leave_type_id, b.month): b for b in rows}
+
+        balances = []
+        for lt in leave_types:
+            year, month = LeaveLedger.period(lt, on_date)
+            balance = by_key.get((lt.id, month))
+            if balance is None:
+                balance = LeaveBalance(
+                    employee=employee, leave_type=lt, year=year, month=month,
+                    total_entitlement=LeaveLedger.entitlement_for(lt, on_date), days_used=0.0
+                )
+            else:
+                balance.leave_type = lt  # avoid a lazy load per row
+            balances.append(balance)
+        return balances
+
+    # --- Writes ---
+    @staticmethod
+    def post(employee, leave_type, year, month, kind, entitlement_delta=0.0, used_delta=0.0,
+             reference=None, user=None, note='', leave_request=None, lop_adjustment=None):
+        """
+        Appends one ledger entry and applies it to the balance.
+        Returns None (and changes nothing) if an entry with the same reference already exists.
+        """
+        with transaction.atomic():
+            if reference and LeaveLedgerEntry.objects.filter(reference=reference).exists():
+                return None
+
+            balance = LeaveLedger._ensure_balance(employee, leave_type, year, month, user)
+            try:
+                with transaction.atomic():
+                    entry = LeaveLedgerEntry.objects.create(
+                        employee=employee, leave_type=leave_type, year=year, month=month,
+                        kind=kind, entitlement_delta=entitlement_delta, used_delta=used_delta,
+                        reference=reference, note=note[:255], created_by=user,
+                        leave_request=leave_request, lop_adjustment=lop_adjustment
+                    )
+            except IntegrityError:
+                # Same event posted concurrently - the other writer applied it
+                return None
+
+            LeaveBalance.objects.filter(pk=balance.pk).update(
+                total_entitlement=F('total_entitlement') + entitlement_delta,
+                days_used=F('days_used') + used_delta,
+                updated_at=timezone.now()
+            )
+            return entry
+
+    @staticmethod
+    def _ensure_balance(employee, leave_type, year, month, user=None):
+        balance, created = LeaveBalance.objects.get_or_create(
+            employee=employee, leave_type=leave_type, year=year, month=month,
+            defaults={'total_entitlement': 0.0, 'days_used': 0.0}
+        )
+        if created:
+            # Opening accrual for the new period
+            LeaveLedger.accrue(employee, leave_type, LeaveLedger._as_of(year, month), user=user)
+        return balance
+
+    @staticmethod
+    def accrue(employee, leave_type, on_date, user=None):
+        """
+        Tops the period's accrual up to the policy entitlement as of on_date.
+        Idempotent: the reference is unique per period and target.
+        """
+        year, month = LeaveLedger.period(leave_type, on_date)
+        target = LeaveLedger.entitlement_for(leave_type, on_date)
+        accrued = LeaveLedgerEntry.objects.filter(
+            employee=employee, leave_type=leave_type, year=year, month=month,
+            kind=LeaveLedgerEntry.Kind.ACCRUAL
+        ).aggregate(total=Sum('entitlement_delta'))['total'] or 0.0
+
+        delta = round(target - accrued, 4)
+        if not delta:
+            return None
+        return LeaveLedger.post(
+            employee, leave_type, year, month, LeaveLedgerEntry.Kind.ACCRUAL,
+            entitlement_delta=delta,
+            reference=LeaveLedger._accrual_reference(employee.pk, leave_type.pk, on_date, target),
+            user=user,
+            note=f"Accrued to {target:.2f} days"
+        )
+
+    @staticmethod
+    def _accrual_reference(employee_id, leave_type_id, on_date, target):
+        return f"ACCRUAL:{employee_id}:{leave_type_id}:{on_date.year}-{on_date.month:02d}:{target:.4f}"
+
+    @staticmethod
+    def _leave_cycles(leave):
+        """(consumptions, reversals) posted so far for a leave request"""
+        counts = dict(LeaveLedgerEntry.objects.filter(
+            leave_request=leave, kind__in=[LeaveLedgerEntry.Kind.CONSUMPTION, LeaveLedgerEntry.Kind.REVERSAL]
+        ).order_by().values('kind').annotate(n=Count('pk')).values_list('kind', 'n'))
+        return counts.get(LeaveLedgerEntry.Kind.CONSUMPTION, 0), counts.get(LeaveLedgerEntry.Kind.REVERSAL, 0)
+
+    @staticmethod
+    def _leave_reference(leave, action, cycle):
+        # The first approval keeps the plain reference; re-approvals after a reversal get their own
+        return f"LEAVE:{leave.pk}:{action}" + (f":{cycle}" if cycle else "")
+
+    @staticmethod
+    def consume(leave, user=None):
+        """
+        Deduct an approved leave request from its balance (once per approval).
+        A request that was reversed (rejected, cancelled) and approved again is charged again.
+        """
+        consumed, reversed_ = LeaveLedger._leave_cycles(leave)
+        if consumed > reversed_:
+            return None
+        year, month = LeaveLedger.period(leave.leave_type, leave.start_date)
+        return LeaveLedger.post(
+            leave.employee, leave.leave_type, year, month, LeaveLedgerEntry.Kind.CONSUMPTION,
+            used_delta=float(leave.duration_days),
+            reference=LeaveLedger._leave_reference(leave, 'CONSUME', consumed),
+            user=user, leave_request=leave,
+            note=f"{leave.start_date} - {leave.end_date}"
+        )
+
+    @staticmethod
+    def reverse(leave, user=None, note=''):
+        """
+        Give back what the current approval of a leave request consumed (cancel / reject /
+        document rejected as LOP). No-op if nothing was consumed or it was already reversed.
+        """
+        consumed, reversed_ = LeaveLedger._leave_cycles(leave)
+        if consumed <= reversed_:
+            return None
+        year, month, days = LeaveLedgerEntry.objects.filter(
+            reference=LeaveLedger._leave_reference(leave, 'CONSUME', reversed_)
+        ).values_list('year', 'month', 'used_delta').get()
+        return LeaveLedger.post(
+            leave.employee, leave.leave_type, year, month, LeaveLedgerEntry.Kind.REVERSAL,
+            used_delta=-days,
+            reference=LeaveLedger._leave_reference(leave, 'REVERSE', reversed_),
+            user=user, leave_request=leave, note=note
+        )
+
+    @staticmethod
+    def annual_leave_type():
+        return LeaveType.objects.get(code='ANN')
+
+    @staticmethod
+    def lock_balance(employee, leave_type, year, month=0):
+        """Row-locked balance for check-then-post flows (call inside transaction.atomic)"""
+        LeaveLedger._ensure_balance(employee, leave_type, year, month)
+        return LeaveBalance.objects.select_for_update().get(
+            employee=employee, leave_type=leave_type, year=year, month=month
+        )
+
+    @staticmethod
+    def lock_balances(leave_type, employees, buckets):
+        """
+        Bulk lock_balance(): {(employee_id, year, month): LeaveBalance} for the given
+        buckets of one leave type, created (with their opening accrual) if missing.
+        employees maps employee_id to the employee. Call inside transaction.atomic.
+        """
+        wanted = set(buckets)
+        years = {year for _, year, _ in wanted}
+        existing = set(LeaveBalance.objects.filter(
+            leave_type=leave_type, employee_id__in=employees, year__in=years
+        ).values_list('employee_id', 'year', 'month'))
+        for emp_id, year, month in wanted - existing:
+            LeaveLedger._ensure_balance(employees[emp_id], leave_type, year, month)
+
+        locked = LeaveBalance.objects.select_for_update().filter(
+            leave_type=leave_type, employee_id__in=employees, year__in=years,
+            month__in={month for _, _, month in wanted},
+        )
+        return {(b.employee_id, b.year, b.month): b for b in locked if (b.employee_id, b.year, b.month) in wanted}
+
+    @staticmethod
+    def convert_lop(adj, user=None, ann_type=None):
+        """Charge an approved LOP -> Annual Leave conversion against the AL balance"""
+        ann_type = ann_type or LeaveLedger.annual_leave_type()
+        year, month = LeaveLedger.period(ann_type, adj.created_at or timezone.now())
+        return LeaveLedger.post(
+            adj.employee, ann_type, year, month, LeaveLedgerEntry.Kind.LOP_CONVERSION,
+            used_delta=float(adj.requested_annual_leave_days),
+            reference=f"LOP:{adj.pk}:CONVERT",
+            user=user, lop_adjustment=adj
+        )
+
+    @staticmethod
+    def reverse_lop(adj, user=None):
+        """Return the AL days of a conversion that is being removed"""
+        consumed = LeaveLedgerEntry.objects.filter(
+            reference=f"LOP:{adj.pk}:CONVERT"
+        ).values_list('leave_type_id', 'year', 'month', 'used_delta').first()
+        if not consumed:
+            return None
+        leave_type_id, year, month, days = consumed
+        return LeaveLedger.post(
+            adj.employee, LeaveType.objects.get(pk=leave_type_id), year, month, LeaveLedgerEntry.Kind.LOP_REVERSAL,
+            used_delta=-days,
+            reference=f"LOP:{adj.pk}:REVERSE",
+            user=user, note=f"LOP adjustment #{adj.pk} removed"
+        )
+
+    # --- Period processing (set-based) ---
+    @staticmethod
+    def workforce():
+        """Employees balances are maintained for"""
+        return User.objects.filter(is_active=True).exclude(status='ARCHIVED')
+
+    @staticmethod
+    def process_period(on_date=None, user=None, batch_size=1000):
+        """
+        Year-end carry-forward, accruals and monthly resets for every employee and
+        leave type as of on_date, in a handful of bulk statements.
+        Idempotent per period: deltas are computed against what the ledger already
+        holds and every entry carries its period reference, so a re-run posts nothing.
+        """
+        on_date = on_date or timezone.localdate()
+        with transaction.atomic():
+            carried = LeaveLedger.carry_forward(on_date.year, user=user, batch_size=batch_size)
+            accrued = LeaveLedger.accrue_all(on_date, user=user, batch_size=batch_size)
+            archived = LeaveLedger.archive_closed_periods(on_date)
+        return {'carried': carried, 'accrued': accrued, 'archived': archived}
+
+    @staticmethod
+    def accrue_all(on_date, user=None, batch_size=1000):
+        """Bulk version of accrue() for the whole workforce; returns the number of entries posted"""
+        leave_types = list(LeaveType.objects.filter(is_active=True, status='ACTIVE'))
+        employees = list(LeaveLedger.workforce().values_list('pk', 'gender'))
+
+        # Everything accrued so far this period, in one grouped query
+        accrued = {
+            (row['employee_id'], row['leave_type_id'], row['month']): row['total']
+            for row in LeaveLedgerEntry.objects.filter(
+                kind=LeaveLedgerEntry.Kind.ACCRUAL, year=on_date.year, month__in=[0, on_date.month]
+            ).order_by().values('employee_id', 'leave_type_id', 'month').annotate(total=Sum('entitlement_delta'))
+        }
+
+        entries = []
+        for lt in leave_types:
+            year, month = LeaveLedger.period(lt, on_date)
+            target = LeaveLedger.entitlement_for(lt, on_date)
+            for emp_id, gender in employees:
+                if lt.eligibility_gender != LeaveType.GenderLimit.ALL and lt.eligibility_gender != gender:
+                    continue
+                delta = round(target - (accrued.get((emp_id, lt.pk, month)) or 0.0), 4)
+                if not delta:
+                    continue
+                entries.append(LeaveLedgerEntry(
+                    employee_id=emp_id, leave_type_id=lt.pk, year=year, month=month,
+                    kind=LeaveLedgerEntry.Kind.ACCRUAL, entitlement_delta=delta,
+                    reference=LeaveLedger._accrual_reference(emp_id, lt.pk, on_date, target),
+                    note=f"Accrued to {target:.2f} days", created_by=user
+                ))
+        return LeaveLedger.post_bulk(entries, batch_size, whole_buckets=True)
+
+    @staticmethod
+    def carry_forward(year, user=None, batch_size=1000):
+        """
+        Moves the unused days of carry-forward leave types from year - 1 into year.
+        Monthly-reset types never carry. Returns the number of entries posted.
+        """
+        already = set(LeaveLedgerEntry.objects.filter(
+            kind=LeaveLedgerEntry.Kind.CARRY_FORWARD, year=year
+        ).values_list('employee_id', 'leave_type_id'))
+
+        leftovers = LeaveBalance.objects.filter(
+            year=year - 1, month=0,
+            leave_type__is_carry_forward=True, leave_type__reset_monthly=False, leave_type__is_active=True,
+            employee__in=LeaveLedger.workforce()
+        ).annotate(
+            unused=F('total_entitlement') - F('days_used')
+        ).filter(unused__gt=0).values_list('employee_id', 'leave_type_id', 'unused')
+
+        entries = [
+            LeaveLedgerEntry(
+                employee_id=emp_id, leave_type_id=lt_id, year=year, month=0,
+                kind=LeaveLedgerEntry.Kind.CARRY_FORWARD, entitlement_delta=round(unused, 4),
+                reference=f"CARRY:{emp_id}:{lt_id}:{year}",
+                note=f"Carried forward from {year - 1}", created_by=user
+            )
+            for emp_id, lt_id, unused in leftovers
+            if (emp_id, lt_id) not in already
+        ]
+        return LeaveLedger.post_bulk(entries, batch_size, whole_buckets=True)
+
+    @staticmethod
+    def archive_closed_periods(on_date):
+        """Marks balances of past years and past months (monthly-reset types) as archived"""
+        return LeaveBalance.objects.filter(status=LeaveBalance.Status.ACTIVE).filter(
+            Q(year__lt=on_date.year) | Q(year=on_date.year, month__gt=0, month__lt=on_date.month)
+        ).update(status=LeaveBalance.Status.ARCHIVED, updated_at=timezone.now())
+
+    @staticmethod
+    def post_bulk(entries, batch_size=1000, whole_buckets=False):
+        """
+        Inserts ledger entries in bulk and re-derives the touched balances from the ledger.
+        Entries whose reference already exists (a concurrent run) are skipped by the database.
+        """
+        if not entries:
+            return 0
+
+        buckets = {(e.employee_id, e.leave_type_id, e.year, e.month) for e in entries}
+        LeaveBalance.objects.bulk_create(
+            [
+                LeaveBalance(employee_id=emp_id, leave_type_id=lt_id, year=year, month=month,
+                             total_entitlement=0.0, days_used=0.0)
+                for emp_id, lt_id, year, month in buckets
+            ],
+            batch_size=batch_size, ignore_conflicts=True
+        )
+        LeaveLedgerEntry.objects.bulk_create(entries, batch_size=batch_size, ignore_conflicts=True)
+
+        # Workforce-wide runs resync whole buckets; small batches only their own employees
+        employee_ids = None if whole_buckets else {emp_id for emp_id, _, _, _ in buckets}
+        for lt_id, year, month in {(lt_id, year, month) for _, lt_id, year, month in buckets}:
+            LeaveLedger.resync_balances(lt_id, year, month, employee_ids=employee_ids)
+
+        # Bulk inserts send no signals; refresh the self-service dashboards here
+        from core.ess import ESSDashboard
+        if employee_ids is None:
+            ESSDashboard.invalidate_all()
+        else:
+            ESSDashboard.mark_dirty(employee_ids, ('balances',))
+        return len(entries)
+
+    @staticmethod
+    def resync_balances(leave_type_id, year, month=0, employee_ids=None):
+        """
+        Sets the balances of one (type, period) bucket to the sum of their ledger entries - one UPDATE.
+        Balances without any ledger entry are left as they are rather than zeroed.
+        """
+        ledger = LeaveLedgerEntry.objects.filter(
+            employee=OuterRef('employee'), leave_type_id=leave_type_id, year=year, month=month
+        ).order_by().values('employee')
+        balances = LeaveBalance.objects.filter(
+            Exists(ledger), leave_type_id=leave_type_id, year=year, month=month
+        )
+        if employee_ids is not None:
+            balances = balances.filter(employee_id__in=employee_ids)
+        return balances.update(
+            total_entitlement=Coalesce(Subquery(ledger.annotate(total=Sum('entitlement_delta')).values('total')), 0.0),
+            days_used=Coalesce(Subquery(ledger.annotate(total=Sum('used_delta')).values('total')), 0.0),
+            updated_at=timezone.now()
+        )
+
+    # --- Maintenance ---
+    @staticmethod
+    def rebuild_year(year):
+        """
+        Re-derives a year's ledger and balances from the leave requests and LOP conversions.
+        Used for reconciliation (the pre-ledger balances are seeded by migration 0018).
+        """
+        with transaction.atomic():
+            LeaveLedgerEntry.objects.filter(year=year).delete()
+            LeaveBalance.objects.filter(year=year).delete()
+
+            # Opening balances first, so the requests below are charged against them
+            LeaveLedger.carry_forward(year)
+            LeaveLedger.accrue_all(LeaveLedger._as_of(year))
+
+            requests = LeaveRequest.objects.filter(
+                start_date__year=year, status__in=LeaveLedger.CONSUMED_STATUSES
+            ).select_related('employee', 'leave_type').order_by('pk')
+            for leave in requests:
+                LeaveLedger.consume(leave)
+                if leave.payment_status == LeaveRequest.PaymentStatus.LOP and leave.document_status == LeaveRequest.DocumentStatus.REJECTED:
+                    LeaveLedger.reverse(leave, note="Document rejected - Loss of Pay")
+
+            conversions = LOPAdjustment.objects.filter(
+                created_at__year=year, status=LOPAdjustment.Status.APPROVED
+            ).select_related('employee').order_by('pk')
+            if conversions.exists():
+                ann_type = LeaveLedger.annual_leave_type()
+                for adj in conversions:
+                    LeaveLedger.convert_lop(adj, ann_type=ann_type)
@@ -0,0 +1,182 @@
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from core.models import AuditLog
+from .ledger import LeaveLedger
+from .models import LeaveLedgerEntry, LeaveType, LOPAdjustment
+
+LOP_COMPONENT_NAME = "Loss of Pay (Shortfall)"
+
+
+class LOPAdjustmentService:
+    """
+    Batch engine for LOP -> Annual Leave conversions.
+    Reference data is resolved once, every affected row is locked with one query
+    per table, and balances, LOP deductions, payroll entries and the adjustments
+    themselves are written with bulk statements. Items that cannot be processed
+    are reported back instead of aborting the batch.
+    """
+
+    @staticmethod
+    def approve(adjustment_ids, user, request=None):
+        """
+        Approves the given PENDING adjustments.
+        Returns (approved adjustments, [(adjustment id, employee name, error), ...]).
+        """
+        from payroll.models import DeductionComponent, PayrollEntry
+
+        failures = []
+        with transaction.atomic():
+            adjustments = LOPAdjustmentService._lock_pending(adjustment_ids, failures)
+            if not adjustments:
+                return [], failures
+
+            try:
+                ann_type = LeaveLedger.annual_leave_type()
+            except LeaveType.DoesNotExist:
+                failures.extend((adj.pk, adj.employee.full_name, "Annual Leave policy (ANN) not found.") for adj in adjustments)
+                return [], failures
+            lop_component = DeductionComponent.objects.filter(name=LOP_COMPONENT_NAME).first()
+
+            # Annual Leave balances, locked in one query; remaining is tracked in memory
+            # so several conversions for the same employee draw on the same balance
+            keys = {}
+            for adj in adjustments:
+                year, month = LeaveLedger.period(ann_type, adj.created_at)
+                keys[adj.pk] = (adj.employee_id, year, month)
+            balances = LeaveLedger.lock_balances(
+                ann_type, {adj.employee_id: adj.employee for adj in adjustments}, keys.values()
+            )
+            remaining = {key: b.remaining for key, b in balances.items()}
+
+            entries = {
+                pe.pk: pe for pe in PayrollEntry.objects.select_for_update().select_related('employee').filter(
+                    pk__in={adj.payroll_entry_id for adj in adjustments if adj.payroll_entry_id}
+                )
+            }
+
+            approved = []
+            for adj in adjustments:
+                key = keys[adj.pk]
+                days = float(adj.requested_annual_leave_days)
+                if float(remaining.get(key, 0.0)) < days:
+                    failures.append((adj.pk, adj.employee.full_name, "Insufficient Annual Leave balance remaining."))
+                    continue
+                remaining[key] -= days
+
+                pe = entries.get(adj.payroll_entry_id)
+                if pe:
+                    pe.shortfall_work_hours = max(Decimal('0'), pe.shortfall_work_hours - Decimal(str(adj.converted_hours)))
+                    # Reduce days_absent if full days adjusted
+                    pe.days_absent = max(0, pe.days_absent - int(adj.requested_annual_leave_days))
+                    pe.lop_deduction = round(pe.shortfall_work_hours * pe.employee.hourly_salary, 2)
+                approved.append(adj)
+
+            if not approved:
+                return [], failures
+
+            touched = {adj.payroll_entry_id: entries[adj.payroll_entry_id] for adj in approved if adj.payroll_entry_id in entries}
+            if touched:
+                LOPAdjustmentService._apply_payroll_changes(touched, lop_component)
+
+            now = timezone.now()
+            for adj in approved:
+                adj.status = LOPAdjustment.Status.APPROVED
+                adj.authorized_by = user
+                adj.authorized_at = now
+            LOPAdjustment.objects.bulk_update(approved, ['status', 'authorized_by', 'authorized_at'])
+
+            LeaveLedger.post_bulk([
+                LeaveLedgerEntry(
+                    employee_id=adj.employee_id, leave_type_id=ann_type.pk,
+                    year=keys[adj.pk][1], month=keys[adj.pk][2],
+                    kind=LeaveLedgerEntry.Kind.LOP_CONVERSION,
+                    used_delta=float(adj.requested_annual_leave_days),
+                    reference=f"LOP:{adj.pk}:CONVERT",
+                    created_by=user, lop_adjustment=adj
+                )
+                for adj in approved
+            ])
+
+            LOPAdjustmentService._audit(approved, user, AuditLog.Action.APPROVE, request)
+        return approved, failures
+
+    @staticmethod
+    def reject(adjustment_ids, user, reason='', request=None):
+        """Rejects the given PENDING adjustments; same return shape as approve()"""
+        failures = []
+        with transaction.atomic():
+            adjustments = LOPAdjustmentService._lock_pending(adjustment_ids, failures)
+            for adj in adjustments:
+                adj.status = LOPAdjustment.Status.REJECTED
+                adj.authorized_by = user
+                if reason:
+                    adj.rejection_reason = reason
+            LOPAdjustment.objects.bulk_update(adjustments, ['status', 'authorized_by', 'rejection_reason'])
+            LOPAdjustmentService._audit(adjustments, user, AuditLog.Action.REJECT, request)
+        return adjustments, failures
+
+    @staticmethod
+    def _lock_pending(adjustment_ids, failures):
+        """Locks the requested adjustments in one query; anything not PENDING any more is a failure"""
+        ids = {int(pk) for pk in adjustment_ids if str(pk).isdigit()}
+        adjustments = list(
+            LOPAdjustment.objects.select_for_update().select_related('employee').filter(pk__in=ids).order_by('pk')
+        )
+        found = {adj.pk for adj in adjustments}
+        failures.extend((pk, '', "Adjustment not found.") for pk in sorted(ids - found))
+
+        pending = []
+        for adj in adjustments:
+            if adj.status != LOPAdjustment.Status.PENDING:
+                failures.append((adj.pk, adj.employee.full_name, "This adjustment has already been processed."))
+            else:
+                pending.append(adj)
+        return pending
+
+    @staticmethod
+    def _apply_payroll_changes(entries, lop_component):
+        """Rewrites the LOP deduction rows and re-totals the payroll entries - bulk statements only"""
+        from payroll.models import PayrollDeduction, PayrollEntry
+
+        if lop_component:
+            deductions = list(PayrollDeduction.objects.select_for_update().filter(
+                payroll_entry_id__in=entries, component=lop_component
+            ))
+            to_update, to_delete = [], []
+            for ded in deductions:
+                pe = entries[ded.payroll_entry_id]
+                if pe.lop_deduction > 0:
+                    ded.amount = pe.lop_deduction
+                    ded.approved_amount = pe.lop_deduction
+                    to_update.append(ded)
+                else:
+                    to_delete.append(ded.pk)
+            PayrollDeduction.objects.bulk_update(to_update, ['amount', 'approved_amount'])
+            if to_delete:
+                PayrollDeduction.objects.filter(pk__in=to_delete).delete()
+
+        # Recalculate total deductions from all PayrollDeduction records, one grouped query
+        totals = dict(PayrollDeduction.objects.filter(
+            payroll_entry_id__in=entries, is_waived=False
+        ).order_by().values('payroll_entry').annotate(total=Sum('amount')).values_list('payroll_entry', 'total'))
+
+        now = timezone.now()
+        for pe in entries.values():
+            pe.deductions = round(totals.get(pe.pk) or Decimal('0.00'), 2)
+            pe.net_salary = max(Decimal('0.00'), pe.gross_salary - pe.deductions)
+            pe.updated_at = now
+        PayrollEntry.objects.bulk_update(
+            list(entries.values()),
+            ['shortfall_work_hours', 'days_absent', 'lop_deduction', 'deductions', 'net_salary', 'updated_at']
+        )
+
+    @staticmethod
+    def _audit(adjustments, user, action, request=None):
+        """Bulk writes skip the audit signals, so log each adjustment explicitly"""
+        for adj in adjustments:
+            AuditLog.log(
+                user=user, action=action, obj=adj, request=request, module=AuditLog.Module.LEAVES,
+                changes={'status': adj.status, 'requested_annual_leave_days': adj.requested_annual_leave_days}
+            )
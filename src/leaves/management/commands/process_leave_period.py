@@ -0,0 +1,31 @@
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from leaves.ledger import LeaveLedger
+
+
+class Command(BaseCommand):
+    help = (
+        "Post leave accruals, year-end carry-forward and monthly resets for all employees. "
+        "Schedule daily (or at least on the 1st of every month); re-running for the same period is a no-op."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="As-of date (YYYY-MM-DD), defaults to today")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        on_date = None
+        if options['date']:
+            try:
+                on_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("Invalid --date, expected YYYY-MM-DD")
+
+        started = time.monotonic()
+        result = LeaveLedger.process_period(on_date, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Leave period processed in {time.monotonic() - started:.1f}s: "
+            f"{result['accrued']} accruals, {result['carried']} carry-forwards, "
+            f"{result['archived']} balances archived"
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from leaves.models import LeaveDay, LeaveRequest
+
+
+class Command(BaseCommand):
+    help = "Rebuild the expanded LeaveDay index from leave requests. Backfilled on migrate; run to reconcile."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help="Only requests starting in this year")
+
+    def handle(self, *args, **options):
+        requests = LeaveRequest.objects.filter(
+            status__in=LeaveDay.EFFECTIVE_STATUSES, is_active=True
+        ).select_related('leave_type')
+        stale = LeaveDay.objects.all()
+        if options['year']:
+            requests = requests.filter(start_date__year=options['year'])
+            stale = stale.filter(leave_request__start_date__year=options['year'])
+
+        total = 0
+        with transaction.atomic():
+            stale.delete()
+            for leave in requests.iterator():
+                total += LeaveDay.sync(leave)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} leave days."))
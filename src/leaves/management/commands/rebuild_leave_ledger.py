@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from leaves.ledger import LeaveLedger
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the leave ledger and balances for a year from approved leave requests and LOP conversions. "
+        "The ledger is seeded from the existing balances on migrate; run this when balances need reconciling."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, action='append', help="Year to rebuild (repeatable). Defaults to the current year")
+
+    def handle(self, *args, **options):
+        years = options['year'] or [timezone.localdate().year]
+        for year in years:
+            LeaveLedger.rebuild_year(year)
+            self.stdout.write(self.style.SUCCESS(f"Leave ledger rebuilt for {year}."))
@@ -0,0 +1,79 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0013_lop_adjustment_cascade_on_delete'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField(default=0)),
+                ('kind', models.CharField(choices=[('ACCRUAL', 'Accrual'), ('CONSUMPTION', 'Leave Approved'), ('REVERSAL', 'Leave Reversed'), ('LOP_CONVERSION', 'LOP Converted'), ('LOP_REVERSAL', 'LOP Conversion Reversed'), ('ADJUSTMENT', 'Manual Adjustment')], max_length=20)),
+                ('entitlement_delta', models.FloatField(default=0.0)),
+                ('used_delta', models.FloatField(default=0.0)),
+                ('reference', models.CharField(blank=True, max_length=100, null=True, unique=True)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='leavebalance',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='leavebalance',
+            name='month',
+            field=models.IntegerField(default=0, help_text='0 = whole year; 1-12 for leave types that reset monthly'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='leavebalance',
+            unique_together={('employee', 'leave_type', 'year', 'month')},
+        ),
+        migrations.AddIndex(
+            model_name='leavebalance',
+            index=models.Index(fields=['employee', 'year', 'month'], name='leaves_leav_employe_6411bb_idx'),
+        ),
+        migrations.AddField(
+            model_name='leaveledgerentry',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='leaveledgerentry',
+            name='employee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_ledger', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='leaveledgerentry',
+            name='leave_request',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='leaves.leaverequest'),
+        ),
+        migrations.AddField(
+            model_name='leaveledgerentry',
+            name='leave_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='leaves.leavetype'),
+        ),
+        migrations.AddField(
+            model_name='leaveledgerentry',
+            name='lop_adjustment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='leaves.lopadjustment'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveledgerentry',
+            index=models.Index(fields=['employee', 'leave_type', 'year', 'month'], name='leaves_leav_employe_d78ba1_idx'),
+        ),
+    ]
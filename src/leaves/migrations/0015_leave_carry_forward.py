@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0014_leave_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='leaveledgerentry',
+            name='kind',
+            field=models.CharField(choices=[('ACCRUAL', 'Accrual'), ('CONSUMPTION', 'Leave Approved'), ('REVERSAL', 'Leave Reversed'), ('LOP_CONVERSION', 'LOP Converted'), ('LOP_REVERSAL', 'LOP Conversion Reversed'), ('ADJUSTMENT', 'Manual Adjustment'), ('CARRY_FORWARD', 'Carried Forward')], max_length=20),
+        ),
+    ]
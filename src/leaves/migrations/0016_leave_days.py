@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0015_leave_carry_forward'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('fraction', models.DecimalField(decimal_places=2, default=1, help_text='1.00 full day, 0.50 half day', max_digits=3)),
+                ('is_paid', models.BooleanField(default=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_days', to=settings.AUTH_USER_MODEL)),
+                ('leave_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='leaves.leaverequest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'employee'], name='leaves_leav_date_04ec19_idx'), models.Index(fields=['employee', 'date'], name='leaves_leav_employe_a07724_idx')],
+                'unique_together': {('leave_request', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:52
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0016_leave_days'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='leaverequest',
+            name='attachment',
+            field=models.FileField(blank=True, help_text='Medical certificate or supporting document.', null=True, storage=core.storage.document_storage, upload_to='leave_documents/'),
+        ),
+    ]
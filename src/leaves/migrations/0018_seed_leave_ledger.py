@@ -0,0 +1,146 @@
+from datetime import date
+
+from django.db import migrations
+from django.utils import timezone
+
+CONSUMED_STATUSES = ('APPROVED', 'HR_PROCESSED')
+
+
+def _period(leave_type, on_date):
+    """Same as LeaveLedger.period()"""
+    return on_date.year, (on_date.month if leave_type.reset_monthly else 0)
+
+
+def _entitlement(leave_type, year, month):
+    """LeaveLedger.entitlement_for() as of LeaveLedger._as_of(year, month)"""
+    today = timezone.localdate()
+    if year < today.year:
+        on_date = date(year, month or 12, 1)
+    elif year > today.year:
+        on_date = date(year, month or 1, 1)
+    else:
+        on_date = today if not month else date(year, month, 1)
+    total_quota = float(leave_type.days_entitlement)
+    if leave_type.accrual_frequency == 'MONTHLY':
+        if leave_type.reset_monthly:
+            total_quota = total_quota / 12.0
+        else:
+            total_quota = (total_quota / 12.0) * max(1, on_date.month)
+    return total_quota
+
+
+def _duration(leave):
+    """Same as LeaveRequest.duration_days"""
+    if leave.half_day:
+        return 0.5
+    return (leave.end_date - leave.start_date).days + 1
+
+
+def seed_ledger(apps, schema_editor):
+    """
+    Opens the ledger on the pre-ledger balances, so reversals of earlier approvals
+    and the period jobs start from the balances employees actually had:
+    - approved requests and LOP conversions get the entries LeaveLedger posts for them
+      (same references, so consume()/reverse() pick them up);
+    - every existing balance gets an opening accrual of its entitlement, plus an
+      adjustment for whatever of its days_used the requests do not explain;
+    - monthly-reset types move from their single yearly row to month buckets.
+    Skipped if the ledger already holds entries (rebuild_leave_ledger was run).
+    """
+    LeaveType = apps.get_model('leaves', 'LeaveType')
+    LeaveBalance = apps.get_model('leaves', 'LeaveBalance')
+    LeaveLedgerEntry = apps.get_model('leaves', 'LeaveLedgerEntry')
+    LeaveRequest = apps.get_model('leaves', 'LeaveRequest')
+    LOPAdjustment = apps.get_model('leaves', 'LOPAdjustment')
+
+    if LeaveLedgerEntry.objects.exists():
+        return
+
+    leave_types = {lt.pk: lt for lt in LeaveType.objects.all()}
+    entries = []
+
+    def add(employee_id, leave_type_id, year, month, kind, reference, entitlement_delta=0.0, used_delta=0.0, **extra):
+        entries.append(LeaveLedgerEntry(
+            employee_id=employee_id, leave_type_id=leave_type_id, year=year, month=month, kind=kind,
+            entitlement_delta=entitlement_delta, used_delta=used_delta, reference=reference, **extra
+        ))
+
+    for leave in LeaveRequest.objects.filter(status__in=CONSUMED_STATUSES).order_by('pk').iterator(chunk_size=1000):
+        year, month = _period(leave_types[leave.leave_type_id], leave.start_date)
+        days = float(_duration(leave))
+        add(leave.employee_id, leave.leave_type_id, year, month, 'CONSUMPTION', f"LEAVE:{leave.pk}:CONSUME",
+            used_delta=days, leave_request_id=leave.pk, note=f"{leave.start_date} - {leave.end_date}")
+        if leave.payment_status == 'LOP' and leave.document_status == 'REJECTED':
+            add(leave.employee_id, leave.leave_type_id, year, month, 'REVERSAL', f"LEAVE:{leave.pk}:REVERSE",
+                used_delta=-days, leave_request_id=leave.pk, note="Document rejected - Loss of Pay")
+
+    ann_type = next((lt for lt in leave_types.values() if lt.code == 'ANN'), None)
+    if ann_type is not None:
+        for adj in LOPAdjustment.objects.filter(status='APPROVED').order_by('pk'):
+            year, month = _period(ann_type, timezone.localtime(adj.created_at) if adj.created_at else timezone.localdate())
+            add(adj.employee_id, ann_type.pk, year, month, 'LOP_CONVERSION', f"LOP:{adj.pk}:CONVERT",
+                used_delta=float(adj.requested_annual_leave_days), lop_adjustment_id=adj.pk)
+
+    # Days charged per bucket by the entries above
+    charged = {}
+    for e in entries:
+        key = (e.employee_id, e.leave_type_id, e.year, e.month)
+        charged[key] = charged.get(key, 0.0) + e.used_delta
+
+    # Yearly balances carry over as they stand. Monthly-reset types only ever showed the
+    # current month in their yearly row; their month buckets are rebuilt from the requests.
+    balances = {}
+    for balance in LeaveBalance.objects.filter(month=0).iterator(chunk_size=1000):
+        if leave_types[balance.leave_type_id].reset_monthly:
+            continue
+        key = (balance.employee_id, balance.leave_type_id, balance.year, 0)
+        balances[key] = balance
+        add(*key, 'ACCRUAL', f"SEED:{balance.employee_id}:{balance.leave_type_id}:{balance.year}:OPENING",
+            entitlement_delta=float(balance.total_entitlement), note="Opening balance")
+        unexplained = round(float(balance.days_used) - charged.get(key, 0.0), 4)
+        if unexplained:
+            add(*key, 'ADJUSTMENT', f"SEED:{balance.employee_id}:{balance.leave_type_id}:{balance.year}:USED",
+                used_delta=unexplained, note="Days used before the ledger")
+    LeaveBalance.objects.filter(month=0, leave_type__reset_monthly=True).delete()
+
+    # Buckets only the requests touch accrue the policy entitlement
+    for key in set(charged) - set(balances):
+        employee_id, leave_type_id, year, month = key
+        target = _entitlement(leave_types[leave_type_id], year, month)
+        if target:
+            add(*key, 'ACCRUAL', f"SEED:{employee_id}:{leave_type_id}:{year}-{month:02d}:OPENING",
+                entitlement_delta=target, note=f"Accrued to {target:.2f} days")
+
+    LeaveLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+    totals = {}
+    for e in entries:
+        key = (e.employee_id, e.leave_type_id, e.year, e.month)
+        entitlement, used = totals.get(key, (0.0, 0.0))
+        totals[key] = (entitlement + e.entitlement_delta, used + e.used_delta)
+
+    updated, created = [], []
+    for key, (entitlement, used) in totals.items():
+        balance = balances.get(key)
+        if balance is None:
+            employee_id, leave_type_id, year, month = key
+            created.append(LeaveBalance(
+                employee_id=employee_id, leave_type_id=leave_type_id, year=year, month=month,
+                total_entitlement=entitlement, days_used=used
+            ))
+        else:
+            balance.total_entitlement, balance.days_used = entitlement, used
+            updated.append(balance)
+    LeaveBalance.objects.bulk_update(updated, ['total_entitlement', 'days_used'], batch_size=1000)
+    LeaveBalance.objects.bulk_create(created, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0017_content_addressed_attachments'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_ledger, migrations.RunPython.noop),
+    ]
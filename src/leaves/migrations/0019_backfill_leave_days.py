@@ -0,0 +1,52 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import migrations
+
+EFFECTIVE_STATUSES = ['MGR_APPROVED', 'HR_PROCESSED', 'APPROVED']
+
+
+def _is_paid(leave):
+    """Same as LeaveRequest.is_paid_leave"""
+    if leave.payment_status == 'LOP':
+        return False
+    if not (leave.payment_status == 'PAID' or leave.leave_type.is_paid):
+        return False
+    return not ('sick' in leave.leave_type.name.lower() and leave.document_status != 'VERIFIED')
+
+
+def backfill_leave_days(apps, schema_editor):
+    """Same expansion as LeaveDay.sync(), on the historical models"""
+    LeaveRequest = apps.get_model('leaves', 'LeaveRequest')
+    LeaveDay = apps.get_model('leaves', 'LeaveDay')
+
+    requests = LeaveRequest.objects.filter(
+        status__in=EFFECTIVE_STATUSES, is_active=True,
+        start_date__isnull=False, end_date__isnull=False
+    ).select_related('leave_type').order_by('pk')
+
+    LeaveDay.objects.all().delete()
+    days = []
+    for leave in requests.iterator(chunk_size=1000):
+        fraction = Decimal('0.50') if leave.half_day else Decimal('1.00')
+        is_paid = _is_paid(leave)
+        days.extend(
+            LeaveDay(employee_id=leave.employee_id, leave_request_id=leave.pk,
+                     date=leave.start_date + timedelta(days=i), fraction=fraction, is_paid=is_paid)
+            for i in range((leave.end_date - leave.start_date).days + 1)
+        )
+        if len(days) >= 1000:
+            LeaveDay.objects.bulk_create(days, batch_size=1000)
+            days = []
+    LeaveDay.objects.bulk_create(days, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0018_seed_leave_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_leave_days, migrations.RunPython.noop),
+    ]
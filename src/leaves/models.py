@@ -2,6 +2,8 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
+from core.storage import document_storage
 
 class LeaveType(models.Model):
     name = models.CharField(max_length=50) # Annual, Sick, Unpaid, Maternity
@@ -67,6 +69,7 @@ class LeaveBalance(models.Model):
     employee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='leave_balances')
     leave_type = models.ForeignKey(LeaveType, on_delete=models.PROTECT)
     year = models.IntegerField(default=2024)
+    month = models.IntegerField(default=0, help_text="0 = whole year; 1-12 for leave types that reset monthly")
     
     class Status(models.TextChoices):
         ACTIVE = "ACTIVE", "Active"
@@ -85,11 +88,56 @@ class LeaveBalance(models.Model):
         return self.total_entitlement - self.days_used
 
     class Meta:
-        unique_together = ('employee', 'leave_type', 'year')
+        unique_together = ('employee', 'leave_type', 'year', 'month')
+        indexes = [
+            models.Index(fields=['employee', 'year', 'month']),
+        ]
         
     def __str__(self):
         return f"{self.employee.full_name} - {self.leave_type.code}: {self.remaining}"
 
+class LeaveLedgerEntry(models.Model):
+    """
+    Append-only record of every movement on a leave balance.
+    LeaveBalance is the running total of these rows, maintained incrementally by
+    leaves.ledger.LeaveLedger - never edit or delete entries, post a correcting one instead.
+    """
+    class Kind(models.TextChoices):
+        ACCRUAL = "ACCRUAL", "Accrual"
+        CONSUMPTION = "CONSUMPTION", "Leave Approved"
+        REVERSAL = "REVERSAL", "Leave Reversed"
+        LOP_CONVERSION = "LOP_CONVERSION", "LOP Converted"
+        LOP_REVERSAL = "LOP_REVERSAL", "LOP Conversion Reversed"
+        ADJUSTMENT = "ADJUSTMENT", "Manual Adjustment"
+        CARRY_FORWARD = "CARRY_FORWARD", "Carried Forward"
+
+    employee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='leave_ledger')
+    leave_type = models.ForeignKey(LeaveType, on_delete=models.PROTECT)
+    year = models.IntegerField()
+    month = models.IntegerField(default=0)
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    
+    entitlement_delta = models.FloatField(default=0.0)
+    used_delta = models.FloatField(default=0.0)
+    
+    leave_request = models.ForeignKey('LeaveRequest', on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    lop_adjustment = models.ForeignKey('LOPAdjustment', on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    # Natural key of the business event (e.g. "LEAVE:42:CONSUME") - makes posting idempotent
+    reference = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    note = models.CharField(max_length=255, blank=True)
+    
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['employee', 'leave_type', 'year', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.year}: entitlement {self.entitlement_delta:+}, used {self.used_delta:+}"
+
 class LeaveRequest(models.Model):
     class Status(models.TextChoices):
         PENDING = "PENDING", "Pending Manager"
@@ -140,7 +188,7 @@ class LeaveRequest(models.Model):
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     
     # Document Workflow
-    attachment = models.FileField(upload_to='leave_documents/', null=True, blank=True, help_text="Medical certificate or supporting document.")
+    attachment = models.FileField(upload_to='leave_documents/', storage=document_storage, null=True, blank=True, help_text="Medical certificate or supporting document.")
     document_status = models.CharField(max_length=20, choices=DocumentStatus.choices, default=DocumentStatus.NONE)
     payment_status = models.CharField(max_length=20, choices=PaymentStatus.choices, default=PaymentStatus.PENDING)
     
@@ -199,6 +247,59 @@ class LeaveRequest(models.Model):
     def __str__(self):
         return f"{self.employee.full_name} - {self.leave_type.code} ({self.start_date})"
 
+    @property
+    def is_paid_leave(self):
+        """Paid for payroll purposes; sick leave only once its certificate is verified"""
+        if self.payment_status == self.PaymentStatus.LOP:
+            return False
+        if not (self.payment_status == self.PaymentStatus.PAID or self.leave_type.is_paid):
+            return False
+        return not (self.is_sick_leave and self.document_status != self.DocumentStatus.VERIFIED)
+
+class LeaveDay(models.Model):
+    """
+    One row per calendar day covered by an effective (manager approved or later)
+    leave request, maintained by leaves.signals. "Who is on leave on D" and
+    "paid leave days in a month" become indexed lookups on date instead of
+    start/end overlap scans over LeaveRequest.
+    """
+    EFFECTIVE_STATUSES = ['MGR_APPROVED', 'HR_PROCESSED', 'APPROVED']
+
+    employee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='leave_days')
+    leave_request = models.ForeignKey(LeaveRequest, on_delete=models.CASCADE, related_name='days')
+    date = models.DateField()
+    fraction = models.DecimalField(max_digits=3, decimal_places=2, default=1, help_text="1.00 full day, 0.50 half day")
+    is_paid = models.BooleanField(default=True)
+
+    class Meta:
+        unique_together = ('leave_request', 'date')
+        indexes = [
+            models.Index(fields=['date', 'employee']),
+            models.Index(fields=['employee', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} on leave {self.date} ({self.fraction})"
+
+    @classmethod
+    def sync(cls, leave):
+        """Rewrites the day rows of one leave request from its current state"""
+        from core.kpi import DailyKPIs
+        cls.objects.filter(leave_request=leave).delete()
+        days = []
+        if leave.is_active and leave.status in cls.EFFECTIVE_STATUSES and leave.start_date and leave.end_date:
+            fraction = Decimal('0.50') if leave.half_day else Decimal('1.00')
+            is_paid = leave.is_paid_leave
+            days = [
+                cls(employee_id=leave.employee_id, leave_request=leave, date=leave.start_date + timedelta(days=i),
+                    fraction=fraction, is_paid=is_paid)
+                for i in range((leave.end_date - leave.start_date).days + 1)
+            ]
+            cls.objects.bulk_create(days)
+        # Bulk writes send no signals; refresh the on-leave KPI once the rows are in place
+        DailyKPIs.mark_dirty('leave_days')
+        return len(days)
+
 class TicketRequest(models.Model):
     class TicketStatus(models.TextChoices):
         REQUESTED = "REQUESTED", "Requested"
@@ -0,0 +1,81 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from core.imaging import DocumentImages
+from core.storage import note_upload, release_file, release_replaced
+from .models import LeaveDay, LeaveRequest, LeaveType
+from .updates import LeaveUpdates
+
+# LeaveRequest fields that decide which LeaveDay rows exist and what they say
+LEAVE_DAY_FIELDS = (
+    'employee_id', 'leave_type_id', 'start_date', 'end_date', 'half_day', 'status',
+    'payment_status', 'document_status', 'is_active',
+)
+
+
+@receiver(post_save, sender=LeaveRequest)
+def sync_leave_days(sender, instance, created, raw=False, **kwargs):
+    """Keep the expanded LeaveDay rows in step with the request"""
+    if raw:
+        return
+    if not created:
+        old = getattr(instance, '_old_instance', None)  # set by core.signals.store_old_instance
+        if old and all(getattr(old, f) == getattr(instance, f) for f in LEAVE_DAY_FIELDS):
+            return
+    LeaveDay.sync(instance)
+
+
+@receiver(post_save, sender=LeaveType)
+def sync_leave_days_for_type(sender, instance, created, **kwargs):
+    """The paid flag depends on the type (is_paid, and the name for sick leave)"""
+    if created:
+        return
+    old = getattr(instance, '_old_instance', None)
+    if old and old.is_paid == instance.is_paid and old.name == instance.name:
+        return
+    requests = LeaveRequest.objects.filter(
+        leave_type=instance, status__in=LeaveDay.EFFECTIVE_STATUSES, is_active=True
+    ).select_related('leave_type')
+    for leave in requests:
+        LeaveDay.sync(leave)
+
+
+@receiver(post_save, sender=LeaveRequest)
+def bump_leave_updates(sender, instance, raw=False, **kwargs):
+    """Tell open leave pages (check_updates) that something they show has changed"""
+    if raw:
+        return
+    LeaveUpdates.bump_for(instance, getattr(instance, '_old_instance', None))
+
+
+@receiver(post_delete, sender=LeaveRequest)
+def bump_leave_updates_on_delete(sender, instance, **kwargs):
+    LeaveUpdates.bump_for(instance)
+
+
+@receiver(pre_save, sender=LeaveRequest)
+def note_attachment_upload(sender, instance, raw=False, **kwargs):
+    if not raw:
+        note_upload(instance, 'attachment')
+
+
+@receiver(post_save, sender=LeaveRequest)
+def release_replaced_attachment(sender, instance, created, raw=False, **kwargs):
+    """A re-uploaded certificate drops its reference on the previous file (core.storage)"""
+    if created or raw:
+        return
+    release_replaced(instance, 'attachment')
+
+
+@receiver(post_delete, sender=LeaveRequest)
+def release_attachment_on_delete(sender, instance, **kwargs):
+    release_file(instance.attachment)
+
+
+@receiver(post_save, sender=LeaveRequest)
+def queue_attachment_images(sender, instance, created, raw=False, **kwargs):
+    """New certificate photos get a viewing copy and thumbnail from the image worker"""
+    if raw or not instance.attachment:
+        return
+    old = getattr(instance, '_old_instance', None)
+    if created or not old or old.attachment.name != instance.attachment.name:
+        DocumentImages.enqueue(instance.attachment)
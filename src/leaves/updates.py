@@ -0,0 +1,92 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+class LeaveUpdates:
+    """
+    Change versions behind the leave live-update endpoint (check_updates).
+    Every user has a counter in the cache, and admins/HR/CEO additionally follow an
+    organisation-wide one. Counters are bumped when a LeaveRequest they can see changes,
+    so a poll only has to compare versions - no database work while nothing changed.
+
+    The counters only mean the same thing in every worker when the cache is shared
+    (settings.CACHE_SHARED). Otherwise the version is read from the requests themselves
+    (latest change and row count, one aggregate query), so all workers agree on it.
+    """
+    KEY = 'leave_updates:{}'
+    ALL = 'all'
+
+    @staticmethod
+    def sees_all(user):
+        return user.is_superuser or user.is_admin() or user.is_ceo() or user.is_hr()
+
+    @staticmethod
+    def scopes(user):
+        scopes = [f'user:{user.pk}']
+        if LeaveUpdates.sees_all(user):
+            scopes.append(LeaveUpdates.ALL)
+        return scopes
+
+    @staticmethod
+    def _seed():
+        # Unknown counters start from the clock, so after a cache flush a client
+        # never gets back a version it already holds
+        return time.time_ns() // 1000
+
+    @staticmethod
+    def _data_version(user):
+        from django.db.models import Count, Max, Q
+        from .models import LeaveRequest
+        rows = LeaveRequest.objects.all()
+        if not LeaveUpdates.sees_all(user):
+            rows = rows.filter(Q(employee=user) | Q(assigned_manager=user))
+        found = rows.aggregate(changed=Max('updated_at'), count=Count('pk'))
+        changed = int(found['changed'].timestamp() * 1_000_000) if found['changed'] else 0
+        return f"{changed}-{found['count']}"
+
+    @staticmethod
+    def version(user):
+        if not settings.CACHE_SHARED:
+            return LeaveUpdates._data_version(user)
+        keys = [LeaveUpdates.KEY.format(scope) for scope in LeaveUpdates.scopes(user)]
+        found = cache.get_many(keys)
+        for key in keys:
+            if key not in found:
+                cache.add(key, LeaveUpdates._seed(), timeout=None)
+                found[key] = cache.get(key)
+        return '-'.join(str(found[key]) for key in keys)
+
+    @staticmethod
+    def etag(user):
+        return f'"{LeaveUpdates.version(user)}"'
+
+    @staticmethod
+    def bump(*scopes):
+        for scope in set(scopes):
+            key = LeaveUpdates.KEY.format(scope)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, LeaveUpdates._seed(), timeout=None)
+
+    @staticmethod
+    def bump_for(leave, old=None):
+        """Bumps everyone who can see this request, once the surrounding transaction commits"""
+        scopes = {LeaveUpdates.ALL, f'user:{leave.employee_id}'}
+        for instance in (leave, old):
+            if instance is not None and instance.assigned_manager_id:
+                scopes.add(f'user:{instance.assigned_manager_id}')
+        transaction.on_commit(lambda: LeaveUpdates.bump(*scopes))
+
+    @staticmethod
+    def wait_for_change(user, etag, timeout, interval=1.0):
+        """Long-poll: returns the new ETag as soon as it differs from etag, or etag after timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(interval)
+            current = LeaveUpdates.etag(user)
+            if current != etag:
+                return current
+        return etag
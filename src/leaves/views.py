@@ -1,104 +1,64 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from .models import LeaveRequest, LeaveType, LeaveBalance, LOPAdjustment
+from .models import LeaveRequest, LeaveType, LOPAdjustment
 from .forms import LeaveRequestForm, LeaveTypeForm, LOPAdjustmentForm
 from django.contrib import messages
 from core.models import AuditLog
 from django.db.models import Q
 from payroll.models import PayrollEntry
 
+def _visible_leave_requests(user):
+    """Leave requests the user sees on the leave list (shared with check_updates)"""
+    # Permission Logic
+    if user.is_superuser or user.is_admin() or user.is_ceo():
+        # Admin / CEO sees ALL (except cancelled, and inactive employees)
+        return LeaveRequest.objects.filter(employee__is_active=True).exclude(employee__status='ARCHIVED').exclude(status='CANCELLED')
+        
+    if user.is_hr():
+        # HR sees MGR_APPROVED (waiting for HR) + History + Own Requests (except cancelled)
+        return LeaveRequest.objects.filter(
+            Q(status__in=['MGR_APPROVED', 'HR_PROCESSED', 'APPROVED', 'REJECTED']) | 
+            Q(employee=user)
+        ).filter(employee__is_active=True).exclude(employee__status='ARCHIVED').exclude(status='CANCELLED')
+        
+    if user.is_project_manager():
+        # PM sees Assigned Requests + Own Requests (except cancelled)
+        return LeaveRequest.objects.filter(
+            Q(assigned_manager=user) | Q(employee=user)
+        ).filter(employee__is_active=True).exclude(employee__status='ARCHIVED').exclude(status='CANCELLED')
+        
+    # Regular Employee (shows all their requests including cancelled)
+    return LeaveRequest.objects.filter(employee=user)
+
 @login_required
 def leave_list(request):
     from django.db import models
     user = request.user
     is_admin = user.is_staff or user.is_admin() or user.is_hr() or user.is_ceo() or user.is_project_manager()
     
-    import datetime
-    current_year = datetime.date.today().year
-    
     balances = []
     if not is_admin:
-        from .models import LeaveBalance
-        from django.utils import timezone
-        today = timezone.localdate()
+        from .ledger import LeaveLedger
         
         valid_types = LeaveType.objects.filter(is_active=True)
         # Filter by gender if available
         if user.gender:
             valid_types = valid_types.filter(Q(eligibility_gender='ALL') | Q(eligibility_gender=user.gender))
 
-        for lt in valid_types:
-            total_quota = float(lt.days_entitlement)
-            
-            if getattr(lt, 'accrual_frequency', '') == 'MONTHLY':
-                if getattr(lt, 'reset_monthly', False):
-                    total_quota = total_quota / 12.0
-                else:
-                    total_quota = (total_quota / 12.0) * max(1, today.month)
-            
-            if lt.reset_monthly:
-                 reqs = LeaveRequest.objects.filter(
-                    employee=user, leave_type=lt, status__in=['APPROVED', 'HR_PROCESSED'],
-                    start_date__month=today.month, start_date__year=today.year
-                 )
-                 used = sum(float(r.duration_days) for r in reqs) or 0.0
-            else:
-                 reqs = LeaveRequest.objects.filter(
-                     employee=user, leave_type=lt, status__in=['APPROVED', 'HR_PROCESSED'],
-                     start_date__year=today.year
-                 )
-                 used = sum(float(r.duration_days) for r in reqs) or 0.0
-            
-            balance_obj, created = LeaveBalance.objects.get_or_create(
-                employee=user, leave_type=lt, year=current_year,
-                defaults={'total_entitlement': total_quota, 'days_used': used}
-            )
-            
-            should_save = False
-            if float(balance_obj.total_entitlement) != total_quota:
-                balance_obj.total_entitlement = total_quota
-                should_save = True
-            
-            if float(balance_obj.days_used) != float(used):
-                balance_obj.days_used = used
-                should_save = True
-            
-            if should_save:
-                balance_obj.save()
-            
+        # Single read of the ledger-maintained balances
+        for balance_obj in LeaveLedger.balances_for(user, valid_types):
             # HIDDEN CHECK
-            if lt.hidden_unless_used and float(balance_obj.days_used) <= 0:
+            if balance_obj.leave_type.hidden_unless_used and float(balance_obj.days_used) <= 0:
                 pass
             else:
                 balances.append(balance_obj)
 
 
-    # Permission Logic
-    if user.is_superuser or user.is_admin() or user.is_ceo():
-        # Admin / CEO sees ALL (except cancelled, and inactive employees)
-        leaves = LeaveRequest.objects.filter(employee__is_active=True).exclude(employee__status='ARCHIVED').exclude(status='CANCELLED').order_by('-created_at')
-        
-    elif user.is_hr():
-        # HR sees MGR_APPROVED (waiting for HR) + History + Own Requests (except cancelled)
-        leaves = LeaveRequest.objects.filter(
-            Q(status__in=['MGR_APPROVED', 'HR_PROCESSED', 'APPROVED', 'REJECTED']) | 
-            Q(employee=user)
-        ).filter(employee__is_active=True).exclude(employee__status='ARCHIVED').exclude(status='CANCELLED').order_by('-created_at')
-        
-    else:
-        # Check PM logic
-        is_pm = False
-        if user.is_project_manager():
-                is_pm = True
-                
-        if is_pm:
-             # PM sees Assigned Requests + Own Requests (except cancelled)
-            leaves = LeaveRequest.objects.filter(
-                Q(assigned_manager=user) | Q(employee=user)
-            ).filter(employee__is_active=True).exclude(employee__status='ARCHIVED').exclude(status='CANCELLED').order_by('-created_at')
-        else:
-             # Regular Employee (shows all their requests including cancelled)
-            leaves = LeaveRequest.objects.filter(employee=user).order_by('-created_at')
+    # Version first: a change landing while the page renders is then picked up by the first poll
+    from django.conf import settings
+    from .updates import LeaveUpdates
+    updates_etag = LeaveUpdates.etag(user)
+    leaves = _visible_leave_requests(user).order_by('-created_at')
              
     # Upcoming Meetings (Add-on for UI)
     from meetings.models import Meeting
@@ -124,12 +84,10 @@ def leave_list(request):
                 # Also check that the employee has enough Annual Leave balance (at least 0.5 days)
                 import math
                 try:
-                    from django.utils import timezone as tz
+                    from .ledger import LeaveLedger
                     ann_type = LeaveType.objects.get(code='ANN')
-                    al_bal = LeaveBalance.objects.filter(
-                        employee=request.user, leave_type=ann_type, year=tz.now().year
-                    ).first()
-                    al_remaining = math.floor(float(al_bal.remaining) * 2) / 2.0 if al_bal else 0.0
+                    al_bal = LeaveLedger.balances_for(request.user, [ann_type])[0]
+                    al_remaining = math.floor(float(al_bal.remaining) * 2) / 2.0
                     if al_remaining >= 0.5:
                         has_lop_to_convert = True
                 except LeaveType.DoesNotExist:
@@ -141,7 +99,9 @@ def leave_list(request):
         'balances': balances,
         'upcoming_meetings': upcoming_meetings,
         'has_lop_to_convert': has_lop_to_convert,
-        'latest_lop_entry': latest_lop_entry
+        'latest_lop_entry': latest_lop_entry,
+        'updates_etag': updates_etag,
+        'updates_wait': settings.LEAVE_UPDATES_LONGPOLL_MAX,
     })
 
 @login_required
@@ -150,11 +110,9 @@ def leave_create(request):
     from django.utils import timezone
     from django.db import models
     from django.db.models import Q, Sum
-    from .models import LeaveBalance
     from datetime import date
     
     today = timezone.localdate()
-    current_year = today.year
     
     # 1. Calc Service Days & Gender
     gender = getattr(request.user, 'gender', 'Male') 
@@ -170,47 +128,14 @@ def leave_create(request):
     )
     print(f"DEBUG: Found {valid_types.count()} active leave types for user {request.user.username}")
     
-    # 3. Get Leave Balances for current year
+    # 3. Get Leave Balances for current year (one read, maintained by the ledger)
+    from .ledger import LeaveLedger
     leave_balances = {}
-    for lt in valid_types:
-        total_quota = float(lt.days_entitlement)
-        
-        if getattr(lt, 'accrual_frequency', '') == 'MONTHLY':
-            if getattr(lt, 'reset_monthly', False):
-                total_quota = total_quota / 12.0
-            else:
-                total_quota = (total_quota / 12.0) * max(1, today.month)
-                
-        used = 0.0
-        
-        if lt.reset_monthly:
-            reqs = LeaveRequest.objects.filter(
-                employee=request.user, leave_type=lt, status__in=['APPROVED', 'HR_PROCESSED'],
-                start_date__month=today.month, start_date__year=today.year
-            )
-            used = sum(float(r.duration_days) for r in reqs) or 0.0
-        else:
-            reqs = LeaveRequest.objects.filter(
-                employee=request.user, leave_type=lt, status__in=['APPROVED', 'HR_PROCESSED'],
-                start_date__year=current_year
-            )
-            used = sum(float(r.duration_days) for r in reqs) or 0.0
-
-        balance, created = LeaveBalance.objects.get_or_create(
-            employee=request.user, leave_type=lt, year=current_year,
-            defaults={'total_entitlement': total_quota, 'days_used': used}
-        )
-        
-        # Update if changed (Dynamic calculation)
-        if float(balance.total_entitlement) != total_quota or float(balance.days_used) != float(used):
-             balance.total_entitlement = total_quota
-             balance.days_used = used
-             balance.save()
-        
+    for balance in LeaveLedger.balances_for(request.user, valid_types, today):
         used = float(balance.days_used)
         total_quota = float(balance.total_entitlement)
 
-        leave_balances[lt.id] = {
+        leave_balances[balance.leave_type_id] = {
             'total': total_quota,
             'used': used,
             'remaining': max(0, total_quota - used)
@@ -372,8 +297,12 @@ def leave_detail(request, pk):
         
     if not can_view:
         raise PermissionDenied("You do not have permission to view this leave request.")
-        
-    return render(request, 'leaves/leave_detail.html', {'leave': leave})
+
+    from core.imaging import DocumentImages
+    return render(request, 'leaves/leave_detail.html', {
+        'leave': leave,
+        'attachment_images': DocumentImages.for_file(leave.attachment),
+    })
 
 @login_required
 def leave_approve(request, pk):
@@ -393,21 +322,15 @@ def leave_approve(request, pk):
             
             if leave.status == LeaveRequest.Status.PENDING:
                 if is_assigned_manager:
-                    # Final Audit/Deduction
-                    from .models import LeaveBalance
-                    balance, created = LeaveBalance.objects.get_or_create(
-                        employee=leave.employee,
-                        leave_type=leave.leave_type,
-                        year=leave.start_date.year,
-                        defaults={'total_entitlement': leave.leave_type.days_entitlement, 'days_used': 0}
-                    )
-                    balance.days_used = float(balance.days_used) + float(leave.duration_days)
-                    balance.save()
-
-                    leave.status = LeaveRequest.Status.APPROVED
-                    leave.approved_by = request.user
-                    leave.manager_comment = comment
-                    leave.save()
+                    # Final Audit/Deduction (ledger entry + atomic balance update)
+                    from django.db import transaction
+                    from .ledger import LeaveLedger
+                    with transaction.atomic():
+                        leave.status = LeaveRequest.Status.APPROVED
+                        leave.approved_by = request.user
+                        leave.manager_comment = comment
+                        leave.save()
+                        LeaveLedger.consume(leave, user=request.user)
                     messages.success(request, "Leave request approved.")
                 else:
                     messages.error(request, "Only the assigned manager can approve this request.")
@@ -431,17 +354,8 @@ def leave_approve(request, pk):
 
              # Reversal Logic (If transitioning from APPROVED to REJECTED - unlikely in strict flow but safe to keep)
              if leave.status == LeaveRequest.Status.APPROVED:
-                from .models import LeaveBalance
-                try:
-                    balance = LeaveBalance.objects.get(
-                        employee=leave.employee,
-                        leave_type=leave.leave_type,
-                        year=leave.start_date.year
-                    )
-                    balance.days_used = max(0.0, float(balance.days_used) - float(leave.duration_days))
-                    balance.save()
-                except LeaveBalance.DoesNotExist:
-                    pass
+                from .ledger import LeaveLedger
+                LeaveLedger.reverse(leave, user=request.user, note="Rejected after approval")
 
              leave.status = LeaveRequest.Status.REJECTED
              leave.approved_by = request.user
@@ -454,17 +368,8 @@ def leave_approve(request, pk):
             if leave.employee == request.user or request.user.is_superuser:
                 # Reversal Logic (If transitioning from APPROVED to CANCELLED)
                 if leave.status == LeaveRequest.Status.APPROVED:
-                    from .models import LeaveBalance
-                    try:
-                        balance = LeaveBalance.objects.get(
-                            employee=leave.employee,
-                            leave_type=leave.leave_type,
-                            year=leave.start_date.year
-                        )
-                        balance.days_used = max(0.0, float(balance.days_used) - float(leave.duration_days))
-                        balance.save()
-                    except LeaveBalance.DoesNotExist:
-                        pass
+                    from .ledger import LeaveLedger
+                    LeaveLedger.reverse(leave, user=request.user, note="Cancelled by employee")
 
                 leave.status = LeaveRequest.Status.CANCELLED
                 leave.save()
@@ -606,20 +511,45 @@ def leave_type_restore(request, pk):
         messages.success(request, f"Leave policy '{ltype.name}' has been restored.")
         return redirect('leave_settings')
     return redirect('leave_settings')
-from django.http import JsonResponse
-from .models import LeaveRequest
-from django.contrib.auth.decorators import login_required
-
 @login_required
 def check_updates(request):
     """
     API endpoint for checking updates to leave requests.
-    Returns the latest status of requests involving the current user.
+    Conditional GET: while the user's change version matches If-None-Match the answer
+    is a 304 straight from the cache. With ?wait=<seconds> it long-polls until the
+    version moves (capped by LEAVE_UPDATES_LONGPOLL_MAX).
     """
+    from django.conf import settings
+    from django.http import HttpResponseNotModified, JsonResponse
+    from django.utils.http import parse_etags
+    from .updates import LeaveUpdates
     user = request.user
     
+    etag = LeaveUpdates.etag(user)
+    client_etags = [tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))]
+    if etag in client_etags:
+        try:
+            wait = min(max(int(request.GET.get('wait', 0)), 0), settings.LEAVE_UPDATES_LONGPOLL_MAX)
+        except ValueError:
+            wait = 0
+        if wait:
+            etag = LeaveUpdates.wait_for_change(user, etag, wait)
+        if etag in client_etags:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+    
     # Return status of the user's recent requests (last 20 for coverage)
-    return JsonResponse({'requests': data})
+    data = list(
+        _visible_leave_requests(user).order_by('-updated_at').values(
+            'id', 'status', 'document_status', 'payment_status', 'updated_at'
+        )[:20]
+    )
+    response = JsonResponse({'version': etag.strip('"'), 'requests': data})
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 @login_required
 def lop_adjustment_request(request, payroll_id=None):
@@ -670,13 +600,9 @@ def lop_adjustment_request(request, payroll_id=None):
     # 2. Get Annual Leave Balance
     try:
         ann_type = LeaveType.objects.get(code='ANN')
-        from django.utils import timezone
         import math
-        balance, _ = LeaveBalance.objects.get_or_create(
-            employee=emp,
-            leave_type=ann_type,
-            year=timezone.now().year
-        )
+        from .ledger import LeaveLedger
+        balance = LeaveLedger.balances_for(emp, [ann_type])[0]
         # Floor to nearest 0.5 to avoid floating point remnants (e.g. 0.09 -> 0.0)
         raw_al = float(balance.remaining)
         max_al = math.floor(raw_al * 2) / 2.0
@@ -704,54 +630,15 @@ def lop_adjustment_request(request, payroll_id=None):
             
             # Auto-approve for all users
             from django.db import transaction
-            from decimal import Decimal
-            from django.utils import timezone
-            from django.db.models import Sum
-            from payroll.models import PayrollDeduction, DeductionComponent
+            from .lop import LOPAdjustmentService
             
             try:
                 with transaction.atomic():
-                    # 1. Update Leave Balance
-                    ann_type = LeaveType.objects.get(code='ANN')
-                    balance, _ = LeaveBalance.objects.get_or_create(
-                        employee=adj.employee, 
-                        leave_type=ann_type, 
-                        year=timezone.now().year
-                    )
-                    
-                    if float(balance.remaining) < float(adj.requested_annual_leave_days):
-                         raise ValueError("Insufficient Annual Leave balance remaining.")
-                    
-                    balance.days_used = float(balance.days_used) + float(adj.requested_annual_leave_days)
-                    balance.save()
-                    
-                    # 2. Update Payroll Entry
-                    if adj.payroll_entry:
-                         pe = adj.payroll_entry
-                         pe.shortfall_work_hours = max(Decimal('0'), pe.shortfall_work_hours - Decimal(str(adj.converted_hours)))
-                         pe.days_absent = max(0, pe.days_absent - int(adj.requested_annual_leave_days))
-                         pe.lop_deduction = round(pe.shortfall_work_hours * pe.employee.hourly_salary, 2)
-                         
-                         lop_component = DeductionComponent.objects.filter(name="Loss of Pay (Shortfall)").first()
-                         if lop_component:
-                             lop_ded = PayrollDeduction.objects.filter(payroll_entry=pe, component=lop_component).first()
-                             if lop_ded:
-                                 if pe.lop_deduction > 0:
-                                     lop_ded.amount = pe.lop_deduction
-                                     lop_ded.approved_amount = pe.lop_deduction
-                                     lop_ded.save()
-                                 else:
-                                     lop_ded.delete()
-                         
-                         total_ded = pe.breakdown_deductions.filter(is_waived=False).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-                         pe.deductions = round(total_ded, 2)
-                         pe.net_salary = max(Decimal('0.00'), pe.gross_salary - pe.deductions)
-                         pe.save()
-
-                    adj.status = LOPAdjustment.Status.APPROVED
-                    adj.authorized_by = user
-                    adj.authorized_at = timezone.now()
+                    adj.status = LOPAdjustment.Status.PENDING
                     adj.save()
+                    approved, failures = LOPAdjustmentService.approve([adj.pk], user, request=request)
+                    if failures:
+                        raise ValueError(failures[0][2])
                     messages.success(request, f"Successfully converted {adj.requested_annual_leave_days} days of LOP for {emp.full_name}.")
             except Exception as e:
                 messages.error(request, f"Direct conversion failed: {str(e)}")
@@ -817,77 +704,16 @@ def lop_adjustment_approve(request, pk):
     if request.method == 'POST':
         action = request.POST.get('action')
         if action == 'approve':
-            from django.db import transaction
-            from decimal import Decimal
+            from .lop import LOPAdjustmentService
             try:
-                with transaction.atomic():
-                    # 1. Update Leave Balance
-                    ann_type = LeaveType.objects.get(code='ANN')
-                    balance, _ = LeaveBalance.objects.get_or_create(
-                        employee=adj.employee, 
-                        leave_type=ann_type, 
-                        year=adj.created_at.year
-                    )
-                    
-                    if float(balance.remaining) < float(adj.requested_annual_leave_days):
-                         raise ValueError("Insufficient Annual Leave balance remaining.")
-                    
-                    balance.days_used = float(balance.days_used) + float(adj.requested_annual_leave_days)
-                    balance.save()
-                    
-                    # 2. Update Payroll Entry if linked
-                    if adj.payroll_entry:
-                         pe = adj.payroll_entry
-                         # Reduce shortfall
-                         pe.shortfall_work_hours = max(Decimal('0'), pe.shortfall_work_hours - Decimal(str(adj.converted_hours)))
-                         
-                         # Also reduce days_absent count if full days adjusted
-                         adjusted_full_days = int(adj.requested_annual_leave_days)
-                         pe.days_absent = max(0, pe.days_absent - adjusted_full_days)
-                         
-                         # Recalculate LOP deduction amount
-                         hourly_rate = pe.employee.hourly_salary
-                         pe.lop_deduction = round(pe.shortfall_work_hours * hourly_rate, 2)
-                         
-                         # Update the PayrollDeduction record for LOP
-                         from payroll.models import PayrollDeduction, DeductionComponent
-                         lop_component = DeductionComponent.objects.filter(name="Loss of Pay (Shortfall)").first()
-                         if lop_component:
-                             lop_ded = PayrollDeduction.objects.filter(
-                                 payroll_entry=pe, component=lop_component
-                             ).first()
-                             if lop_ded:
-                                 if pe.lop_deduction > 0:
-                                     lop_ded.amount = pe.lop_deduction
-                                     lop_ded.approved_amount = pe.lop_deduction
-                                     lop_ded.save()
-                                 else:
-                                     lop_ded.delete()
-                         
-                         # Recalculate total deductions from all PayrollDeduction records
-                         from django.db.models import Sum
-                         total_ded = pe.breakdown_deductions.filter(is_waived=False).aggregate(
-                             total=Sum('amount')
-                         )['total'] or Decimal('0.00')
-                         pe.deductions = round(total_ded, 2)
-                         
-                         # Update net salary
-                         pe.net_salary = max(Decimal('0.00'), pe.gross_salary - pe.deductions)
-                         pe.save()
-
-                    adj.status = LOPAdjustment.Status.APPROVED
-                    adj.authorized_by = user
-                    from django.utils import timezone
-                    adj.authorized_at = timezone.now()
-                    adj.save()
-                    
-                    messages.success(request, f"Approved: {adj.requested_annual_leave_days} days converted.")
-            except ValueError as e:
-                messages.error(request, str(e))
-                return redirect('lop_adjustment_detail', pk=pk)
+                approved, failures = LOPAdjustmentService.approve([adj.pk], user, request=request)
             except Exception as e:
                 messages.error(request, f"An error occurred: {str(e)}")
                 return redirect('lop_adjustment_detail', pk=pk)
+            if failures:
+                messages.error(request, failures[0][2])
+                return redirect('lop_adjustment_detail', pk=pk)
+            messages.success(request, f"Approved: {adj.requested_annual_leave_days} days converted.")
             
         elif action == 'reject':
             adj.status = LOPAdjustment.Status.REJECTED
@@ -948,89 +774,24 @@ def lop_adjustment_bulk(request):
         if not selected_ids:
             messages.warning(request, "No requests selected.")
         else:
-            from django.db import transaction
-            from decimal import Decimal
-            from django.utils import timezone
-            
-            count = 0
-            errors = []
+            from .lop import LOPAdjustmentService
             
-            for adj_id in selected_ids:
-                try:
-                    with transaction.atomic():
-                        adj = LOPAdjustment.objects.select_for_update().get(pk=adj_id, status=LOPAdjustment.Status.PENDING)
-                        
-                        if action == 'approve':
-                            # 1. Update Leave Balance
-                            ann_type = LeaveType.objects.get(code='ANN')
-                            balance, _ = LeaveBalance.objects.get_or_create(
-                                employee=adj.employee, 
-                                leave_type=ann_type, 
-                                year=adj.created_at.year
-                            )
-                            
-                            if float(balance.remaining) < float(adj.requested_annual_leave_days):
-                                 errors.append(f"Insufficient balance for {adj.employee.full_name}")
-                                 continue
-                            
-                            balance.days_used = float(balance.days_used) + float(adj.requested_annual_leave_days)
-                            balance.save()
-                            
-                            # 2. Update Payroll Entry if linked
-                            if adj.payroll_entry:
-                                 pe = adj.payroll_entry
-                                 pe.shortfall_work_hours = max(Decimal('0'), pe.shortfall_work_hours - Decimal(str(adj.converted_hours)))
-                                 
-                                 # Reduce days_absent proportionally
-                                 adjusted_full_days = int(adj.requested_annual_leave_days)
-                                 pe.days_absent = max(0, pe.days_absent - adjusted_full_days)
-                                 
-                                 pe.lop_deduction = round(pe.shortfall_work_hours * pe.employee.hourly_salary, 2)
-                                 
-                                 # Update the PayrollDeduction record for LOP
-                                 from payroll.models import PayrollDeduction, DeductionComponent
-                                 lop_component = DeductionComponent.objects.filter(name="Loss of Pay (Shortfall)").first()
-                                 if lop_component:
-                                     lop_ded = PayrollDeduction.objects.filter(
-                                         payroll_entry=pe, component=lop_component
-                                     ).first()
-                                     if lop_ded:
-                                         if pe.lop_deduction > 0:
-                                             lop_ded.amount = pe.lop_deduction
-                                             lop_ded.approved_amount = pe.lop_deduction
-                                             lop_ded.save()
-                                         else:
-                                             lop_ded.delete()
-                                 
-                                 # Recalculate total deductions from all PayrollDeduction records
-                                 from django.db.models import Sum
-                                 total_ded = pe.breakdown_deductions.filter(is_waived=False).aggregate(
-                                     total=Sum('amount')
-                                 )['total'] or Decimal('0.00')
-                                 pe.deductions = round(total_ded, 2)
-                                 
-                                 pe.net_salary = max(Decimal('0.00'), pe.gross_salary - pe.deductions)
-                                 pe.save()
-
-                            adj.status = LOPAdjustment.Status.APPROVED
-                            adj.authorized_by = user
-                            adj.authorized_at = timezone.now()
-                            adj.save()
-                            count += 1
-                            
-                        elif action == 'reject':
-                            adj.status = LOPAdjustment.Status.REJECTED
-                            adj.authorized_by = user
-                            adj.save()
-                            count += 1
-                except Exception as e:
-                    errors.append(f"Error processing request for {adj.employee.full_name}: {str(e)}")
+            try:
+                if action == 'approve':
+                    processed, failures = LOPAdjustmentService.approve(selected_ids, user, request=request)
+                elif action == 'reject':
+                    processed, failures = LOPAdjustmentService.reject(selected_ids, user, request=request)
+                else:
+                    processed, failures = [], []
+                    messages.warning(request, "Unknown batch action.")
+            except Exception as e:
+                processed, failures = [], []
+                messages.error(request, f"Batch failed, nothing was changed: {str(e)}")
             
-            if count:
-                messages.success(request, f"Successfully processed {count} adjustments.")
-            if errors:
-                for err in errors:
-                    messages.error(request, err)
+            if processed:
+                messages.success(request, f"Successfully processed {len(processed)} adjustments.")
+            for adj_id, name, error in failures:
+                messages.error(request, f"#{adj_id}{f' ({name})' if name else ''}: {error}")
             
             return redirect('lop_adjustment_bulk')
             
@@ -1057,21 +818,9 @@ def lop_adjustment_delete(request, pk):
         try:
             with transaction.atomic():
                 if adj.status == LOPAdjustment.Status.APPROVED:
-                    # 1. Revert Leave Balance
-                    try:
-                        ann_type = LeaveType.objects.get(code='ANN')
-                        # Find balance for the year it was created (matching approval year)
-                        balance = LeaveBalance.objects.filter(
-                            employee=adj.employee, 
-                            leave_type=ann_type, 
-                            year=adj.created_at.year
-                        ).first()
-                        
-                        if balance:
-                            balance.days_used = max(0.0, float(balance.days_used) - float(adj.requested_annual_leave_days))
-                            balance.save()
-                    except LeaveType.DoesNotExist:
-                        pass # Policy might have been deleted, but we should still revert payroll
+                    # 1. Revert Leave Balance (reverses exactly what the conversion charged)
+                    from .ledger import LeaveLedger
+                    LeaveLedger.reverse_lop(adj, user=user)
                     
                     # 2. Restore Payroll Entry Stats
                     if adj.payroll_entry:
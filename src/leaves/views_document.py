@@ -78,17 +78,8 @@ def leave_verify_document(request, pk):
             leave.rejection_reason = request.POST.get('rejection_reason', '')
             
             # Reversal Logic for Leave Balance since it was deducted on Approval
-            from .models import LeaveBalance
-            try:
-                balance = LeaveBalance.objects.get(
-                    employee=leave.employee,
-                    leave_type=leave.leave_type,
-                    year=leave.start_date.year
-                )
-                balance.days_used = max(0.0, float(balance.days_used) - float(leave.duration_days))
-                balance.save()
-            except LeaveBalance.DoesNotExist:
-                pass
+            from .ledger import LeaveLedger
+            LeaveLedger.reverse(leave, user=user, note="Document rejected - Loss of Pay")
                 
             leave.save()
             messages.warning(request, "Document rejected. Leave marked as LOSS OF PAY and balance restored.")
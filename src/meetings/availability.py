@@ -0,0 +1,142 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .models import Meeting
+
+
+class FreeBusy:
+    """
+    Free/busy lookups for meeting scheduling.
+
+    All meetings that overlap a window and involve any of the given users or
+    rooms come back from one range query on the participants table joined to
+    Meeting (indexed on start_time/end_time and room). The rows are folded into
+    sorted, merged busy intervals per user and per room in Python, so a conflict
+    check or a free-slot search costs the same single query whether the meeting
+    has 2 participants or 200.
+    """
+
+    @staticmethod
+    def _rows(start, end, user_ids=(), rooms=(), exclude_meeting=None):
+        through = Meeting.participants.through
+        user_field = Meeting.participants.field.m2m_reverse_field_name()
+        who = Q(**{f'{user_field}_id__in': list(user_ids)})
+        if rooms:
+            who |= Q(meeting__room__in=list(rooms))
+        rows = through.objects.filter(meeting__start_time__lt=end, meeting__end_time__gt=start).filter(who)
+        if exclude_meeting is not None:
+            rows = rows.exclude(meeting_id=exclude_meeting)
+        return rows.values_list(
+            f'{user_field}_id', 'meeting_id', 'meeting__start_time', 'meeting__end_time', 'meeting__room', 'meeting__title'
+        )
+
+    @staticmethod
+    def merge(intervals):
+        """Sorted, non-overlapping (start, end) list; touching intervals are joined"""
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+
+    @staticmethod
+    def busy(start, end, user_ids=(), rooms=(), exclude_meeting=None):
+        """
+        Merged busy intervals over [start, end):
+        {'users': {user_id: [(start, end), ...]}, 'rooms': {room: [...]}}
+        """
+        user_ids, rooms = set(user_ids), {room for room in rooms if room}
+        users, room_busy = defaultdict(set), defaultdict(set)
+        for user_id, _, m_start, m_end, room, _ in FreeBusy._rows(start, end, user_ids, rooms, exclude_meeting):
+            if user_id in user_ids:
+                users[user_id].add((m_start, m_end))
+            if room in rooms:
+                room_busy[room].add((m_start, m_end))
+        return {
+            'users': {pk: FreeBusy.merge(intervals) for pk, intervals in users.items()},
+            'rooms': {room: FreeBusy.merge(intervals) for room, intervals in room_busy.items()},
+        }
+
+    @staticmethod
+    def conflicts(start, end, user_ids=(), rooms=(), exclude_meeting=None):
+        """
+        Meetings clashing with [start, end):
+        {'users': {user_id: [meeting titles]}, 'rooms': {room: [meeting titles]}}; empty dicts when free.
+        """
+        user_ids, rooms = set(user_ids), {room for room in rooms if room}
+        users, room_clashes = defaultdict(list), defaultdict(list)
+        seen = set()
+        for user_id, meeting_id, _, _, room, title in FreeBusy._rows(start, end, user_ids, rooms, exclude_meeting):
+            if user_id in user_ids and (user_id, meeting_id) not in seen:
+                users[user_id].append(title)
+                seen.add((user_id, meeting_id))
+            if room in rooms and (room, meeting_id) not in seen:
+                room_clashes[room].append(title)
+                seen.add((room, meeting_id))
+        return {'users': dict(users), 'rooms': dict(room_clashes)}
+
+    @staticmethod
+    def _working_days(first, last):
+        """Working dates in [first, last] per CompanySettings and the public holidays - one query"""
+        from core.models import CompanySettings, PublicHoliday
+        company = CompanySettings.load()
+        works = [company.work_monday, company.work_tuesday, company.work_wednesday, company.work_thursday,
+                 company.work_friday, company.work_saturday, company.work_sunday]
+        fixed, recurring = set(), set()
+        for day, is_recurring in PublicHoliday.objects.filter(
+            Q(date__range=(first, last)) | Q(is_recurring=True)
+        ).values_list('date', 'is_recurring'):
+            fixed.add(day)
+            if is_recurring:
+                recurring.add((day.month, day.day))
+
+        day = first
+        while day <= last:
+            if (
+                works[day.weekday()]
+                and not (company.second_saturday_holiday and day.weekday() == 5 and 8 <= day.day <= 14)
+                and day not in fixed and (day.month, day.day) not in recurring
+            ):
+                yield day
+            day += timedelta(days=1)
+
+    @staticmethod
+    def earliest_free_slot(duration, user_ids=(), rooms=(), after=None, days=None, exclude_meeting=None):
+        """
+        Start of the earliest `duration` long slot, on or after `after`, inside working
+        hours on a working day, when all users and rooms are free. None if there is
+        no such slot within `days` (default MEETING_SLOT_SEARCH_DAYS).
+        """
+        after = after or timezone.now()
+        days = settings.MEETING_SLOT_SEARCH_DAYS if days is None else days
+        day_start = time.fromisoformat(settings.MEETING_DAY_START)
+        day_end = time.fromisoformat(settings.MEETING_DAY_END)
+        first = timezone.localtime(after).date()
+        last = first + timedelta(days=days)
+        window_end = timezone.make_aware(datetime.combine(last, day_end))
+
+        found = FreeBusy.busy(after, window_end, user_ids, rooms, exclude_meeting)
+        busy = FreeBusy.merge(
+            [interval for intervals in found['users'].values() for interval in intervals]
+            + [interval for intervals in found['rooms'].values() for interval in intervals]
+        )
+
+        index = 0
+        for day in FreeBusy._working_days(first, last):
+            cursor = max(timezone.make_aware(datetime.combine(day, day_start)), after)
+            closing = timezone.make_aware(datetime.combine(day, day_end))
+            # Busy intervals are sorted: skip those over before this day's candidate start
+            while index < len(busy) and busy[index][1] <= cursor:
+                index += 1
+            i = index
+            while cursor + duration <= closing:
+                if i >= len(busy) or busy[i][0] >= cursor + duration:
+                    return cursor
+                cursor = max(cursor, busy[i][1])
+                i += 1
+        return None
@@ -95,38 +95,32 @@ class MeetingForm(forms.ModelForm):
         self.cleaned_data['start_time'] = start
         self.cleaned_data['end_time'] = end
 
-        conflicts = []
-
-        # 1. Check Organizer (Request User) Availability
-        if self.user:
-            busy_as_participant = Meeting.objects.filter(participants=self.user).filter(
-                start_time__lt=end,
-                end_time__gt=start
-            )
-            
-            if self.instance and self.instance.pk:
-                 busy_as_participant = busy_as_participant.exclude(pk=self.instance.pk)
-            
-            if busy_as_participant.exists():
-                 raise ValidationError("You (Organizer) are already booked for another meeting during this time.")
-
-        # 2. Check Participants Availability
-        if participants:
-            for person in participants:
-                qs = Meeting.objects.filter(participants=person).filter(
-                    start_time__lt=end,
-                    end_time__gt=start
-                )
-                
-                if self.instance and self.instance.pk:
-                    qs = qs.exclude(pk=self.instance.pk)
-                
-                if qs.exists():
-                    conflicts.append(f"{person.get_full_name() or person.username}")
+        # Organizer, participant and room availability in one query (meetings.availability)
+        from .availability import FreeBusy
+        people = {person.pk: person for person in participants or []}
+        user_ids = set(people) | ({self.user.pk} if self.user else set())
+        room = (cleaned_data.get('room') or '').strip()
+        exclude = self.instance.pk if self.instance and self.instance.pk else None
+        clashes = FreeBusy.conflicts(start, end, user_ids, [room], exclude_meeting=exclude)
 
+        errors = []
+        if self.user and self.user.pk in clashes['users']:
+            errors.append("You (Organizer) are already booked for another meeting during this time.")
+        conflicts = [
+            f"{people[pk].get_full_name() or people[pk].username}" for pk in clashes['users'] if pk in people
+        ]
         if conflicts:
             conflict_names = ", ".join(conflicts)
-            raise ValidationError(f"The following participants are already booked during this time slot: {conflict_names}")
+            errors.append(f"The following participants are already booked during this time slot: {conflict_names}")
+        if clashes['rooms']:
+            errors.append(f"{room} is already booked during this time slot.")
+
+        if errors:
+            slot = FreeBusy.earliest_free_slot(end - start, user_ids, [room], after=start, exclude_meeting=exclude)
+            if slot:
+                slot = timezone.localtime(slot)
+                errors.append(f"Earliest time everyone is free: {slot:%a %d %b}, {slot:%I:%M %p}.")
+            raise ValidationError(errors)
 
         return cleaned_data
 
@@ -0,0 +1,230 @@
+import hashlib
+import uuid
+from datetime import timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+FEED_DOMAIN = 'hrms'
+
+
+def _escape(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _fold(line):
+    """Splits a content line into 75-octet pieces (RFC 5545 3.1)"""
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line
+    parts, start, limit = [], 0, 75
+    while start < len(raw):
+        end = min(start + limit, len(raw))
+        # Never cut a UTF-8 sequence in half
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(raw[start:end].decode())
+        start, limit = end, 74
+    return '\r\n '.join(parts)
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event(uid, stamp, lines):
+    return ''.join(_fold(line) + '\r\n' for line in [
+        'BEGIN:VEVENT', f'UID:{uid}@{FEED_DOMAIN}', f'DTSTAMP:{_utc(stamp)}', *lines, 'END:VEVENT',
+    ])
+
+
+class ICSFeed:
+    """
+    Per-user iCalendar feed of meetings, approved leave and public holidays.
+
+    The feed is assembled from three separately cached sections: the user's
+    meetings, the user's leave, and the holidays (shared by everybody). Each
+    section has a version that signals replace when its rows change (core.signals),
+    and only a section whose version moved is rendered again. The versions also
+    give the ETag and Last-Modified, so a calendar client polling an unchanged
+    feed gets a 304 from a few cache reads without touching the database.
+
+    Cached versions are only trusted with a shared cache (settings.CACHE_SHARED).
+    Otherwise each section's version is derived from its rows - latest change and
+    row count, or a digest of the few holiday rows - in one aggregate query per
+    section, so every worker computes the same ETag and sees every change.
+    """
+    TOKEN_KEY = 'ics_token:{}'
+    VERSION_KEY = 'ics_version:{}'
+    SECTION_KEY = 'ics_section:{}:{}'
+    TTL = 24 * 60 * 60
+    TOKEN_TTL = 300  # a deactivated user's feed stops within this many seconds
+
+    MEETINGS_PAST_DAYS = 90
+    LEAVES_PAST_DAYS = 365
+
+    @staticmethod
+    def scopes(user_id):
+        return [f'meetings:{user_id}', f'leaves:{user_id}', 'holidays']
+
+    @staticmethod
+    def user_for_token(token):
+        """Id of the feed owner, or None for an unknown token"""
+        from .models import CalendarFeed
+        key = ICSFeed.TOKEN_KEY.format(token)
+        user_id = cache.get(key)
+        if user_id is None:
+            user_id = CalendarFeed.objects.filter(token=token, user__is_active=True).values_list('user_id', flat=True).first()
+            if user_id is None:
+                return None
+            cache.set(key, user_id, ICSFeed.TOKEN_TTL)
+        return user_id
+
+    # --- versions ---------------------------------------------------------
+
+    @staticmethod
+    def _new_version(scope):
+        version = (uuid.uuid4().hex, int(timezone.now().timestamp()))
+        cache.set(ICSFeed.VERSION_KEY.format(scope), version, None)
+        return version
+
+    @staticmethod
+    def versions(user_id):
+        """{scope: (version, last modified timestamp)}"""
+        if not settings.CACHE_SHARED:
+            return ICSFeed._data_versions(user_id)
+        scopes = ICSFeed.scopes(user_id)
+        found = cache.get_many([ICSFeed.VERSION_KEY.format(scope) for scope in scopes])
+        return {
+            scope: found.get(ICSFeed.VERSION_KEY.format(scope)) or ICSFeed._new_version(scope) for scope in scopes
+        }
+
+    @staticmethod
+    def _data_versions(user_id):
+        from django.db.models import Count, Max
+        versions = {}
+        for scope, rows in ((f'meetings:{user_id}', ICSFeed._meetings(user_id)), (f'leaves:{user_id}', ICSFeed._leaves(user_id))):
+            found = rows.aggregate(changed=Max('updated_at'), count=Count('pk', distinct=True))
+            changed = found['changed'].timestamp() if found['changed'] else 0
+            versions[scope] = (f"{changed:.6f}-{found['count']}", int(changed))
+        # Holidays have no change timestamp; the table is small enough to digest
+        holidays = ICSFeed._holidays().order_by('pk').values_list('pk', 'name', 'date', 'is_recurring')
+        digest = hashlib.sha1(repr((timezone.localdate().year, list(holidays))).encode()).hexdigest()
+        versions['holidays'] = (digest, 0)
+        return versions
+
+    @staticmethod
+    def validators(versions):
+        """(ETag, Last-Modified timestamp or None) for a set of section versions"""
+        digest = hashlib.sha1('|'.join(versions[scope][0] for scope in sorted(versions)).encode()).hexdigest()
+        return f'"{digest}"', max(modified for _, modified in versions.values()) or None
+
+    @staticmethod
+    def invalidate(*scopes):
+        """Marks sections as changed once the current transaction commits"""
+        def bump():
+            for scope in scopes:
+                ICSFeed._new_version(scope)
+        transaction.on_commit(bump)
+
+    # --- rendering --------------------------------------------------------
+
+    @staticmethod
+    def render(user_id, versions):
+        sections = []
+        keys = {scope: ICSFeed.SECTION_KEY.format(scope, versions[scope][0]) for scope in versions}
+        cached = cache.get_many(list(keys.values()))
+        for scope in ICSFeed.scopes(user_id):
+            text = cached.get(keys[scope])
+            if text is None:
+                kind = scope.split(':')[0]
+                text = getattr(ICSFeed, f'build_{kind}')(user_id)
+                cache.set(keys[scope], text, ICSFeed.TTL)
+            sections.append(text)
+        return ''.join([
+            'BEGIN:VCALENDAR\r\n',
+            'VERSION:2.0\r\n',
+            'PRODID:-//HRMS//Calendar Feed//EN\r\n',
+            'CALSCALE:GREGORIAN\r\n',
+            'METHOD:PUBLISH\r\n',
+            'X-WR-CALNAME:HRMS\r\n',
+            *sections,
+            'END:VCALENDAR\r\n',
+        ])
+
+    @staticmethod
+    def _meetings(user_id):
+        from django.db.models import Q
+        from .models import Meeting
+        since = timezone.now() - timedelta(days=ICSFeed.MEETINGS_PAST_DAYS)
+        return Meeting.objects.filter(Q(participants=user_id) | Q(organizer=user_id), end_time__gte=since)
+
+    @staticmethod
+    def _leaves(user_id):
+        from leaves.models import LeaveRequest
+        since = timezone.localdate() - timedelta(days=ICSFeed.LEAVES_PAST_DAYS)
+        return LeaveRequest.objects.filter(
+            employee_id=user_id, end_date__gte=since,
+            status__in=[LeaveRequest.Status.APPROVED, LeaveRequest.Status.HR_PROCESSED],
+        )
+
+    @staticmethod
+    def _holidays():
+        from django.db.models import Q
+        from core.models import PublicHoliday
+        return PublicHoliday.objects.filter(Q(date__year__gte=timezone.localdate().year - 1) | Q(is_recurring=True))
+
+    @staticmethod
+    def build_meetings(user_id):
+        meetings = ICSFeed._meetings(user_id).distinct().select_related('organizer').order_by('start_time')
+        events = []
+        for meeting in meetings:
+            organizer = meeting.organizer
+            lines = [
+                f'DTSTART:{_utc(meeting.start_time)}',
+                f'DTEND:{_utc(meeting.end_time)}',
+                f'LAST-MODIFIED:{_utc(meeting.updated_at)}',
+                f'SUMMARY:{_escape(meeting.title)}',
+            ]
+            if meeting.room:
+                lines.append(f'LOCATION:{_escape(meeting.room)}')
+            if meeting.description:
+                lines.append(f'DESCRIPTION:{_escape(meeting.description)}')
+            if organizer.email:
+                lines.append(f'ORGANIZER;CN="{(organizer.full_name or organizer.username).replace(chr(34), "")}":mailto:{organizer.email}')
+            events.append(_event(f'meeting-{meeting.pk}', meeting.updated_at, lines))
+        return ''.join(events)
+
+    @staticmethod
+    def build_leaves(user_id):
+        leaves = ICSFeed._leaves(user_id).select_related('leave_type').order_by('start_date')
+        events = []
+        for leave in leaves:
+            summary = f'On leave: {leave.leave_type.name}'
+            if leave.half_day:
+                summary += f' (half day{", " + leave.get_half_day_session_display() if leave.half_day_session else ""})'
+            events.append(_event(f'leave-{leave.pk}', leave.updated_at, [
+                f'DTSTART;VALUE=DATE:{leave.start_date:%Y%m%d}',
+                f'DTEND;VALUE=DATE:{leave.end_date + timedelta(days=1):%Y%m%d}',
+                f'SUMMARY:{_escape(summary)}',
+                'TRANSP:OPAQUE',
+            ]))
+        return ''.join(events)
+
+    @staticmethod
+    def build_holidays(user_id):
+        stamp = timezone.now()
+        holidays = ICSFeed._holidays().order_by('date')
+        events = []
+        for holiday in holidays:
+            lines = [
+                f'DTSTART;VALUE=DATE:{holiday.date:%Y%m%d}',
+                f'DTEND;VALUE=DATE:{holiday.date + timedelta(days=1):%Y%m%d}',
+                f'SUMMARY:{_escape(holiday.name)}',
+                'TRANSP:TRANSPARENT',
+            ]
+            if holiday.is_recurring:
+                lines.append('RRULE:FREQ=YEARLY')
+            events.append(_event(f'holiday-{holiday.pk}', stamp, lines))
+        return ''.join(events)
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['start_time', 'end_time'], name='meetings_me_start_t_006dbd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['room', 'start_time'], name='meetings_me_room_19aac6_idx'),
+        ),
+    ]
@@ -21,6 +21,11 @@ class Meeting(models.Model):
 
     class Meta:
         ordering = ['start_time']
+        indexes = [
+            # Overlap lookups (meetings.availability): start_time < window end AND end_time > window start
+            models.Index(fields=['start_time', 'end_time']),
+            models.Index(fields=['room', 'start_time']),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.start_time})"
@@ -29,3 +34,33 @@ class Meeting(models.Model):
     def duration_hours(self):
         diff = self.end_time - self.start_time
         return diff.total_seconds() / 3600
+
+
+class CalendarFeed(models.Model):
+    """
+    Secret address of a user's iCalendar feed (meetings.ics). Anyone with the
+    URL can read the feed, so it can be reset, which retires the old address.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='calendar_feed')
+    token = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Calendar feed of {self.user_id}"
+
+    @staticmethod
+    def new_token():
+        import secrets
+        return secrets.token_urlsafe(32)
+
+    @classmethod
+    def for_user(cls, user):
+        feed, created = cls.objects.get_or_create(user=user, defaults={'token': cls.new_token()})
+        return feed
+
+    def reset(self):
+        from django.core.cache import cache
+        from .ics import ICSFeed
+        cache.delete(ICSFeed.TOKEN_KEY.format(self.token))
+        self.token = self.new_token()
+        self.save(update_fields=['token'])
@@ -8,4 +8,6 @@ urlpatterns = [
     path('<int:pk>/cancel/', views.meeting_delete, name='meeting_delete'),
     path('<int:pk>/add-participants/', views.add_participants, name='meeting_add_participants'),
     path('<int:pk>/edit/', views.meeting_edit, name='meeting_edit'),
+    path('calendar/link/', views.calendar_feed_link, name='meeting_calendar_link'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='meeting_calendar_feed'),
 ]
@@ -1,4 +1,5 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Meeting
@@ -6,6 +7,7 @@ from .forms import MeetingForm
 from django.db.models import Q
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.views.decorators.http import require_safe
 
 User = get_user_model()
 
@@ -30,9 +32,13 @@ def meeting_list(request):
     else:
         meetings = base_qs.filter(end_time__gte=today).order_by('start_time')
     
+    from .models import CalendarFeed
+    feed = CalendarFeed.objects.filter(user=user).first()
+
     return render(request, 'meetings/meeting_list.html', {
         'meetings': meetings, 
-        'filter_type': filter_type
+        'filter_type': filter_type,
+        'calendar_feed_url': request.build_absolute_uri(reverse('meeting_calendar_feed', args=[feed.token])) if feed else '',
     })
 
 @login_required
@@ -144,6 +150,26 @@ def add_participants(request, pk):
         if organizer_id not in participant_ids:
             participant_ids.append(organizer_id)
             
+        # Newly invited people must be free for the meeting (one query, meetings.availability)
+        from .availability import FreeBusy
+        current_ids = set(meeting.participants.values_list('pk', flat=True))
+        new_ids = {int(pk) for pk in participant_ids if str(pk).isdigit()} - current_ids
+        clashes = FreeBusy.conflicts(meeting.start_time, meeting.end_time, new_ids, exclude_meeting=meeting.pk)['users']
+        if clashes:
+            names = ", ".join(
+                person.get_full_name() or person.username for person in User.objects.filter(pk__in=clashes)
+            )
+            message = f"The following participants are already booked during this time slot: {names}."
+            slot = FreeBusy.earliest_free_slot(
+                meeting.end_time - meeting.start_time, current_ids | new_ids, [meeting.room],
+                after=max(meeting.start_time, timezone.now()), exclude_meeting=meeting.pk
+            )
+            if slot:
+                slot = timezone.localtime(slot)
+                message += f" Earliest time everyone is free: {slot:%a %d %b}, {slot:%I:%M %p}."
+            messages.error(request, message)
+            return redirect(request.POST.get('next') or request.META.get('HTTP_REFERER') or 'meeting_list')
+
         # Use set to sync participants (adds new ones and removes unselected ones)
         meeting.participants.set(participant_ids)
         
@@ -237,3 +263,48 @@ def meeting_edit(request, pk):
         return JsonResponse({'success': True})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
+
+@login_required
+def calendar_feed_link(request):
+    """Creates the user's calendar feed address, or replaces it with a new one"""
+    if request.method != 'POST':
+        return redirect('meeting_list')
+
+    from .models import CalendarFeed
+    feed = CalendarFeed.objects.filter(user=request.user).first()
+    if feed is None:
+        CalendarFeed.for_user(request.user)
+        messages.success(request, "Your calendar feed is ready. Add the address to your calendar app to subscribe.")
+    elif request.POST.get('reset'):
+        feed.reset()
+        messages.success(request, "Calendar feed address reset. Calendars using the old address will stop updating.")
+    return redirect('meeting_list')
+
+
+@require_safe
+def calendar_feed(request, token):
+    """
+    iCalendar feed of the user's meetings, approved leave and public holidays.
+    The secret token in the URL stands in for a login so calendar apps can poll it.
+    """
+    from django.http import Http404, HttpResponse
+    from django.utils.cache import get_conditional_response, patch_cache_control
+    from django.utils.http import http_date
+    from .ics import ICSFeed
+
+    user_id = ICSFeed.user_for_token(token)
+    if user_id is None:
+        raise Http404("Unknown calendar feed")
+
+    versions = ICSFeed.versions(user_id)
+    etag, last_modified = ICSFeed.validators(versions)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(ICSFeed.render(user_id, versions), content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="calendar.ics"'
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # Clients may keep a copy but must check back; unchanged feeds answer 304
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -40,12 +40,8 @@ class PayrollBatchAdmin(admin.ModelAdmin):
             # 2. Calculate Entries
             PayrollService.calculate_payroll(batch)
             
-            # 3. Generate Export
-            file_content = BankTransferService.generate_export_file(batch)
-            
-            # 4. Save file
-            from django.core.files.base import ContentFile
-            batch.sif_file.save(f"BankTransfer_{batch_date.strftime('%Y%m')}.csv", ContentFile(file_content))
+            # 3. Generate Export (streamed straight into sif_file storage)
+            BankTransferService.save_export(batch)
             batch.save()
             
             self.message_user(request, "Payroll Generated and Bank Export created successfully.")
@@ -0,0 +1,175 @@
+import csv
+import io
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from core.utils.pagination import iter_chunks
+
+User = get_user_model()
+
+# key -> writer class. Add new bank layouts with @register_bank_writer.
+BANK_FILE_WRITERS = {}
+
+
+def register_bank_writer(cls):
+    BANK_FILE_WRITERS[cls.key] = cls
+    return cls
+
+
+def get_bank_writer(key=None):
+    """Returns a writer instance; defaults to settings.BANK_EXPORT_FORMAT"""
+    key = key or getattr(settings, 'BANK_EXPORT_FORMAT', IndianBankCSVWriter.key)
+    try:
+        return BANK_FILE_WRITERS[key]()
+    except KeyError:
+        raise ValueError(f"Unknown bank export format: {key}")
+
+
+class BankFileWriter:
+    """
+    Base class for bank transfer file layouts.
+    Subclasses implement header/row/trailer; stream() takes care of reading
+    the batch in chunks and batch-decrypting account numbers, so memory stays
+    flat whatever the batch size.
+    """
+    key = None
+    label = None
+    extension = 'csv'
+    content_type = 'text/csv'
+    chunk_size = 500
+
+    def header(self, batch, summary):
+        return []
+
+    def row(self, batch, entry, account_number):
+        raise NotImplementedError
+
+    def trailer(self, batch, summary):
+        return []
+
+    def filename(self, batch):
+        return f"BankTransfer_{batch.month.strftime('%Y%m')}.{self.extension}"
+
+    def summary(self, batch):
+        """Totals needed by control records, computed in the database up front"""
+        return batch.entries.aggregate(count=Count('id'), total=Sum('net_salary'))
+
+    def entries(self, batch):
+        return batch.entries.select_related('employee')
+
+    def stream(self, batch):
+        """Yields encoded chunks (bytes) of the finished file"""
+        summary = self.summary(batch)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        for line in self.header(batch, summary):
+            writer.writerow(line)
+
+        for chunk in iter_chunks(self.entries(batch), self.chunk_size):
+            # One batch decrypt per chunk instead of one per entry
+            User.prime_decrypted([e.employee for e in chunk], fields=['_iban'])
+            for entry in chunk:
+                writer.writerow(self.row(batch, entry, entry.employee.iban or entry.iban))
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+        for line in self.trailer(batch, summary):
+            writer.writerow(line)
+        yield buffer.getvalue().encode()
+
+
+@register_bank_writer
+class IndianBankCSVWriter(BankFileWriter):
+    """
+    Generic CSV accepted by Indian banks' bulk upload.
+    Format: EmployeeName, AccountNumber, IFSC, Amount, Transaction Date
+    """
+    key = 'INDIAN_CSV'
+    label = 'Indian Bank CSV'
+
+    def header(self, batch, summary):
+        self.transaction_date = timezone.now().strftime("%Y-%m-%d")
+        return [["Employee Name", "Account Number", "IFSC Code", "Net Salary", "Transaction Date"]]
+
+    def row(self, batch, entry, account_number):
+        return [
+            entry.employee.full_name,
+            account_number, # We keep 'iban' field name but it stores Acct No
+            entry.employee.ifsc_code,
+            f"{entry.net_salary:.2f}",
+            self.transaction_date,
+        ]
+
+
+@register_bank_writer
+class SIFWriter(BankFileWriter):
+    """
+    WPS Salary Information File: one EDR (Employee Detail Record) per employee
+    followed by the SCR (Salary Control Record) with the totals.
+    """
+    key = 'SIF'
+    label = 'WPS SIF (EDR/SCR)'
+    extension = 'sif'
+    content_type = 'text/plain'
+
+    def filename(self, batch):
+        # Banks expect <EmployerID><YYMMDDHHMMSS>.SIF
+        employer_id = getattr(settings, 'WPS_EMPLOYER_ID', '') or 'EMPLOYER'
+        return f"{employer_id}{timezone.now().strftime('%y%m%d%H%M%S')}.SIF"
+
+    def row(self, batch, entry, account_number):
+        # RecordType, EmployeeID(14 chars), AgentID(Bank), AccountNumber(IBAN), StartDate, EndDate, Days, Fixed, Variable, Leave
+        # Enforce Identification Rule
+        emp_id = str(entry.employee.aadhaar_number or "").strip()
+        if emp_id:
+            emp_id = emp_id.zfill(12)
+        else:
+            # Fallback to internal ID
+            emp_id = str(entry.employee.id).zfill(12)
+
+        # Agent ID (Routing Code)
+        agent_id = getattr(entry.employee, 'bank_routing_code', '') or '000000000'
+
+        # Financials
+        fixed_pay = entry.basic_salary + entry.allowances
+        # We map Variable Pay as (Variable - Deductions) to balance Net.
+        variable_pay = entry.variable_pay - entry.deductions
+
+        return [
+            "EDR",
+            emp_id,
+            agent_id,
+            account_number,
+            batch.month.strftime("%Y-%m-%d"), # Pay Start Date
+            (batch.month + timezone.timedelta(days=29)).strftime("%Y-%m-%d"), # Pay End Date
+            entry.days_worked,
+            f"{fixed_pay:.2f}",
+            f"{variable_pay:.2f}",
+            "0.00" # Leave Salary
+        ]
+
+    def summary(self, batch):
+        # SCR total must equal the sum of the EDR fixed + variable columns
+        return batch.entries.aggregate(
+            count=Count('id'),
+            total=Sum(F('basic_salary') + F('allowances') + F('variable_pay') - F('deductions')),
+        )
+
+    def trailer(self, batch, summary):
+        now = timezone.localtime()
+        return [[
+            "SCR",
+            getattr(settings, 'WPS_EMPLOYER_ID', ''),
+            getattr(settings, 'WPS_BANK_CODE', ''),
+            now.strftime("%Y-%m-%d"),
+            now.strftime("%H%M"),
+            batch.month.strftime("%m%Y"),
+            summary['count'] or 0,
+            f"{summary['total'] or Decimal('0.00'):.2f}",
+            getattr(settings, 'WPS_CURRENCY', 'AED'),
+            "", # Employer reference (optional)
+        ]]
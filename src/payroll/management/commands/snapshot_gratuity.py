@@ -0,0 +1,29 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from payroll.services import GratuityService
+
+
+class Command(BaseCommand):
+    help = "Build the daily gratuity liability snapshot (schedule once a day, shortly after midnight)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="As-of date (YYYY-MM-DD), defaults to today")
+        parser.add_argument('--force', action='store_true', help="Rebuild even if the snapshot already exists")
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['date']:
+            try:
+                as_of = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("Invalid --date, expected YYYY-MM-DD")
+
+        from payroll.models import GratuitySnapshot
+        as_of = as_of or timezone.now().date()
+        snapshot = None if options['force'] else GratuitySnapshot.objects.filter(date=as_of).first()
+        snapshot = snapshot or GratuityService.build_snapshot(as_of)
+        self.stdout.write(self.style.SUCCESS(
+            f"Gratuity snapshot {snapshot.date}: {snapshot.employee_count} employees, "
+            f"{snapshot.eligible_count} eligible, liability {snapshot.total_liability}"
+        ))
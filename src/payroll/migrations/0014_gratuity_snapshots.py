@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0013_alter_payrollbatch_month_alter_payrollbatch_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GratuitySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('total_liability', models.DecimalField(decimal_places=2, default=0, help_text='Sum over ACTIVE employees', max_digits=14)),
+                ('employee_count', models.IntegerField(default=0)),
+                ('eligible_count', models.IntegerField(default=0, help_text='Employees past the minimum service period')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='GratuitySnapshotLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_years', models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gratuity_snapshot_lines', to=settings.AUTH_USER_MODEL)),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='payroll.gratuitysnapshot')),
+            ],
+            options={
+                'unique_together': {('snapshot', 'employee')},
+            },
+        ),
+    ]
@@ -510,3 +510,31 @@ class PayrollDeduction(models.Model):
     is_waived = models.BooleanField(default=False)
     approved_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
 
+
+class GratuitySnapshot(models.Model):
+    """
+    Daily end-of-service liability snapshot.
+    Built once per day by the snapshot_gratuity command, and again after employee changes
+    that affect it (GratuityService.build_snapshot), so the dashboard, employee list and
+    gratuity report don't recompute it per request.
+    """
+    date = models.DateField(unique=True)
+    total_liability = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Sum over ACTIVE employees")
+    employee_count = models.IntegerField(default=0)
+    eligible_count = models.IntegerField(default=0, help_text="Employees past the minimum service period")
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"Gratuity Liability {self.date}: {self.total_liability}"
+
+class GratuitySnapshotLine(models.Model):
+    snapshot = models.ForeignKey(GratuitySnapshot, on_delete=models.CASCADE, related_name='lines')
+    employee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='gratuity_snapshot_lines')
+    service_years = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('snapshot', 'employee')
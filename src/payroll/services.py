@@ -1,5 +1,4 @@
 import csv
-import io
 from decimal import Decimal
 from datetime import date
 from django.utils import timezone
@@ -18,6 +17,9 @@ class GratuityService:
     """
     Service to calculate UAE End-of-Service Benefits (Gratuity)
     """
+    # Rule 1: Service less than 5 years = No Gratuity (Statutory minimum)
+    MIN_SERVICE_YEARS = 4.8 # Roughly 4 years 240 days often used as cutoff
+    
     def __init__(self, employee):
         self.employee = employee
         self.start_date = employee.date_of_joining
@@ -27,25 +29,29 @@ class GratuityService:
         # We use 15 days per completed year of service
 
     def calculate(self) -> dict:
-        if not self.start_date or not self.employee.salary_basic:
+        return GratuityService.compute(self.start_date, self.employee.salary_basic, self.end_date, self.unpaid_leave_days)
+
+    @staticmethod
+    def compute(start_date, salary_basic, end_date, unpaid_leave_days=0) -> dict:
+        """Pure calculation shared by the per-employee and batch paths"""
+        if not start_date or not salary_basic:
             return {
                 "service_years": 0.0,
                 "amount": Decimal('0.00')
             }
             
-        total_days = (self.end_date - self.start_date).days + 1
-        active_days = total_days - self.unpaid_leave_days
+        total_days = (end_date - start_date).days + 1
+        active_days = total_days - unpaid_leave_days
         service_years = active_days / 365.25
 
         amount = Decimal('0.00')
         
-        # Rule 1: Service less than 5 years = No Gratuity (Statutory minimum)
-        if service_years < 4.8: # Roughly 4 years 240 days often used as cutoff
+        if service_years < GratuityService.MIN_SERVICE_YEARS:
             amount = Decimal('0.00')
             
         # Rule 2: Formula: (Basic / 26) * 15 * service_years
         else:
-            daily_basis = self.employee.salary_basic / Decimal('26.00')
+            daily_basis = salary_basic / Decimal('26.00')
             amount = (daily_basis * 15 * Decimal(service_years))
 
         return {
@@ -53,70 +59,175 @@ class GratuityService:
             "amount": round(amount, 2)
         }
 
+    @staticmethod
+    def workforce():
+        """Employees the daily snapshot holds a line for (everyone not archived)"""
+        return User.objects.filter(role__iexact='EMPLOYEE').exclude(status='ARCHIVED')
+
+    @staticmethod
+    def liability_scope():
+        """Employees counted in the reported liability (status ACTIVE)"""
+        return User.objects.filter(role__iexact='EMPLOYEE', status='ACTIVE')
+
+    @staticmethod
+    def calculate_batch(employees=None, as_of=None) -> dict:
+        """
+        Gratuity for many employees in one pass: {employee_id: {"service_years", "amount"}}.
+        A queryset is read with a single values_list query (no model instances);
+        a list of already-loaded employees is used as is.
+        """
+        as_of = as_of or timezone.now().date()
+        if employees is None:
+            employees = GratuityService.workforce()
+        if hasattr(employees, 'values_list'):
+            rows = employees.values_list('id', 'date_of_joining', 'salary_basic')
+        else:
+            rows = [(e.id, e.date_of_joining, e.salary_basic) for e in employees]
+        return {
+            emp_id: GratuityService.compute(joined, basic, as_of)
+            for emp_id, joined, basic in rows
+        }
+
+    @staticmethod
+    def build_snapshot(as_of=None):
+        """
+        (Re)builds the liability snapshot for the day. Run by the snapshot_gratuity job and,
+        after commit, by employee changes that affect gratuity (employees/signals.py).
+        """
+        from django.db import IntegrityError
+        from .models import GratuitySnapshot, GratuitySnapshotLine
+        as_of = as_of or timezone.now().date()
+
+        rows = list(GratuityService.workforce().values_list('id', 'date_of_joining', 'salary_basic', 'status'))
+        lines = []
+        total = Decimal('0.00')
+        eligible = 0
+        for emp_id, joined, basic, status in rows:
+            result = GratuityService.compute(joined, basic, as_of)
+            lines.append(GratuitySnapshotLine(
+                employee_id=emp_id,
+                service_years=Decimal(str(result['service_years'])),
+                amount=result['amount'],
+            ))
+            if result['amount'] > 0:
+                eligible += 1
+            # Same scope as liability_scope()
+            if status == 'ACTIVE':
+                total += result['amount']
+
+        try:
+            with transaction.atomic():
+                GratuitySnapshot.objects.filter(date=as_of).delete()
+                snapshot = GratuitySnapshot.objects.create(
+                    date=as_of,
+                    total_liability=total,
+                    employee_count=len(lines),
+                    eligible_count=eligible,
+                )
+                for line in lines:
+                    line.snapshot = snapshot
+                GratuitySnapshotLine.objects.bulk_create(lines, batch_size=1000)
+        except IntegrityError:
+            # Another process built the same day's snapshot concurrently
+            snapshot = GratuitySnapshot.objects.get(date=as_of)
+        return snapshot
+
+    @staticmethod
+    def rebuild_on_commit():
+        """Rebuilds today's snapshot once the current transaction commits (once per transaction)"""
+        from core.utils.transactions import on_commit_batched
+        on_commit_batched('gratuity_snapshot', [timezone.now().date()], lambda days: [
+            GratuityService.build_snapshot(day) for day in days
+        ])
+
+    @staticmethod
+    def get_snapshot(as_of=None):
+        """
+        The newest snapshot on or before as_of (default today) - read only, so requests never
+        write. None until the snapshot_gratuity job has run once.
+        """
+        from .models import GratuitySnapshot
+        as_of = as_of or timezone.now().date()
+        return GratuitySnapshot.objects.filter(date__lte=as_of).order_by('-date').first()
+
+    @staticmethod
+    def results_for(employees, as_of=None):
+        """
+        ({employee_id: {"service_years", "amount"}}, as-of date) for already-loaded employees,
+        read from the newest snapshot. Anyone it does not cover (e.g. archived staff, or no
+        snapshot yet) is computed in-process as of the same date.
+        """
+        from .models import GratuitySnapshotLine
+        employees = list(employees)
+        snapshot = GratuityService.get_snapshot(as_of)
+        results = {}
+        if snapshot is not None:
+            results = {
+                emp_id: {'service_years': years, 'amount': amount}
+                for emp_id, years, amount in GratuitySnapshotLine.objects.filter(
+                    snapshot=snapshot, employee_id__in=[e.id for e in employees]
+                ).values_list('employee_id', 'service_years', 'amount')
+            }
+        as_of = snapshot.date if snapshot is not None else (as_of or timezone.now().date())
+        missing = [e for e in employees if e.id not in results]
+        results.update(GratuityService.calculate_batch(missing, as_of=as_of))
+        return results, as_of
+
+    @staticmethod
+    def amounts_for(employees, as_of=None) -> dict:
+        """{employee_id: amount} for already-loaded employees (see results_for)"""
+        results, _ = GratuityService.results_for(employees, as_of)
+        return {emp_id: result['amount'] for emp_id, result in results.items()}
+
+    @staticmethod
+    def total_liability(as_of=None):
+        """(liability over liability_scope(), as-of date), from the newest snapshot when there is one"""
+        snapshot = GratuityService.get_snapshot(as_of)
+        if snapshot is not None:
+            return snapshot.total_liability, snapshot.date
+        as_of = as_of or timezone.now().date()
+        results = GratuityService.calculate_batch(GratuityService.liability_scope(), as_of=as_of)
+        return sum((result['amount'] for result in results.values()), Decimal('0.00')), as_of
+
 # --- 2. Bank Transfer File Generator ---
 class BankTransferService:
+    """
+    Thin facade over the writer registry in bank_formats.
+    Files are produced as a stream of chunks so large batches never sit in memory.
+    """
+
+    @staticmethod
+    def stream_export(batch: PayrollBatch, export_format=None):
+        """Returns (writer, iterator of bytes) - suitable for StreamingHttpResponse"""
+        from .bank_formats import get_bank_writer
+        writer = get_bank_writer(export_format)
+        return writer, writer.stream(batch)
+
     @staticmethod
-    def generate_export_file(batch: PayrollBatch) -> str:
+    def save_export(batch: PayrollBatch, export_format=None):
         """
-        Generates content for a CSV bank transfer file for Indian banks.
-        Format: EmployeeName, AccountNumber, IFSC, Amount, Remarks
+        Writes the bank file into batch.sif_file storage.
+        Chunks are spooled (to disk past 1 MB) and handed to the storage backend as a File,
+        which copies it across in chunks as well.
         """
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        entries = batch.entries.select_related('employee').all()
-        
-        # Header Row
-        writer.writerow(["Employee Name", "Account Number", "IFSC Code", "Net Salary", "Transaction Date"])
-
-        for entry in entries:
-            writer.writerow([
-                entry.employee.full_name,
-                entry.employee.iban, # We keep 'iban' field name but it stores Acct No
-                entry.employee.ifsc_code,
-                f"{entry.net_salary:.2f}",
-                timezone.now().strftime("%Y-%m-%d")
-            ])
-
-        return output.getvalue()
-
-        # 2. EDR (Employee Detail Record)
-        # RecordType, EmployeeID(14 chars), AgentID(Bank), AccountNumber(IBAN), StartDate, EndDate, Days, Fixed, Variable, Leave
-        for entry in entries:
-            # Enforce Identification Rule
-            emp_id = str(entry.employee.aadhaar_number or "").strip()
-            if emp_id:
-                emp_id = emp_id.zfill(12)
-            else:
-                # Fallback to internal ID
-                emp_id = str(entry.employee.id).zfill(12)
-            
-            # Agent ID (Routing Code)
-            agent_id = getattr(entry.employee, 'bank_routing_code', '') or '000000000'
-            
-            # Financials
-            fixed_pay = entry.basic_salary + entry.allowances
-            # Variable Pay = Additions (OT, Bonus) - Deductions
-            # Note: SIF logic varies by bank, but generally Variable is additions. Deductions are subtracted from Net.
-            # Field 8: Fixed, Field 9: Variable. Total = Fixed + Variable.
-            # Net Salary should match Fixed + Variable ideally, or SIF allows simple breakdown.
-            # We will map Variable Pay as (Variable - Deductions) to balance Net.
-            variable_pay = entry.variable_pay - entry.deductions
-            
-            writer.writerow([
-                "EDR", 
-                emp_id, 
-                agent_id, 
-                entry.iban, # Decrypted IBAN
-                batch.month.strftime("%Y-%m-%d"), # Pay Start Date
-                (batch.month + timezone.timedelta(days=29)).strftime("%Y-%m-%d"), # Pay End Date
-                entry.days_worked,
-                f"{fixed_pay:.2f}",
-                f"{variable_pay:.2f}", 
-                "0.00" # Leave Salary
-            ])
-            
-        return output.getvalue()
+        import tempfile
+        from django.core.files import File
+        writer, stream = BankTransferService.stream_export(batch, export_format)
+        with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as tmp:
+            for chunk in stream:
+                tmp.write(chunk)
+            tmp.seek(0)
+            batch.sif_file.save(writer.filename(batch), File(tmp), save=False)
+        return batch.sif_file
+
+    @staticmethod
+    def generate_export_file(batch: PayrollBatch, export_format=None) -> str:
+        """
+        Generates the whole bank file as a string.
+        Kept for small/ad-hoc callers; prefer save_export/stream_export.
+        """
+        _, stream = BankTransferService.stream_export(batch, export_format)
+        return b"".join(stream).decode()
 
 # --- 3. Attendance & Payroll Logic ---
 class PayrollService:
@@ -128,30 +239,33 @@ class PayrollService:
         decoded_file = file.read().decode('utf-8').splitlines()
         reader = csv.DictReader(decoded_file)
         
+        from core.utils.transactions import deferred_batches
         from .models import RawPunch
-        for row in reader:
-            email = row.get('EmployeeEmail')
-            try:
-                emp = User.objects.get(email=email)
-                log, _ = AttendanceLog.objects.update_or_create(
-                    employee=emp,
-                    date=row.get('Date'),
-                    defaults={
-                        'check_in': row.get('InTime'),
-                        'check_out': row.get('OutTime'),
-                        'entry_type': AttendanceLog.EntryType.AUTO
-                    }
-                )
-                # Sync Raw Punches to ensure 4-step formula applies
-                log.raw_punches.all().delete()
-                if log.check_in:
-                    RawPunch.objects.create(attendance_log=log, time=log.check_in, punch_type='IN')
-                if log.check_out:
-                    RawPunch.objects.create(attendance_log=log, time=log.check_out, punch_type='OUT')
+        # Rows are saved one by one; dashboards/KPIs refresh once at the end, not per row
+        with deferred_batches():
+            for row in reader:
+                email = row.get('EmployeeEmail')
+                try:
+                    emp = User.objects.get(email=email)
+                    log, _ = AttendanceLog.objects.update_or_create(
+                        employee=emp,
+                        date=row.get('Date'),
+                        defaults={
+                            'check_in': row.get('InTime'),
+                            'check_out': row.get('OutTime'),
+                            'entry_type': AttendanceLog.EntryType.AUTO
+                        }
+                    )
+                    # Sync Raw Punches to ensure 4-step formula applies
+                    log.raw_punches.all().delete()
+                    if log.check_in:
+                        RawPunch.objects.create(attendance_log=log, time=log.check_in, punch_type='IN')
+                    if log.check_out:
+                        RawPunch.objects.create(attendance_log=log, time=log.check_out, punch_type='OUT')
                 
-                log.recalculate_duration()
-            except User.DoesNotExist:
-                continue
+                    log.recalculate_duration()
+                except User.DoesNotExist:
+                    continue
 
     @staticmethod
     def parse_duration_to_minutes(duration_str):
@@ -563,8 +677,9 @@ class PayrollService:
         7. Statutory Deductions are mandatory. Company deductions waivable.
         """
         from core.models import CompanySettings
-        from leaves.models import LeaveRequest
+        from leaves.models import LeaveDay
         from .models import DeductionComponent, EmployeeDeduction, PayrollDeduction, PayrollEntry, AttendanceLog
+        from django.db.models import Sum
         import calendar
         from decimal import Decimal
         
@@ -580,6 +695,22 @@ class PayrollService:
         if batch.status == PayrollBatch.Status.DRAFT:
              batch.entries.all().delete()
 
+        # Batch-decrypt IBANs up front; emp.iban below is then a memo lookup
+        employees = User.prime_decrypted(employees, fields=['_iban'])
+        
+        # Holidays/weekends of the month are the same for everyone - resolve them once
+        month_days = [month_start.replace(day=d) for d in range(1, num_days + 1)]
+        holidays = {d for d in month_days if settings.is_holiday(d)}
+        
+        # Paid leave days per employee (excluding holidays), one aggregate over the LeaveDay index
+        paid_leave_days = dict(
+            LeaveDay.objects.filter(
+                date__range=[month_days[0], month_days[-1]], is_paid=True
+            ).exclude(date__in=holidays).order_by().values('employee').annotate(
+                days=Sum('fraction')
+            ).values_list('employee', 'days')
+        )
+        
         with transaction.atomic():
             for emp in employees:
                 basic = emp.salary_basic
@@ -588,15 +719,7 @@ class PayrollService:
                 hourly_rate = emp.hourly_salary
                 
                 # 1. Calculate Required Hours & Working Days
-                working_days_count = 0
-                required_work_hours = Decimal('0.00')
-                
-                # Iterate to count working days
-                for d in range(1, num_days + 1):
-                    check_date = month_start.replace(day=d)
-                    # Check holiday/weekend
-                    if not settings.is_holiday(check_date):
-                        working_days_count += 1
+                working_days_count = num_days - len(holidays)
                 
                 required_work_hours = Decimal(working_days_count) * Decimal('8.00')
                 
@@ -634,36 +757,8 @@ class PayrollService:
                 approved_ot_hours = round(Decimal(approved_ot_minutes) / Decimal('60.00'), 1)
                 
                 # --- Paid Leaves Handling ---
-                import datetime
-                leave_reqs = LeaveRequest.objects.filter(
-                    employee=emp,
-                    status__in=['MGR_APPROVED', 'HR_PROCESSED', 'APPROVED'],
-                    start_date__lte=month_start.replace(day=num_days),
-                    end_date__gte=month_start
-                )
-                
-                valid_leave_days = Decimal('0.00')
-                for req in leave_reqs:
-                    is_paid_leave = (req.payment_status == 'PAID') or (req.leave_type.is_paid and req.payment_status != 'LOP')
-                    if not is_paid_leave:
-                        continue
-                    
-                    # Rule: For sick leave, strictly require the document to be VERIFIED
-                    if req.is_sick_leave and req.document_status != 'VERIFIED':
-                        continue
-                        
-                    overlap_start = max(req.start_date, month_start)
-                    overlap_end = min(req.end_date, month_start.replace(day=num_days))
-                    
-                    if req.half_day:
-                        if overlap_start <= req.start_date <= overlap_end:
-                            if not settings.is_holiday(req.start_date):
-                                valid_leave_days += Decimal('0.5')
-                    else:
-                        for d in range((overlap_end - overlap_start).days + 1):
-                            curr_date = overlap_start + datetime.timedelta(days=d)
-                            if not settings.is_holiday(curr_date):
-                                valid_leave_days += Decimal('1.0')
+                # Sick leave only counts once its document is VERIFIED (see LeaveRequest.is_paid_leave)
+                valid_leave_days = paid_leave_days.get(emp.id) or Decimal('0.00')
                                 
                 valid_leave_hours = valid_leave_days * Decimal('8.00')
                 
@@ -797,7 +892,7 @@ class PayrollService:
         - Average Hours
         """
         from core.models import CompanySettings
-        from leaves.models import LeaveRequest
+        from leaves.models import LeaveDay
         from django.db.models import Sum, Count, Q
         import calendar
 
@@ -811,84 +906,56 @@ class PayrollService:
 
         # 1. Total Working Days in the month
         # Logic: count days that are NOT holidays in CompanySettings
-        working_days_count = 0
-        for d in range(1, num_days + 1):
-            check_date = date(year, month, d)
-            if not settings.is_holiday(check_date):
-                working_days_count += 1
+        month_days = [date(year, month, d) for d in range(1, num_days + 1)]
+        holidays = {d for d in month_days if settings.is_holiday(d)}
+        working_days_count = num_days - len(holidays)
 
         # 2. Get Employees
         employees = User.objects.filter(is_active=True).exclude(is_staff=True).exclude(role__iexact='CEO').exclude(role__iexact='ADMIN').exclude(status='ARCHIVED')
         
-        report_data = []
-        for emp in employees:
-            # A. Attendance Metrics
-            logs = AttendanceLog.objects.filter(
-                employee=emp, 
-                date__year=year, 
-                date__month=month
-            )
-            
-            stats = logs.aggregate(
+        # Month-wide reads, grouped in Python below (no per-employee / per-day queries)
+        month_logs = AttendanceLog.objects.filter(date__range=[start_date, end_date])
+        stats_by_emp = {
+            row['employee']: row
+            for row in month_logs.order_by().values('employee').annotate(
                 total_mins=Sum('total_work_minutes'),
                 # Days with at least one punch (check_in is not null)
                 days_present=Count('id', filter=Q(check_in__isnull=False))
             )
-            
-            total_mins = stats['total_mins'] or 0
-            days_present = stats['days_present'] or 0
+        }
+        punched = set(month_logs.filter(check_in__isnull=False).values_list('employee_id', 'date'))
+        
+        # Leave fraction per (employee, day); a full-day leave wins over half days
+        leave_by_day = {}
+        for emp_id, day, fraction in LeaveDay.objects.filter(
+            date__range=[start_date, end_date]
+        ).values_list('employee_id', 'date', 'fraction'):
+            key = (emp_id, day)
+            leave_by_day[key] = max(leave_by_day.get(key, Decimal('0.00')), fraction)
+        leave_days_by_emp = {}
+        for (emp_id, day), fraction in leave_by_day.items():
+            leave_days_by_emp[emp_id] = leave_days_by_emp.get(emp_id, Decimal('0.00')) + fraction
+        
+        report_data = []
+        for emp in employees:
+            # A. Attendance Metrics
+            stats = stats_by_emp.get(emp.id, {})
+            total_mins = stats.get('total_mins') or 0
+            days_present = stats.get('days_present') or 0
             total_hours = Decimal(total_mins) / Decimal('60.00')
             avg_hours = total_hours / Decimal(days_present) if days_present > 0 else Decimal('0.00')
             
-            # B. Leave Count
-            leave_reqs = LeaveRequest.objects.filter(
-                employee=emp,
-                status__in=['MGR_APPROVED', 'HR_PROCESSED', 'APPROVED'],
-                start_date__lte=end_date,
-                end_date__gte=start_date
-            )
-            
-            leave_days = Decimal('0.00')
-            for req in leave_reqs:
-                # Calculate overlap days strictly within the selected month
-                overlap_start = max(req.start_date, start_date)
-                overlap_end = min(req.end_date, end_date)
-                
-                if req.half_day:
-                    # If the half-day itself is within this month
-                    if req.start_date >= start_date and req.start_date <= end_date:
-                        leave_days += Decimal('0.5')
-                else:
-                    days = (overlap_end - overlap_start).days + 1
-                    leave_days += Decimal(str(days))
+            # B. Leave Count (days of effective leave within the selected month)
+            leave_days = leave_days_by_emp.get(emp.id) or Decimal('0.00')
 
             # C. Absent Days
             # Logic: Working days where there is NO punch AND NO approved leave (taking into account half-days)
             absent_days = Decimal('0.00')
-            for d in range(1, num_days + 1):
-                check_date = date(year, month, d)
-                if settings.is_holiday(check_date):
-                    continue
-                
-                has_punch = AttendanceLog.objects.filter(employee=emp, date=check_date, check_in__isnull=False).exists()
-                if has_punch:
+            for check_date in month_days:
+                if check_date in holidays or (emp.id, check_date) in punched:
                     continue
-                    
-                # Check for leaves on this day
-                day_leaves = LeaveRequest.objects.filter(
-                    employee=emp,
-                    status__in=['MGR_APPROVED', 'HR_PROCESSED', 'APPROVED'],
-                    start_date__lte=check_date,
-                    end_date__gte=check_date
-                )
-                
-                if not day_leaves.exists():
-                    absent_days += Decimal('1.0')
-                else:
-                    # If only half-day leaves exist and no punch, it's 0.5 absent
-                    is_full_leave = any(not r.half_day for r in day_leaves)
-                    if not is_full_leave:
-                        absent_days += Decimal('0.5')
+                # If only half-day leaves exist and no punch, it's 0.5 absent
+                absent_days += Decimal('1.0') - leave_by_day.get((emp.id, check_date), Decimal('0.00'))
             
             report_data.append({
                 'employee': emp,
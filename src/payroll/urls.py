@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('batches/', views.payroll_list, name='payroll_list'),
     path('batches/<int:pk>/', views.payroll_detail, name='payroll_detail'),
+    path('batches/<int:pk>/bank-export/', views.payroll_bank_export, name='payroll_bank_export'),
     path('my-payslips/', views.my_payslips, name='my_payslips'),
     path('my-attendance/', views.my_attendance, name='my_attendance'),
     path('attendance/', views.attendance_list, name='attendance_list'),
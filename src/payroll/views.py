@@ -1,7 +1,8 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from .models import PayrollBatch, AttendanceLog
-from .services import PayrollService, BankTransferService
+from .services import PayrollService, BankTransferService, GratuityService
+from decimal import Decimal
 from .forms import AttendanceImportForm, AttendanceManualEntryForm
 from django.utils import timezone
 from django.contrib import messages
@@ -15,6 +16,7 @@ def payroll_list(request):
 def payroll_detail(request, pk):
     from django.shortcuts import get_object_or_404
     from django.db.models import Sum
+    from .bank_formats import BANK_FILE_WRITERS
     batch = get_object_or_404(PayrollBatch, pk=pk)
     entries = batch.entries.select_related('employee').all()
     
@@ -30,9 +32,41 @@ def payroll_detail(request, pk):
         'entries': entries,
         'total_net': totals['total_net'] or 0,
         'total_deductions': totals['total_deductions'] or 0,
-        'total_ot': totals['total_ot'] or 0
+        'total_ot': totals['total_ot'] or 0,
+        'bank_formats': [(key, cls.label) for key, cls in BANK_FILE_WRITERS.items()],
     })
 
+@login_required
+def payroll_bank_export(request, pk):
+    """Streams the bank transfer file for a batch in the requested layout (?format=INDIAN_CSV|SIF)"""
+    from django.shortcuts import get_object_or_404
+    from django.http import StreamingHttpResponse
+    if not (request.user.is_superuser or (hasattr(request.user, 'role') and request.user.role in ['ADMIN', 'HR_MANAGER', 'CEO'])):
+        messages.error(request, "Permission denied.")
+        return redirect('payroll_list')
+
+    batch = get_object_or_404(PayrollBatch, pk=pk)
+    try:
+        writer, stream = BankTransferService.stream_export(batch, request.GET.get('format'))
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('payroll_detail', pk=pk)
+
+    from core.models import AuditLog
+    AuditLog.log(
+        user=request.user,
+        action=AuditLog.Action.EXPORT,
+        obj=batch,
+        changes={'format': writer.key},
+        request=request,
+        module=AuditLog.Module.PAYROLL,
+        object_repr=f"PayrollBatch for {batch.month.strftime('%b %Y')}"
+    )
+
+    response = StreamingHttpResponse(stream, content_type=writer.content_type)
+    response['Content-Disposition'] = f'attachment; filename="{writer.filename(batch)}"'
+    return response
+
 from django.contrib.auth import get_user_model
 
 @login_required
@@ -129,11 +163,10 @@ def attendance_list(request):
             logs = logs.filter(date=date_filter)
         except ValueError:
             # Not a date, search by name/ID
+            from users.search import EmployeeSearch
             search_id = search_query.replace('EMP-', '').replace('emp-', '')
             logs = logs.filter(
-                Q(employee__full_name__icontains=search_query) |
-                Q(employee__username__icontains=search_query) |
-                Q(employee__employee_id__icontains=search_query) |
+                Q(employee__in=EmployeeSearch.filter(User.objects.all(), search_query)) |
                 Q(employee__id__exact=search_id if search_id.isdigit() else -1)
             )
         
@@ -205,7 +238,7 @@ def attendance_list(request):
             # We have a specific employee! Let's build a day-by-day log list.
             from datetime import timedelta
             from core.models import CompanySettings
-            from leaves.models import LeaveRequest
+            from leaves.models import LeaveDay
             import calendar
             
             settings = CompanySettings.load()
@@ -214,6 +247,12 @@ def attendance_list(request):
             # Map existing logs by date for quick access
             log_map = {log.date: log for log in logs}
             
+            # Leave days in the window (one range scan instead of a query per day)
+            leave_dates = set(LeaveDay.objects.filter(
+                employee=target_employee,
+                date__range=[view_start_date, view_end_date]
+            ).values_list('date', flat=True))
+            
             curr = view_start_date
             while curr <= view_end_date:
                 if curr in log_map:
@@ -245,13 +284,7 @@ def attendance_list(request):
                         is_absent_flag = False
                     else:
                         # Check if they are on APPROVED Leave this day
-                        has_leave = LeaveRequest.objects.filter(
-                            employee=target_employee,
-                            status__in=['MGR_APPROVED', 'HR_PROCESSED', 'APPROVED'],
-                            start_date__lte=curr,
-                            end_date__gte=curr
-                        ).exists()
-                        if has_leave:
+                        if curr in leave_dates:
                             virtual_status = "Leave"
                             is_absent_flag = False
                     
@@ -392,9 +425,7 @@ def run_payroll_action(request):
         batch = PayrollBatch.objects.create(month=batch_date)
         PayrollService.calculate_payroll(batch)
         
-        file_content = BankTransferService.generate_export_file(batch)
-        from django.core.files.base import ContentFile
-        batch.sif_file.save(f"BankTransfer_{batch_date.strftime('%Y%m')}.csv", ContentFile(file_content))
+        BankTransferService.save_export(batch)
         batch.status = PayrollBatch.Status.FINALIZED
         batch.save()
         
@@ -446,41 +477,22 @@ def gratuity_report(request):
     if not request.user.is_staff and not request.user.role in ['ADMIN', 'HR_MANAGER', 'CEO']:
         return redirect('dashboard')
         
-    from django.contrib.auth import get_user_model
-    User = get_user_model()
-    from datetime import date
+    # Read the daily liability snapshot instead of recomputing per employee
+    employees = list(GratuityService.liability_scope().filter(date_of_joining__isnull=False))
+    results, today = GratuityService.results_for(employees)
     
-    employees = User.objects.filter(role__iexact='EMPLOYEE', status='ACTIVE')
     report_data = []
-    total_liability = 0
-    
-    today = date.today()
-    
     for emp in employees:
-        if not emp.date_of_joining:
-            continue
-            
-        # Calculate Tenure
-        delta = today - emp.date_of_joining
-        years_service = delta.days / 365.25
-        
-        # Calculate Gratuity (Indian Standard: 15 days per year based on (Basic/26))
-        if years_service < 4.8:
-            gratuity_amount = 0
-            gratuity_days = 0
-        else:
-            daily_basis = float(emp.salary_basic) / 26 if emp.salary_basic else 0
-            gratuity_days = years_service * 15
-            gratuity_amount = gratuity_days * daily_basis
-        
+        result = results[emp.id]
         report_data.append({
             'employee': emp,
             'joining_date': emp.date_of_joining,
-            'years_service': round(years_service, 2),
-            'gratuity_amount': round(gratuity_amount, 2),
-            'daily_basic': round(float(emp.salary_basic)/30, 2) if emp.salary_basic else 0
+            'years_service': result['service_years'],
+            'gratuity_amount': result['amount'],
+            'daily_basic': round(emp.salary_basic / 30, 2) if emp.salary_basic else 0
         })
-        total_liability += gratuity_amount
+    # The total is that of the rows shown
+    total_liability = sum((row['gratuity_amount'] for row in report_data), Decimal('0.00'))
 
     return render(request, 'payroll/gratuity_report.html', {
         'report_data': report_data,
@@ -551,25 +563,15 @@ def employee_autocomplete(request):
     
     User = get_user_model()
     
-    # Search active employees only
-    # We use a trick to prioritize matches that START with the query
+    # Search active employees only, ranked prefix lookup on the search index
+    from users.search import EmployeeSearch
     employees = User.objects.filter(
-        Q(full_name__icontains=query) | 
-        Q(username__icontains=query) |
-        Q(aadhaar_number__icontains=query)
-    ).filter(
         is_active=True
     ).exclude(
         status='ARCHIVED'
     ).exclude(is_staff=True).exclude(role__iexact='CEO').exclude(role__iexact='ADMIN')
     
-    # Sort in memory or keep it simple with icontains for now but filter in loop
-    # Actually, let's just use istartswith for primary and icontains for secondary
-    
-    results = list(employees.filter(full_name__istartswith=query)[:10])
-    if len(results) < 10:
-        remaining = employees.exclude(id__in=[e.id for e in results])[:10 - len(results)]
-        results.extend(list(remaining))
+    results = EmployeeSearch.suggest(query, employees, limit=10)
     
     suggestions = []
     for emp in results:
@@ -598,7 +600,8 @@ def payroll_batch_delete(request, pk):
         
     if request.method == 'POST':
         from django.db import transaction
-        from leaves.models import LOPAdjustment, LeaveType, LeaveBalance
+        from leaves.models import LOPAdjustment
+        from leaves.ledger import LeaveLedger
         
         with transaction.atomic():
             # Restore Annual Leave balances for any approved LOP adjustments
@@ -609,18 +612,7 @@ def payroll_batch_delete(request, pk):
             ).select_related('employee')
             
             for adj in approved_adjustments:
-                try:
-                    ann_type = LeaveType.objects.get(code='ANN')
-                    balance = LeaveBalance.objects.filter(
-                        employee=adj.employee,
-                        leave_type=ann_type,
-                        year=adj.created_at.year
-                    ).first()
-                    if balance:
-                        balance.days_used = max(0.0, float(balance.days_used) - float(adj.requested_annual_leave_days))
-                        balance.save()
-                except LeaveType.DoesNotExist:
-                    pass
+                LeaveLedger.reverse_lop(adj, user=request.user)
             
             batch.delete()
         
@@ -705,12 +697,9 @@ def manage_overtime(request):
     # 3. Search Filter
     search_query = request.GET.get('search', '').strip()
     if search_query:
-        # Search by name or ID
-        logs = logs.filter(
-            Q(employee__full_name__icontains=search_query) |
-            Q(employee__username__icontains=search_query) |
-            Q(employee__employee_id__icontains=search_query)
-        )
+        # Search by name or ID (indexed prefix search)
+        from users.search import EmployeeSearch
+        logs = EmployeeSearch.filter(logs, search_query, field='employee')
 
     # 4. Handle POST (Bulk Update via Checkboxes)
     if request.method == "POST":
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from projects.rollup import HoursRollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the per (project, employee, month) hours rollup from the logged project hours. "
+        "Run once after deploying the rollup, and after bulk imports or edits that bypass signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, action='append', help="Project id to rebuild (repeatable). Defaults to all")
+
+    def handle(self, *args, **options):
+        count = HoursRollup.rebuild(options['project'])
+        self.stdout.write(self.style.SUCCESS(f"Project hours rollup rebuilt: {count} bucket(s)."))
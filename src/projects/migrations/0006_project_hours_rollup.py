@@ -0,0 +1,49 @@
+# Generated by Django 5.0.1 on 2026-10-19 09:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_remove_project_code'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectHoursRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('standard_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('extra_time', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('overtime', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('entries', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='projecthours',
+            index=models.Index(fields=['project', 'date'], name='projects_pr_project_0c9fbd_idx'),
+        ),
+        migrations.AddField(
+            model_name='projecthoursrollup',
+            name='employee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_hours_rollup', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='projecthoursrollup',
+            name='project',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hours_rollup', to='projects.project'),
+        ),
+        migrations.AddIndex(
+            model_name='projecthoursrollup',
+            index=models.Index(fields=['project', 'month'], name='projects_pr_project_060951_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='projecthoursrollup',
+            unique_together={('project', 'employee', 'month')},
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_rollup(apps, schema_editor):
+    """Same grouped query as projects.rollup.HoursRollup.rebuild(), on the historical models"""
+    ProjectHours = apps.get_model('projects', 'ProjectHours')
+    ProjectHoursRollup = apps.get_model('projects', 'ProjectHoursRollup')
+
+    rows = ProjectHours.objects.annotate(month=TruncMonth('date')).values('project_id', 'employee_id', 'month').annotate(
+        total_std=Sum('standard_hours'), total_extra=Sum('extra_time'),
+        total_ot=Sum('overtime'), total_entries=Count('pk')
+    ).order_by()
+    ProjectHoursRollup.objects.all().delete()
+    ProjectHoursRollup.objects.bulk_create([
+        ProjectHoursRollup(
+            project_id=row['project_id'], employee_id=row['employee_id'], month=row['month'],
+            standard_hours=row['total_std'], extra_time=row['total_extra'],
+            overtime=row['total_ot'], entries=row['total_entries'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_project_hours_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
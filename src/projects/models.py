@@ -29,6 +29,36 @@ class ProjectHours(models.Model):
     class Meta:
         verbose_name_plural = "Project Hours"
         ordering = ['-date', '-created_at']
+        indexes = [
+            # Detail pages and rollup buckets: one project's rows for a month
+            models.Index(fields=['project', 'date']),
+        ]
 
     def __str__(self):
         return f"{self.employee} - {self.project} - {self.date}"
+
+
+class ProjectHoursRollup(models.Model):
+    """
+    ProjectHours summed per (project, employee, month). Kept current by
+    projects.signals after every save/delete; `manage.py rebuild_project_rollup`
+    re-derives it from the raw rows. Project totals, per-employee totals and the
+    month picker read this table instead of aggregating the whole history.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='hours_rollup')
+    employee = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='project_hours_rollup')
+    month = models.DateField(help_text="First day of the month")
+
+    standard_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    extra_time = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    overtime = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    entries = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('project', 'employee', 'month')
+        indexes = [
+            models.Index(fields=['project', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id}/{self.employee_id} {self.month:%Y-%m}"
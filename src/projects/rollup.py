@@ -0,0 +1,109 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from core.utils.transactions import on_commit_batched
+from .models import ProjectHours, ProjectHoursRollup
+
+
+class HoursRollup:
+    """
+    Reads and maintenance for ProjectHoursRollup.
+
+    A change to ProjectHours marks its (project, employee, month) bucket - and
+    the old one, when an edit moves the row - and each marked bucket is summed
+    again from its own rows once the transaction commits. Re-deriving a bucket
+    instead of applying deltas keeps the rollup exact under concurrent edits;
+    the cost stays one indexed aggregate per touched bucket.
+    """
+
+    @staticmethod
+    def bucket(hours):
+        return (hours.project_id, hours.employee_id, hours.date.replace(day=1))
+
+    @staticmethod
+    def mark_dirty(*buckets):
+        on_commit_batched('project_hours_rollup', buckets, HoursRollup.refresh)
+
+    @staticmethod
+    def _next_month(month):
+        return (month + timedelta(days=32)).replace(day=1)
+
+    @staticmethod
+    def refresh(buckets):
+        """Re-derives the given (project id, employee id, month) buckets from ProjectHours"""
+        for project_id, employee_id, month in buckets:
+            totals = ProjectHours.objects.filter(
+                project_id=project_id, employee_id=employee_id,
+                date__gte=month, date__lt=HoursRollup._next_month(month)
+            ).aggregate(
+                standard_hours=Sum('standard_hours'), extra_time=Sum('extra_time'),
+                overtime=Sum('overtime'), entries=Count('pk')
+            )
+            key = {'project_id': project_id, 'employee_id': employee_id, 'month': month}
+            if not totals['entries']:
+                ProjectHoursRollup.objects.filter(**key).delete()
+                continue
+            ProjectHoursRollup.objects.update_or_create(**key, defaults=totals)
+
+    @staticmethod
+    def rebuild(project_ids=None, batch_size=1000):
+        """Recomputes the whole rollup (or that of some projects) with one grouped query"""
+        hours = ProjectHours.objects.all()
+        rollup = ProjectHoursRollup.objects.all()
+        if project_ids is not None:
+            hours = hours.filter(project_id__in=project_ids)
+            rollup = rollup.filter(project_id__in=project_ids)
+
+        rows = hours.annotate(month=TruncMonth('date')).values('project_id', 'employee_id', 'month').annotate(
+            total_std=Sum('standard_hours'), total_extra=Sum('extra_time'),
+            total_ot=Sum('overtime'), total_entries=Count('pk')
+        ).order_by()
+        with transaction.atomic():
+            rollup.delete()
+            created = ProjectHoursRollup.objects.bulk_create([
+                ProjectHoursRollup(
+                    project_id=row['project_id'], employee_id=row['employee_id'], month=row['month'],
+                    standard_hours=row['total_std'], extra_time=row['total_extra'],
+                    overtime=row['total_ot'], entries=row['total_entries'],
+                )
+                for row in rows
+            ], batch_size=batch_size)
+        return len(created)
+
+    # --- reads ------------------------------------------------------------
+
+    @staticmethod
+    def for_project(project, month=None):
+        rows = ProjectHoursRollup.objects.filter(project=project)
+        return rows if month is None else rows.filter(month=month)
+
+    @staticmethod
+    def totals(project, month=None):
+        return HoursRollup.for_project(project, month).aggregate(
+            total_std=Sum('standard_hours'),
+            total_extra=Sum('extra_time'),
+            total_ot=Sum('overtime'),
+            total_combined=Sum(F('standard_hours') + F('extra_time') + F('overtime')),
+            entries=Sum('entries'),
+        )
+
+    @staticmethod
+    def by_employee(project, month=None):
+        return HoursRollup.for_project(project, month).values(
+            'employee__full_name',
+            'employee__username',
+            'employee__id'
+        ).annotate(
+            total_std=Sum('standard_hours'),
+            total_extra=Sum('extra_time'),
+            total_ot=Sum('overtime'),
+            total_combined=Sum(F('standard_hours') + F('extra_time') + F('overtime'))
+        ).order_by('-total_combined')
+
+    @staticmethod
+    def months(project):
+        """Months with logged hours, newest first"""
+        return list(
+            ProjectHoursRollup.objects.filter(project=project).order_by('-month').values_list('month', flat=True).distinct()
+        )
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import ProjectHours
+from .rollup import HoursRollup
+
+
+@receiver(post_save, sender=ProjectHours)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    """Re-sum the row's month bucket, and the bucket it left if the edit moved it"""
+    if raw:
+        return
+    buckets = {HoursRollup.bucket(instance)}
+    old = getattr(instance, '_old_instance', None)  # set by core.signals.store_old_instance
+    if not created and old is not None:
+        buckets.add(HoursRollup.bucket(old))
+    HoursRollup.mark_dirty(*buckets)
+
+
+@receiver(post_delete, sender=ProjectHours)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    HoursRollup.mark_dirty(HoursRollup.bucket(instance))
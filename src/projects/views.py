@@ -119,61 +119,53 @@ def project_detail(request, pk):
     selected_month = int(request.GET.get('month', now.month))
     selected_year = int(request.GET.get('year', now.year))
 
+    # Totals, contributors and the month picker read the (project, employee, month)
+    # rollup (projects.rollup); only the page of detail rows touches ProjectHours.
+    from django.core.paginator import Paginator
+    from .rollup import HoursRollup
+
     if show_all:
+        month = None
         base_qs = ProjectHours.objects.filter(project=project)
         label = "Complete Portfolio"
     else:
-        selected_date = datetime.date(selected_year, selected_month, 1)
-        label = selected_date.strftime('%B %Y')
+        month = datetime.date(selected_year, selected_month, 1)
+        label = month.strftime('%B %Y')
         base_qs = ProjectHours.objects.filter(
             project=project,
-            date__year=selected_year,
-            date__month=selected_month
+            date__gte=month,
+            date__lt=(month + datetime.timedelta(days=32)).replace(day=1)
         )
 
     # Aggregate summaries
-    stats = base_qs.aggregate(
-        total_std=Sum('standard_hours'),
-        total_extra=Sum('extra_time'),
-        total_ot=Sum('overtime')
-    )
+    stats = HoursRollup.totals(project, month)
 
     # Aggregated hours per employee
-    employee_stats = base_qs.values(
-        'employee__full_name',
-        'employee__username',
-        'employee__id'
-    ).annotate(
-        total_std=Sum('standard_hours'),
-        total_extra=Sum('extra_time'),
-        total_ot=Sum('overtime'),
-        total_combined=Sum('standard_hours') + Sum('extra_time') + Sum('overtime')
-    ).order_by('-total_combined')
-
-    # Detailed logs
-    logs = base_qs.select_related('employee').order_by('-date')
-
-    # Generate months from project creation month up to current month
-    available_months = []
-    start = project.created_at.date().replace(day=1)
+    employee_stats = HoursRollup.by_employee(project, month)
+
+    # Detailed logs, a page at a time (counted on the (project, date) index)
+    paginator = Paginator(base_qs.select_related('employee').order_by('-date', '-pk'), 50)
+    logs = paginator.get_page(request.GET.get('page'))
+
+    # Months with logged hours, plus the current month
     current = now.date().replace(day=1)
-    cursor = current
-    while cursor >= start:
-        available_months.append({
-            'month': cursor.month,
-            'year': cursor.year,
-            'name': cursor.strftime('%B %Y')
-        })
-        if cursor.month == 1:
-            cursor = cursor.replace(year=cursor.year - 1, month=12)
-        else:
-            cursor = cursor.replace(month=cursor.month - 1)
+    months = HoursRollup.months(project)
+    if current not in months:
+        months.insert(0, current)
+    available_months = [
+        {'month': m.month, 'year': m.year, 'name': m.strftime('%B %Y')} for m in months
+    ]
+
+    params = request.GET.copy()
+    params.pop('page', None)
 
     context = {
         'project': project,
         'stats': stats,
         'employee_stats': employee_stats,
         'logs': logs,
+        'page_obj': logs,
+        'filter_query': params.urlencode(),
         'selected_month': selected_month,
         'selected_year': selected_year,
         'show_all': show_all,
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from core.utils.encryption import EncryptionUtils
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Populate the PAN / passport / IBAN blind index columns for existing users"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true', help="Recompute every row (e.g. after changing BLIND_INDEX_KEY)")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        mapping = CustomUser.BLIND_INDEX_FIELDS
+        qs = CustomUser.objects.order_by('pk').only('pk', *mapping.keys(), *mapping.values())
+
+        last_pk = 0
+        processed = updated = 0
+        while True:
+            chunk = list(qs.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+
+            changed = set()
+            for field, index_field in mapping.items():
+                # Only decrypt what needs indexing, and do it in one batch per chunk
+                pending = [u for u in chunk if getattr(u, field) and (options['all'] or not getattr(u, index_field))]
+                plain = EncryptionUtils.decrypt_many(getattr(u, field) for u in pending)
+                for u in pending:
+                    digest = EncryptionUtils.blind_index(plain[getattr(u, field)])
+                    if digest != getattr(u, index_field):
+                        setattr(u, index_field, digest)
+                        changed.add(u.pk)
+
+            rows = [u for u in chunk if u.pk in changed]
+            if rows:
+                # bulk_update: no save() / audit signals per row
+                CustomUser.objects.bulk_update(rows, list(mapping.values()))
+
+            last_pk = chunk[-1].pk
+            processed += len(chunk)
+            updated += len(rows)
+            self.stdout.write(f"Processed {processed} users ({updated} updated)...")
+
+        self.stdout.write(self.style.SUCCESS(f"Done. {updated} of {processed} users updated."))
@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand
+from users.search import EmployeeSearch
+
+
+class Command(BaseCommand):
+    help = "Rebuild the employee search index (EmployeeSearchTerm). Backfilled on migrate; run to reconcile."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        total = EmployeeSearch.rebuild(batch_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {total} search terms in {time.monotonic() - started:.1f}s."
+        ))
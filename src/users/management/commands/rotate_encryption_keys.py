@@ -0,0 +1,81 @@
+import time
+from cryptography.fernet import InvalidToken
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.utils.encryption import EncryptionUtils
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-encrypt PAN / passport / IBAN columns under the current ENCRYPTION_KEY. "
+        "Keep the previous key in HRMS_ENCRYPTION_OLD_KEYS until this has finished."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--start-after', type=int, default=0, help="Resume after this user pk")
+        parser.add_argument('--dry-run', action='store_true', help="Count rows needing rotation without writing")
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        fields = list(CustomUser.ENCRYPTED_FIELDS)
+
+        if len(EncryptionUtils.get_keys()) < 2:
+            self.stdout.write(self.style.WARNING(
+                "No HRMS_ENCRYPTION_OLD_KEYS configured - only rows already on the current key can be read."
+            ))
+
+        last_pk = options['start_after']
+        scanned = rotated = failed = 0
+        started = time.monotonic()
+
+        while True:
+            # Rows are locked per chunk so a concurrent profile edit can't be overwritten
+            # with the value read before it. bulk_update bypasses save() and the audit signals.
+            with transaction.atomic():
+                chunk = list(
+                    CustomUser.objects.select_for_update()
+                    .filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .only('pk', *fields)[:chunk_size]
+                )
+                if not chunk:
+                    break
+
+                changed = []
+                for user in chunk:
+                    dirty = False
+                    for field in fields:
+                        token = getattr(user, field)
+                        # Already on the primary key -> skip, which makes re-runs cheap
+                        if not token or EncryptionUtils.is_current(token):
+                            continue
+                        try:
+                            setattr(user, field, EncryptionUtils.rotate(token))
+                            dirty = True
+                            rotated += 1
+                        except InvalidToken:
+                            failed += 1
+                            self.stderr.write(f"User {user.pk}: {field} cannot be decrypted with any configured key")
+                    if dirty:
+                        changed.append(user)
+
+                if changed and not options['dry_run']:
+                    CustomUser.objects.bulk_update(changed, fields)
+
+            scanned += len(chunk)
+            last_pk = chunk[-1].pk
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"Up to pk {last_pk}: {scanned} users scanned, {rotated} values rotated "
+                f"({scanned / elapsed if elapsed else 0:.0f} users/s)"
+            )
+
+        elapsed = time.monotonic() - started
+        verb = "would be rotated" if options['dry_run'] else "rotated"
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {elapsed:.1f}s. {scanned} users scanned, {rotated} values {verb}, {failed} failed."
+        ))
+        if failed:
+            self.stdout.write(self.style.WARNING("Some values could not be decrypted; keep the old keys until they are resolved."))
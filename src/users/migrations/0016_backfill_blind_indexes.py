@@ -0,0 +1,45 @@
+from django.db import migrations
+
+# Encrypted column -> blind index column (users.models.CustomUser.BLIND_INDEX_FIELDS)
+BLIND_INDEX_FIELDS = {
+    '_pan_number': 'pan_number_bidx',
+    '_passport_number': 'passport_number_bidx',
+    '_iban': 'iban_bidx',
+}
+
+
+def backfill_blind_indexes(apps, schema_editor):
+    """Same work as `manage.py backfill_blind_indexes`, so duplicate checks hold from the first request"""
+    from core.utils.encryption import EncryptionUtils
+    CustomUser = apps.get_model('users', 'CustomUser')
+    qs = CustomUser.objects.order_by('pk').only('pk', *BLIND_INDEX_FIELDS, *BLIND_INDEX_FIELDS.values())
+
+    last_pk = 0
+    while True:
+        chunk = list(qs.filter(pk__gt=last_pk)[:500])
+        if not chunk:
+            break
+        changed = set()
+        for field, index_field in BLIND_INDEX_FIELDS.items():
+            pending = [u for u in chunk if getattr(u, field) and not getattr(u, index_field)]
+            plain = EncryptionUtils.decrypt_many(getattr(u, field) for u in pending)
+            for u in pending:
+                digest = EncryptionUtils.blind_index(plain[getattr(u, field)])
+                if digest:
+                    setattr(u, index_field, digest)
+                    changed.add(u.pk)
+        rows = [u for u in chunk if u.pk in changed]
+        if rows:
+            CustomUser.objects.bulk_update(rows, list(BLIND_INDEX_FIELDS.values()))
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_employee_search_terms'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_blind_indexes, migrations.RunPython.noop),
+    ]
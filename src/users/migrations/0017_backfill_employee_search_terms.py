@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def backfill_search_terms(apps, schema_editor):
+    """Same rows as EmployeeSearch.rebuild(), on the historical models, so search works from the first request"""
+    from users.search import EmployeeSearch
+    CustomUser = apps.get_model('users', 'CustomUser')
+    EmployeeSearchTerm = apps.get_model('users', 'EmployeeSearchTerm')
+    designations = dict(CustomUser._meta.get_field('designation').flatchoices)
+    qs = CustomUser.objects.order_by('pk').only('pk', *EmployeeSearch.FIELD_WEIGHTS)
+
+    EmployeeSearchTerm.objects.all().delete()
+    last_pk = 0
+    while True:
+        chunk = list(qs.filter(pk__gt=last_pk)[:500])
+        if not chunk:
+            break
+        rows = []
+        for user in chunk:
+            terms = {}
+            for field, weight in EmployeeSearch.FIELD_WEIGHTS.items():
+                value = getattr(user, field, None)
+                if field == 'designation' and value:
+                    value = designations.get(value, value)
+                for word in EmployeeSearch.tokenize(value):
+                    terms[word] = max(weight, terms.get(word, 0))
+            rows.extend(EmployeeSearchTerm(user_id=user.pk, term=term, weight=weight) for term, weight in terms.items())
+        EmployeeSearchTerm.objects.bulk_create(rows, batch_size=1000)
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0016_backfill_blind_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_terms, migrations.RunPython.noop),
+    ]
@@ -108,6 +108,11 @@ class CustomUser(AbstractUser):
     _passport_number = models.CharField(max_length=255, db_column="passport_number", help_text="Encrypted Passport Number", blank=True, null=True)
     _iban = models.CharField(max_length=255, db_column="iban", help_text="Encrypted Account Number / IBAN", blank=True, null=True)
     
+    # Blind indexes (HMAC of the normalized plaintext) for indexed equality lookups
+    pan_number_bidx = models.CharField(max_length=64, blank=True, null=True, db_index=True, editable=False)
+    passport_number_bidx = models.CharField(max_length=64, blank=True, null=True, db_index=True, editable=False)
+    iban_bidx = models.CharField(max_length=64, blank=True, null=True, db_index=True, editable=False)
+    
     # New Field for Indian Banking
     ifsc_code = models.CharField(max_length=11, blank=True, null=True, help_text="Bank IFSC Code (11 Characters)", validators=[RegexValidator(r'^[A-Z]{4}0[A-Z0-9]{6}$', 'Invalid IFSC format (e.g., HDFC0001234)')])
 
@@ -165,26 +170,99 @@ class CustomUser(AbstractUser):
         return daily_salary / Decimal('8.00')
 
     # --- Encryption Accessors ---
+    ENCRYPTED_FIELDS = ('_pan_number', '_passport_number', '_iban')
+    BLIND_INDEX_FIELDS = {
+        '_pan_number': 'pan_number_bidx',
+        '_passport_number': 'passport_number_bidx',
+        '_iban': 'iban_bidx',
+    }
+
+    def _get_decrypted(self, field):
+        """
+        Decrypts an encrypted column, memoized on the instance.
+        The memo stores the ciphertext it was computed from, so it goes stale
+        automatically as soon as the backing field changes (setter, refresh_from_db, ...).
+        """
+        token = getattr(self, field)
+        if not token:
+            return None
+        memo = self.__dict__.setdefault('_decrypted_memo', {})
+        cached = memo.get(field)
+        if cached is None or cached[0] != token:
+            cached = (token, EncryptionUtils.decrypt(token))
+            memo[field] = cached
+        return cached[1]
+
+    def _set_encrypted(self, field, value):
+        token = EncryptionUtils.encrypt(value) if value else None
+        setattr(self, field, token)
+        setattr(self, self.BLIND_INDEX_FIELDS[field], EncryptionUtils.blind_index(value))
+        if token:
+            self.__dict__.setdefault('_decrypted_memo', {})[field] = (token, value)
+
+    @classmethod
+    def prime_decrypted(cls, users, fields=ENCRYPTED_FIELDS):
+        """
+        Batch-decrypts the given encrypted fields for a list of users in one pass,
+        so property access afterwards (emp.iban etc.) is a memo hit.
+        """
+        users = list(users)
+        for field in fields:
+            plain = EncryptionUtils.decrypt_many(getattr(u, field) for u in users)
+            for u in users:
+                token = getattr(u, field)
+                if token:
+                    u.__dict__.setdefault('_decrypted_memo', {})[field] = (token, plain[token])
+        return users
+
+    @classmethod
+    def blind_lookup(cls, name, value):
+        """
+        Filter kwargs for an exact match on an encrypted field, e.g.
+        CustomUser.objects.filter(**CustomUser.blind_lookup('iban', acct_no))
+        """
+        return {cls.BLIND_INDEX_FIELDS[f'_{name}']: EncryptionUtils.blind_index(value)}
+
     @property
     def pan_number(self):
-        return EncryptionUtils.decrypt(self._pan_number) if self._pan_number else None
+        return self._get_decrypted('_pan_number')
     
     @pan_number.setter
     def pan_number(self, value):
-        self._pan_number = EncryptionUtils.encrypt(value) if value else None
+        self._set_encrypted('_pan_number', value)
 
     @property
     def passport_number(self):
-        return EncryptionUtils.decrypt(self._passport_number) if self._passport_number else None
+        return self._get_decrypted('_passport_number')
     
     @passport_number.setter
     def passport_number(self, value):
-        self._passport_number = EncryptionUtils.encrypt(value) if value else None
+        self._set_encrypted('_passport_number', value)
 
     @property
     def iban(self):
-        return EncryptionUtils.decrypt(self._iban) if self._iban else None
+        return self._get_decrypted('_iban')
 
     @iban.setter
     def iban(self, value):
-        self._iban = EncryptionUtils.encrypt(value) if value else None
\ No newline at end of file
+        self._set_encrypted('_iban', value)
+
+class EmployeeSearchTerm(models.Model):
+    """
+    Inverted index over the searchable identity fields of CustomUser.
+    One row per distinct lower-cased word (plus whole codes such as the employee ID),
+    so name/ID search is an index prefix range scan instead of icontains over every user.
+    Maintained by users.search.EmployeeSearch from CustomUser post_save.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=64)
+    # Ranking weight of the field the term came from (see EmployeeSearch.FIELD_WEIGHTS)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'user']),
+        ]
+
+    def __str__(self):
+        return self.term
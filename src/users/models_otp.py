@@ -4,6 +4,8 @@ from django.utils import timezone
 import random
 
 class OTPToken(models.Model):
+    VALID_SECONDS = 600
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     token = models.CharField(max_length=6)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -12,7 +14,12 @@ class OTPToken(models.Model):
     def is_valid(self):
         # Valid for 10 minutes
         now = timezone.now()
-        return not self.is_used and (now - self.created_at).total_seconds() < 600
+        return not self.is_used and (now - self.created_at).total_seconds() < self.VALID_SECONDS
+
+    @property
+    def expires_at(self):
+        from datetime import timedelta
+        return self.created_at + timedelta(seconds=self.VALID_SECONDS)
 
     @staticmethod
     def generate(user):
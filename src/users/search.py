@@ -0,0 +1,124 @@
+import re
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, Q, Subquery, When
+from .models import CustomUser, EmployeeSearchTerm
+
+
+class EmployeeSearch:
+    """
+    Indexed employee search shared by autocomplete and the employee / attendance / OT lists.
+    Every query word must prefix-match a term of the employee. Matches are ranked by the
+    field they came from (FIELD_WEIGHTS), whole-word matches counting double.
+    """
+    # CustomUser field -> ranking weight
+    FIELD_WEIGHTS = {
+        'full_name': 4,
+        'employee_id': 4,
+        'username': 3,
+        'aadhaar_number': 2,
+        'designation': 1,
+    }
+    MAX_QUERY_WORDS = 5
+
+    @staticmethod
+    def tokenize(text):
+        """Distinct lower-case words of text (order preserved); "EMP-001" -> ["emp", "001"]"""
+        seen = []
+        for word in re.split(r'[\W_]+', str(text or '').lower()):
+            word = word[:64]
+            if word and word not in seen:
+                seen.append(word)
+        return seen
+
+    @staticmethod
+    def terms_for(user):
+        """{term: weight} for one user, keeping the best weight per term"""
+        terms = {}
+        for field, weight in EmployeeSearch.FIELD_WEIGHTS.items():
+            value = getattr(user, field, None)
+            if field == 'designation' and value:
+                value = user.get_designation_display()
+            for word in EmployeeSearch.tokenize(value):
+                terms[word] = max(weight, terms.get(word, 0))
+        return terms
+
+    @staticmethod
+    def _rows(users):
+        return [
+            EmployeeSearchTerm(user_id=user.pk, term=term, weight=weight)
+            for user in users
+            for term, weight in EmployeeSearch.terms_for(user).items()
+        ]
+
+    @staticmethod
+    def index(user):
+        """Rewrites the terms of one user"""
+        with transaction.atomic():
+            EmployeeSearchTerm.objects.filter(user_id=user.pk).delete()
+            EmployeeSearchTerm.objects.bulk_create(EmployeeSearch._rows([user]))
+
+    @staticmethod
+    def rebuild(batch_size=1000):
+        """Re-indexes every user; returns the number of terms written"""
+        from core.utils.pagination import iter_chunks
+
+        total = 0
+        with transaction.atomic():
+            EmployeeSearchTerm.objects.all().delete()
+            users = CustomUser.objects.only('id', *EmployeeSearch.FIELD_WEIGHTS)
+            for chunk in iter_chunks(users, batch_size):
+                rows = EmployeeSearch._rows(chunk)
+                EmployeeSearchTerm.objects.bulk_create(rows, batch_size=batch_size)
+                total += len(rows)
+        return total
+
+    @staticmethod
+    def matches(query):
+        """
+        values() queryset of {'user_id', 'score'} for users matching every word of query,
+        one grouped query over the term index. None when the query has no words.
+        """
+        words = EmployeeSearch.tokenize(query)[:EmployeeSearch.MAX_QUERY_WORDS]
+        if not words:
+            return None
+
+        match_any = Q()
+        per_word = {}
+        for i, word in enumerate(words):
+            match_any |= Q(term__istartswith=word)
+            per_word[f'w{i}'] = Max(Case(
+                When(term=word, then=F('weight') * 2),
+                When(term__istartswith=word, then=F('weight')),
+                default=0,
+                output_field=IntegerField(),
+            ))
+
+        rows = EmployeeSearchTerm.objects.filter(match_any).values('user_id').annotate(**per_word)
+        for key in per_word:
+            rows = rows.filter(**{f'{key}__gt': 0})
+        score = F('w0')
+        for key in list(per_word)[1:]:
+            score = score + F(key)
+        return rows.annotate(score=score)
+
+    @staticmethod
+    def filter(queryset, query, field='pk'):
+        """Restricts queryset (users, or rows pointing at users through `field`) to matching employees"""
+        rows = EmployeeSearch.matches(query)
+        if rows is None:
+            return queryset
+        return queryset.filter(**{f'{field}__in': Subquery(rows.values('user_id'))})
+
+    @staticmethod
+    def suggest(query, queryset=None, limit=10):
+        """Best `limit` users of queryset for query, best first - one ranked index query plus one fetch"""
+        rows = EmployeeSearch.matches(query)
+        if rows is None:
+            return []
+        if queryset is not None:
+            rows = rows.filter(user_id__in=queryset.values('pk'))
+        else:
+            queryset = CustomUser.objects.all()
+        ranked = list(rows.order_by('-score', 'user_id').values_list('user_id', flat=True)[:limit])
+        by_id = queryset.in_bulk(ranked)
+        return [by_id[pk] for pk in ranked if pk in by_id]
@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from .models_otp import OTPToken
 from .forms_otp import PasswordResetRequestForm, OTPVerifyForm
 
@@ -13,14 +14,15 @@ def password_reset_request(request):
             email = form.cleaned_data['email']
             try:
                 user = User.objects.get(email=email)
-                token = OTPToken.generate(user)
+                # Queued in the outbox; the send_queued_email worker delivers it.
+                # Token and email commit together, so neither exists without the other.
+                from core.outbox import EmailOutbox
                 
-                # --- SEND REAL EMAIL ---
-                from django.core.mail import send_mail
-                from django.conf import settings
-                
-                subject = "Password Reset OTP - Nexteons HR"
-                message = f"""
+                with transaction.atomic():
+                    token = OTPToken.generate(user)
+                    
+                    subject = "Password Reset OTP - Nexteons HR"
+                    message = f"""
 Hello {user.username},
 
 You requested to reset your password.
@@ -30,14 +32,8 @@ This code expires in 10 minutes.
 
 If you did not request this, please ignore this email.
 """
-                try:
-                    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [email], fail_silently=False)
-                    messages.success(request, f"OTP sent to {email}.")
-                except Exception as e:
-                     # Fallback for dev if SMTP fails
-                     print(f"SMTP Error: {e}")
-                     print(f"[DEV FALLBACK] OTP for {email}: {token.token}")
-                     messages.warning(request, f"Could not send email (SMTP Error). OTP printed to console for testing.")
+                    EmailOutbox.enqueue(subject, message, email, category='password_reset', expires_at=token.expires_at)
+                messages.success(request, f"OTP sent to {email}.")
                 
                 request.session['reset_email'] = email
                 return redirect('password_reset_verify')